@@ -0,0 +1,260 @@
+"""
+Token 预算内的 map-reduce 分析
+会话数据超出预算时按行切块，并发执行 map prompt，最后用原分析模板做 reduce 生成 Top-N 报告
+"""
+
+import os
+import asyncio
+import logging
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Generator, List, Optional
+
+import llm_client
+
+logger = logging.getLogger(__name__)
+
+# ==================== 配置 ====================
+
+# 单次调用的输入 token 预算
+TOKEN_BUDGET = int(os.getenv('ANALYSIS_TOKEN_BUDGET', 24000))
+# map 阶段最大并发数
+MAP_CONCURRENCY = int(os.getenv('ANALYSIS_CONCURRENCY', 4))
+# 每个分块最多提炼的候选数
+MAP_MAX_CANDIDATES = 8
+# reduce 最多递归层数，防止异常输入导致死循环
+MAX_REDUCE_ROUNDS = 3
+
+MAP_PROMPT = """# Role: Market Data Pre-Analyst
+# Task: 从以下数据中提炼候选{kind}，供后续汇总分析
+
+## 数据
+{raw_data}
+
+## 输出格式
+每行一个候选，格式: [名称] | 涉及条目数 | 来源 | 关键证据 (不超过50字)
+只输出候选列表，最多 {max_candidates} 行
+"""
+
+REDUCE_HEADER = "以下是分块预分析得到的候选{kind} (原始条目共 {total} 条):\n"
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算 token 数: ASCII 约4字符1个 token，中日韩字符约1字1个 token
+
+    Args:
+        text: 文本
+
+    Returns:
+        估算的 token 数
+    """
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return (len(text) - non_ascii) // 4 + non_ascii + 1
+
+
+def truncate_tokens(text: str, budget: int) -> str:
+    """
+    截断到估算 token 数 (与 estimate_tokens 一致) 不超过预算的最长前缀
+    
+    Args:
+        text: 文本
+        budget: token 预算
+    
+    Returns:
+        截断后的文本
+    """
+    ascii_chars = non_ascii = 0
+    for index, ch in enumerate(text):
+        if ord(ch) > 127:
+            non_ascii += 1
+        else:
+            ascii_chars += 1
+        if ascii_chars // 4 + non_ascii + 1 > budget:
+            return text[:index]
+    return text
+
+
+def chunk_lines(lines: List[str], budget: int) -> List[List[str]]:
+    """
+    按 token 预算贪心切块，超长单行会被截断
+
+    Args:
+        lines: 数据行
+        budget: 每块 token 预算
+
+    Returns:
+        分块列表
+    """
+    chunks: List[List[str]] = []
+    current: List[str] = []
+    used = 0
+
+    for line in lines:
+        cost = estimate_tokens(line)
+        if cost > budget:
+            line = truncate_tokens(line, budget)
+            cost = estimate_tokens(line)
+        if current and used + cost > budget:
+            chunks.append(current)
+            current, used = [], 0
+        current.append(line)
+        used += cost
+
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+@dataclass
+class LLMCall:
+    """一次 LLM 调用的参数 (对应 llm_client.generate_text 的同名参数)"""
+    prompt: str
+    template_version: str
+    cache_input: str
+
+
+def _map_call(chunk: List[str], kind: str, template_version: str) -> LLMCall:
+    raw = "\n".join(chunk)
+    prompt = MAP_PROMPT.format(kind=kind, raw_data=raw, max_candidates=MAP_MAX_CANDIDATES)
+    return LLMCall(prompt, f"{template_version}-map", raw)
+
+
+def _collect_candidates(partials: List[Optional[str]]) -> List[str]:
+    failed = sum(1 for p in partials if not p)
+    if failed:
+        print(f"⚠️ {failed}/{len(partials)} 块分析失败，已跳过")
+    return [
+        line.strip()
+        for partial in partials if partial
+        for line in partial.splitlines() if line.strip()
+    ]
+
+
+def plan_calls(raw_data: str, final_template: str, template_version: str, kind: str,
+               budget: int, concurrency: int) -> Generator[List[LLMCall], List[Optional[str]], Optional[LLMCall]]:
+    """
+    map-reduce 的调用计划，analyze 与 analyze_async 共用，两者只负责执行调用
+    
+    每轮 yield 本轮各分块的 map 调用，并接收按同样顺序排列的结果 (失败为 None)；
+    生成器返回值为生成最终报告的那次调用，所有分块都失败时为 None
+    
+    Args:
+        raw_data: 会话数据 (每行一条)
+        final_template: 最终分析模板 (含 {raw_data} 占位)
+        template_version: 模板版本
+        kind: 候选类型名称
+        budget: 单次调用 token 预算
+        concurrency: map 并发数 (只用于日志)
+    """
+    overhead = estimate_tokens(final_template)
+    data_budget = max(budget - overhead, budget // 4)
+    if estimate_tokens(raw_data) <= data_budget:
+        return LLMCall(final_template.format(raw_data=raw_data), template_version, raw_data)
+    
+    lines = [line for line in raw_data.splitlines() if line.strip()]
+    total = len(lines)
+    for round_no in range(MAX_REDUCE_ROUNDS):
+        chunks = chunk_lines(lines, data_budget)
+        data_tokens = estimate_tokens("\n".join(lines))
+        print(f"🧩 数据超出预算 (~{data_tokens} tokens)，"
+              f"切分为 {len(chunks)} 块并发分析 (并发 {concurrency}, 第 {round_no + 1} 轮)")
+        
+        partials = yield [_map_call(chunk, kind, template_version) for chunk in chunks]
+        lines = _collect_candidates(partials)
+        if not lines:
+            return None
+        if estimate_tokens("\n".join(lines)) <= data_budget:
+            break
+    else:
+        logger.warning("reduce 轮数已达上限，截断候选列表")
+        lines = chunk_lines(lines, data_budget)[0]
+    
+    data = REDUCE_HEADER.format(kind=kind, total=total) + "\n".join(lines)
+    return LLMCall(final_template.format(raw_data=data), f"{template_version}-reduce", data)
+
+
+def analyze(client, raw_data: str, final_template: str, template_version: str,
+            kind: str = '机会', budget: int = TOKEN_BUDGET,
+            concurrency: int = MAP_CONCURRENCY) -> Optional[str]:
+    """
+    在 token 预算内分析会话数据
+
+    数据能放进一次调用时直接用最终模板；否则切块并发 map，
+    再把各块的候选交给最终模板 reduce。延迟约为 (块数 / 并发数) 次调用。
+
+    Args:
+        client: genai.Client
+        raw_data: 会话数据 (每行一条)
+        final_template: 最终分析模板 (含 {raw_data} 占位)
+        template_version: 模板版本
+        kind: 候选类型名称
+        budget: 单次调用 token 预算
+        concurrency: map 并发数
+
+    Returns:
+        分析报告文本，失败返回 None
+    """
+    def generate(call: LLMCall) -> Optional[str]:
+        return llm_client.generate_text(
+            client, call.prompt,
+            template_version=call.template_version,
+            cache_input=call.cache_input
+        )
+    
+    plan = plan_calls(raw_data, final_template, template_version, kind, budget, concurrency)
+    try:
+        calls = next(plan)
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            while True:
+                calls = plan.send(list(pool.map(generate, calls)))
+    except StopIteration as stop:
+        final = stop.value
+    return generate(final) if final is not None else None
+
+
+async def analyze_async(client, raw_data: str, final_template: str, template_version: str,
+                        kind: str = '机会', budget: int = TOKEN_BUDGET,
+                        concurrency: int = MAP_CONCURRENCY,
+                        on_text: Optional[Callable[[Optional[str]], None]] = None) -> Optional[str]:
+    """
+    analyze 的异步版本: map 阶段用信号量限制并发，最终报告流式返回
+    
+    Args:
+        client: genai.Client
+        raw_data: 会话数据 (每行一条)
+        final_template: 最终分析模板 (含 {raw_data} 占位)
+        template_version: 模板版本
+        kind: 候选类型名称
+        budget: 单次调用 token 预算
+        concurrency: map 并发数
+        on_text: 最终报告的流式文本回调，见 llm_client.generate_text_async
+    
+    Returns:
+        分析报告文本，失败返回 None
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    
+    async def _map(call: LLMCall) -> Optional[str]:
+        async with semaphore:
+            return await llm_client.generate_text_async(
+                client, call.prompt,
+                template_version=call.template_version,
+                cache_input=call.cache_input
+            )
+    
+    plan = plan_calls(raw_data, final_template, template_version, kind, budget, concurrency)
+    try:
+        calls = next(plan)
+        while True:
+            calls = plan.send(list(await asyncio.gather(*(_map(call) for call in calls))))
+    except StopIteration as stop:
+        final = stop.value
+    if final is None:
+        return None
+    return await llm_client.generate_text_async(
+        client, final.prompt,
+        template_version=final.template_version,
+        cache_input=final.cache_input,
+        on_text=on_text
+    )
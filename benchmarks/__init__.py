@@ -0,0 +1,4 @@
+"""
+离线基准测试与本地替身服务
+在仓库根目录用 python -m benchmarks.<模块> 运行
+"""
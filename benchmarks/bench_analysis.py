@@ -0,0 +1,135 @@
+"""
+分析链路基准测试 - 在本地 Gemini 替身服务上测量重试、并发和缓存的效果
+不访问外网，不消耗真实配额
+
+用法:
+    python -m benchmarks.bench_analysis --items 2000 --latency lognormal:1.0:0.4 --error-rate 0.1
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import llm_cache
+import llm_client
+import analysis_pipeline
+from benchmarks.llm_stub import StubConfig, start_server
+
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+
+TEMPLATE = """# Role: Benchmark Analyst
+## 数据
+{raw_data}
+## 输出格式
+### 🎯 Top 3
+"""
+
+PRODUCTS = ['ChatGPT', 'Claude', 'DeepSeek', 'Cursor', 'Midjourney', 'Sora']
+COMPLAINTS = ['crashes on large files', 'rate limit too low', 'too expensive for teams',
+              'hallucinates APIs', 'slow completions', 'context window too small']
+
+
+def synthetic_lines(n: int, seed: int = 7) -> List[str]:
+    """生成与会话数据格式一致的合成条目"""
+    rng = random.Random(seed)
+    return [
+        f"【{rng.choice(['Twitter', 'HackerNews'])}】({rng.choice(PRODUCTS)}) @user{i}: "
+        f"{rng.choice(COMPLAINTS)} #{i} " + "detail " * rng.randint(5, 40)
+        for i in range(n)
+    ]
+
+
+def _run_sync(client, raw: str, budget: int, concurrency: int) -> float:
+    start = time.perf_counter()
+    analysis_pipeline.analyze(client, raw, TEMPLATE, 'bench-v1', budget=budget, concurrency=concurrency)
+    return time.perf_counter() - start
+
+
+def _run_async(client, raw: str, budget: int, concurrency: int) -> float:
+    start = time.perf_counter()
+    asyncio.run(analysis_pipeline.analyze_async(client, raw, TEMPLATE, 'bench-v1',
+                                                budget=budget, concurrency=concurrency))
+    return time.perf_counter() - start
+
+
+def run(args) -> Dict:
+    server, stats = start_server(StubConfig(
+        latency=args.latency, error_rate=args.error_rate, seed=args.seed
+    ))
+    host, port = server.server_address[:2]
+    llm_client.GEMINI_BASE_URL = f"http://{host}:{port}"
+    llm_client.BACKOFF_BASE = args.backoff_base
+    client = llm_client.create_client('bench-key')
+    
+    raw = "\n".join(synthetic_lines(args.items))
+    chunks = len(analysis_pipeline.chunk_lines(raw.splitlines(), args.budget))
+    print(f"🧪 条目 {args.items}, ~{analysis_pipeline.estimate_tokens(raw)} tokens, "
+          f"预算 {args.budget} → {chunks} 块")
+    
+    results = {'items': args.items, 'chunks': chunks, 'latency': args.latency,
+               'error_rate': args.error_rate, 'scenarios': []}
+    
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for mode in ('sync', 'async'):
+            for concurrency in args.concurrency:
+                for phase in ('cold', 'warm'):
+                    if phase == 'cold':
+                        llm_cache._cache = llm_cache.ResponseCache(Path(cache_dir) / f"{mode}-{concurrency}")
+                    runner = _run_sync if mode == 'sync' else _run_async
+                    before = stats.snapshot()['requests']
+                    times = [runner(client, raw, args.budget, concurrency) for _ in range(args.repeat)]
+                    calls = stats.snapshot()['requests'] - before
+                    row = {
+                        'mode': mode, 'concurrency': concurrency, 'cache': phase,
+                        'p50': round(statistics.median(times), 3),
+                        'max': round(max(times), 3),
+                        'requests': calls,
+                        'cache_hit_rate': llm_cache._cache.stats()['hit_rate'],
+                    }
+                    results['scenarios'].append(row)
+                    print(f"  {mode:5} 并发 {concurrency:2} 缓存 {phase:4}: p50 {row['p50']:7.3f}s "
+                          f"max {row['max']:7.3f}s  请求 {calls:4}  命中率 {row['cache_hit_rate']:.0%}")
+    
+    results['stub'] = stats.snapshot()
+    server.shutdown()
+    return results
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    
+    parser = argparse.ArgumentParser(description='🧪 分析链路基准测试')
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--budget', type=int, default=4000)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--latency', default='lognormal:0.5:0.3')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--backoff-base', type=float, default=0.2)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    
+    # 本地替身不能走代理
+    for var in ('http_proxy', 'https_proxy', 'HTTP_PROXY', 'HTTPS_PROXY'):
+        os.environ.pop(var, None)
+    
+    results = run(args)
+    RESULTS_DIR.mkdir(exist_ok=True)
+    out = RESULTS_DIR / f"analysis_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    out.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f"\n💾 结果已保存: {out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+"""
+完整监控循环基准测试 - 在本地替身服务上跑 MarketMonitor.run_all()，不访问外网
+数据源走 benchmarks.stub_servers，Gemini 走 benchmarks.llm_stub，数据写在临时工作目录里。
+每轮输出吞吐、各阶段 (fetch / match / dedup / store / analyze / render / push) 耗时分位数和峰值内存，
+结果保存到 benchmarks/results/，用 --compare 与之前的结果对比
+
+用法:
+    python -m benchmarks.bench_cycle --cycles 3 --latency lognormal:0.1:0.5 --error-rate 0.05
+    python -m benchmarks.bench_cycle --compare                     # 与上一次结果对比
+    python -m benchmarks.bench_cycle --compare benchmarks/results/cycle_20250101_120000.json
+    python -m benchmarks.bench_cycle --replay logs/cassette-20250101-120000.jsonl.gz --replay-speed 0   # 回放线上录制的一轮
+
+首轮为冷启动 (全部新条目)，之后每轮约 --fresh-rate 比例的条目是新的。
+Twitter 与 Google Trends 走第三方客户端，基准测试中视为没有数据 (回放卷带时用录到的结果)；需要已缓存 Chroma 默认向量模型
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import logging
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.llm_stub import StubConfig, start_server
+from benchmarks.stub_servers import SourceStubServer, add_arguments, config_from_args
+
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+
+STAGES = ('fetch', 'match', 'dedup', 'store', 'analyze', 'render', 'push')
+
+
+def percentile(values: List[float], q: float) -> float:
+    """最近秩分位数，q 取 0-100"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def stage_summary(durations: Dict[str, List[float]]) -> Dict[str, Dict]:
+    """各阶段区间耗时 (毫秒) 的分位数"""
+    summary = {}
+    for stage in STAGES:
+        values = durations.get(stage, [])
+        if not values:
+            continue
+        summary[stage] = {
+            'count': len(values),
+            'total_ms': round(sum(values), 1),
+            'p50_ms': round(percentile(values, 50), 2),
+            'p90_ms': round(percentile(values, 90), 2),
+            'p99_ms': round(percentile(values, 99), 2),
+            'max_ms': round(max(values), 2),
+        }
+    return summary
+
+
+def peak_rss_mb() -> Optional[float]:
+    """本进程峰值常驻内存 (MB)，不支持的平台返回 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run_cycles(args, stub: SourceStubServer) -> List[Dict]:
+    import store
+    import profiling
+    import run_monitor
+    import pain_radar_v2
+    import opportunity_hunter
+    
+    # 第三方客户端不在替身范围内，视为没有数据
+    async def no_tweets():
+        return []
+    pain_radar_v2.search_tweets = no_tweets
+    opportunity_hunter.fetch_trends = lambda: []
+    
+    recorder = profiling.collect_spans()
+    monitor = run_monitor.MarketMonitor()
+    rows = []
+    for index in range(args.cycles):
+        if index:
+            stub.advance()
+        recorder.take()
+        requests_before = stub.stats.snapshot()['requests']
+        store_before = store.stats() or {'inserted': 0, 'skipped': 0}
+        
+        start = time.perf_counter()
+        asyncio.run(monitor.run_all())
+        monitor.finish_delivery()
+        elapsed = time.perf_counter() - start
+        
+        durations: Dict[str, List[float]] = {}
+        for event in recorder.take()['traceEvents']:
+            if event.get('ph') == 'X':
+                durations.setdefault(event['name'], []).append(event['dur'] / 1000)
+        store_after = store.stats() or {'inserted': 0, 'skipped': 0}
+        inserted = store_after['inserted'] - store_before['inserted']
+        processed = inserted + store_after['skipped'] - store_before['skipped']
+        
+        rows.append({
+            'cycle': index + 1,
+            'seconds': round(elapsed, 3),
+            'results': dict(monitor.results),
+            'requests': stub.stats.snapshot()['requests'] - requests_before,
+            'items_processed': processed,
+            'items_stored': inserted,
+            'items_per_second': round(processed / elapsed, 1) if elapsed else 0,
+            'peak_rss_mb': peak_rss_mb(),
+            'stages': stage_summary(durations),
+        })
+    return rows
+
+
+def print_rows(rows: List[Dict]) -> None:
+    print("\n" + "=" * 78)
+    print(f"{'轮次':<4} {'耗时(s)':>8} {'请求':>6} {'处理':>6} {'新增':>6} {'条/秒':>8} {'峰值RSS(MB)':>12}")
+    for row in rows:
+        print(f"{row['cycle']:<6} {row['seconds']:>8.2f} {row['requests']:>6} {row['items_processed']:>6} "
+              f"{row['items_stored']:>6} {row['items_per_second']:>8.1f} {str(row['peak_rss_mb']):>12}")
+    print("-" * 78)
+    print(f"{'阶段':<8} " + ' '.join(f"{'第' + str(r['cycle']) + '轮 p50/p90/max (ms)':>30}" for r in rows[:3]))
+    for stage in STAGES:
+        cells = []
+        for row in rows[:3]:
+            s = row['stages'].get(stage)
+            cells.append(f"{s['p50_ms']:>8.1f} /{s['p90_ms']:>8.1f} /{s['max_ms']:>8.1f} ({s['count']:>3})" if s else f"{'-':>30}")
+        print(f"{stage:<10} " + ' '.join(f"{c:>30}" for c in cells))
+    print("=" * 78)
+
+
+def _headline(result: Dict) -> Dict[str, float]:
+    """用于对比的汇总指标 (取第 2 轮起的稳态均值，只有 1 轮时用首轮)"""
+    rows = result['cycles'][1:] or result['cycles']
+    headline = {
+        'seconds': sum(r['seconds'] for r in rows) / len(rows),
+        'items_per_second': sum(r['items_per_second'] for r in rows) / len(rows),
+        'peak_rss_mb': max((r['peak_rss_mb'] or 0) for r in result['cycles']),
+    }
+    for stage in STAGES:
+        values = [r['stages'][stage]['p90_ms'] for r in rows if stage in r['stages']]
+        if values:
+            headline[f"{stage}_p90_ms"] = sum(values) / len(values)
+    return headline
+
+
+def compare(current: Dict, baseline_path: Path) -> None:
+    baseline = json.loads(baseline_path.read_text(encoding='utf-8'))
+    now, before = _headline(current), _headline(baseline)
+    print(f"\n📊 对比基线 {baseline_path.name} (版本 {baseline.get('revision')} → {current.get('revision')})")
+    for key, value in now.items():
+        if key not in before:
+            continue
+        old = before[key]
+        change = (value - old) / old * 100 if old else 0.0
+        # 吞吐越高越好，其余越低越好
+        worse = change < -10 if key == 'items_per_second' else change > 10
+        flag = '⚠️' if worse else '  '
+        print(f"  {flag} {key:<22} {old:>10.2f} → {value:>10.2f} ({change:+.1f}%)")
+
+
+def latest_result(exclude: Optional[Path] = None) -> Optional[Path]:
+    results = sorted(p for p in RESULTS_DIR.glob('cycle_*.json') if p != exclude)
+    return results[-1] if results else None
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    
+    parser = argparse.ArgumentParser(description='🧪 完整监控循环基准测试')
+    parser.add_argument('--cycles', type=int, default=3)
+    parser.add_argument('--llm-latency', default='fixed:0.2')
+    parser.add_argument('--workdir', default=None, help='工作目录 (默认临时目录，结束后删除)')
+    parser.add_argument('--compare', nargs='?', const='latest', default=None,
+                        help='与之前的结果对比 (不带路径时取最近一次)')
+    parser.add_argument('--replay', default=None, metavar='PATH', help='数据源改为回放 run_monitor.py --record 录制的卷带')
+    parser.add_argument('--replay-speed', type=float, default=0, help='回放速度倍数 (0 为不等待)')
+    add_arguments(parser)
+    args = parser.parse_args()
+    
+    # 本地替身不能走代理
+    for var in ('http_proxy', 'https_proxy', 'HTTP_PROXY', 'HTTPS_PROXY'):
+        os.environ.pop(var, None)
+    os.environ['PROXY_PORT'] = '0'
+    baseline = latest_result() if args.compare == 'latest' else Path(args.compare) if args.compare else None
+    
+    stub = SourceStubServer(config_from_args(args)).start()
+    llm_server, _ = start_server(StubConfig(latency=args.llm_latency, seed=args.seed))
+    
+    workdir = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix='bench_cycle_'))
+    workdir.mkdir(parents=True, exist_ok=True)
+    shutil.copytree(ROOT / 'config', workdir / 'config', dirs_exist_ok=True)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        import llm_client
+        host, port = llm_server.server_address[:2]
+        llm_client.GEMINI_BASE_URL = f"http://{host}:{port}"
+        stub.apply(sources=not args.replay)
+        if args.replay:
+            import cassette
+            cassette.configure('replay', args.replay, args.replay_speed)
+        print(f"🧪 替身服务 {stub.base_url}, 工作目录 {workdir}, {args.cycles} 轮")
+        rows = run_cycles(args, stub)
+    finally:
+        # 删除工作目录前先停掉写线程和发件箱
+        import store
+        import outbox
+        if store.stats() is not None:
+            store.get_store().close()
+        if outbox._outbox is not None:
+            outbox._outbox.stop()
+        os.chdir(cwd)
+        stub.shutdown()
+        llm_server.shutdown()
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    
+    print_rows(rows)
+    result = {
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'config': {k: v for k, v in vars(args).items() if k not in ('workdir', 'compare')},
+        'stub': stub.stats.snapshot(),
+        'cycles': rows,
+    }
+    RESULTS_DIR.mkdir(exist_ok=True)
+    out = RESULTS_DIR / f"cycle_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    out.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f"\n💾 结果已保存: {out}")
+    
+    if baseline is not None and baseline.exists():
+        compare(result, baseline)
+    elif args.compare:
+        print("⚠️ 没有可对比的基线结果")
+
+
+if __name__ == '__main__':
+    main()
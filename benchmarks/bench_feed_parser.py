@@ -0,0 +1,231 @@
+"""
+RSS / Atom 解析基准测试 - fast_feed (lxml iterparse) 对比 feedparser
+两边都只取前 --limit 条 (与 RSSHunter 一致)，比较每秒产出的条目数、解析一个 feed 的峰值内存，
+并逐条核对两边解析出的标题、链接、摘要和发布时间是否一致。
+默认用合成的 Reddit 风格 Atom feed 和 YC 风格 RSS 2.0 feed (条目数见 --entries)，
+也可以用 --files 指定保存下来的真实 feed。结果保存到 benchmarks/results/feed_*.json
+
+用法:
+    python -m benchmarks.bench_feed_parser
+    python -m benchmarks.bench_feed_parser --entries 25 100 1000 --limit 50 --repeat 20
+    python -m benchmarks.bench_feed_parser --files reddit_localllama.xml ycombinator.xml
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+import tracemalloc
+import calendar
+import re
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+from xml.sax.saxutils import escape
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.bench_cycle import RESULTS_DIR, git_revision
+
+WORDS = ('cursor claude context window rate limit slow error api local model gpu quantized inference '
+         'agent prompt token latency release benchmark open source weights fine-tune llama server').split()
+
+
+# ==================== 合成 feed ====================
+
+def _sentence(rng: random.Random, n: int) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(n))
+
+
+def reddit_atom(entries: int, seed: int = 42) -> str:
+    """Reddit /new/.rss 风格的 Atom: 正文是转义后的 HTML，带作者、分类、缩略图"""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    parts = ['<?xml version="1.0" encoding="UTF-8"?>'
+             '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:media="http://search.yahoo.com/mrss/">'
+             '<category term="LocalLLaMA" label="r/LocalLLaMA"/><updated>' + now.isoformat() + '</updated>'
+             '<icon>https://www.redditstatic.com/icon.png/</icon><id>/r/LocalLLaMA/new/.rss</id>'
+             '<link rel="self" href="https://www.reddit.com/r/LocalLLaMA/new/.rss" type="application/atom+xml" />'
+             '<link rel="alternate" href="https://www.reddit.com/r/LocalLLaMA/new/" type="text/html" />'
+             '<title>LocalLLaMA</title>']
+    for i in range(entries):
+        post = f"t3_{seed:x}{i:06x}"
+        stamp = (now - timedelta(minutes=i * 3)).isoformat(timespec='seconds')
+        body = ''.join(f"<p>{_sentence(rng, rng.randint(15, 40))}</p>" for _ in range(rng.randint(2, 6)))
+        html = (f'<!-- SC_OFF --><div class="md">{body}</div><!-- SC_ON --> &#32; submitted by &#32; '
+                f'<a href="https://www.reddit.com/user/u{i}"> /u/u{i} </a> <br/> '
+                f'<span><a href="https://www.reddit.com/r/LocalLLaMA/comments/{post}/">[link]</a></span>')
+        parts.append(
+            f'<entry><author><name>/u/u{i}</name><uri>https://www.reddit.com/user/u{i}</uri></author>'
+            f'<category term="LocalLLaMA" label="r/LocalLLaMA"/><content type="html">{escape(html)}</content>'
+            f'<id>{post}</id><media:thumbnail url="https://b.thumbs.redditmedia.com/{post}.jpg" />'
+            f'<link href="https://www.reddit.com/r/LocalLLaMA/comments/{post}/" />'
+            f'<updated>{stamp}</updated><published>{stamp}</published>'
+            f'<title>{escape(_sentence(rng, rng.randint(6, 14)))}</title></entry>'
+        )
+    parts.append('</feed>')
+    return ''.join(parts)
+
+
+def rss2(entries: int, seed: int = 42) -> str:
+    """YC / 博客风格的 RSS 2.0"""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    parts = ['<?xml version="1.0" encoding="UTF-8"?><rss version="2.0" xmlns:dc="http://purl.org/dc/elements/1.1/">'
+             '<channel><title>Y Combinator</title><link>https://www.ycombinator.com/</link>'
+             '<description>Launches</description>']
+    for i in range(entries):
+        stamp = (now - timedelta(hours=i)).strftime('%a, %d %b %Y %H:%M:%S +0000')
+        parts.append(
+            f"<item><title>{escape(_sentence(rng, rng.randint(5, 10)))}</title>"
+            f"<link>https://www.ycombinator.com/launches/{i}</link>"
+            f"<description>{escape('<p>' + _sentence(rng, rng.randint(30, 80)) + '</p>')}</description>"
+            f"<pubDate>{stamp}</pubDate><dc:creator>founder{i}</dc:creator>"
+            f"<guid isPermaLink=\"false\">yc-{i}</guid></item>"
+        )
+    parts.append('</channel></rss>')
+    return ''.join(parts)
+
+
+# ==================== 解析器 ====================
+
+def parse_feedparser(body: str, limit: int) -> List[Tuple]:
+    """feedparser 完整解析后取前 limit 条 (与 RSSHunter 回退路径相同的字段)"""
+    import feedparser
+    
+    feed = feedparser.parse(body)
+    rows = []
+    for entry in feed.entries[:limit]:
+        try:
+            published = float(calendar.timegm(entry.published_parsed))
+        except Exception:
+            published = None
+        rows.append((entry.get('title', ''), entry.get('summary', ''), entry.get('link', ''), published))
+    return rows
+
+
+def parse_fast(body: str, limit: int) -> List[Tuple]:
+    import fast_feed
+    
+    entries = fast_feed.parse(body, limit)
+    if entries is None:
+        raise ValueError("fast_feed 不认识这个 feed 格式")
+    return [tuple(entry) for entry in entries]
+
+
+# ==================== 测量 ====================
+
+def measure(parse: Callable[[str, int], List[Tuple]], body: str, limit: int, repeat: int) -> Dict:
+    """重复解析 repeat 次，返回耗时、吞吐和单次解析的峰值内存"""
+    parse(body, limit)  # 预热 (导入模块、编译正则)
+    durations = []
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = len(parse(body, limit))
+        durations.append(time.perf_counter() - start)
+    
+    tracemalloc.start()
+    parse(body, limit)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    best = min(durations)
+    mean = sum(durations) / len(durations)
+    return {
+        'entries': count,
+        'best_ms': round(best * 1000, 3),
+        'mean_ms': round(mean * 1000, 3),
+        'entries_per_second': round(count / mean, 1) if mean else 0,
+        'mb_per_second': round(len(body.encode('utf-8')) / 1e6 / mean, 2) if mean else 0,
+        'peak_alloc_kb': round(peak / 1024, 1),
+    }
+
+
+def _normalize(text: str) -> str:
+    # feedparser 会重新序列化 HTML (<br/> → <br />)，只比较标签以外的文本
+    return ' '.join(re.sub(r'<[^>]*>', ' ', text).split())
+
+
+def compare_rows(reference: List[Tuple], candidate: List[Tuple]) -> Dict[str, int]:
+    """逐条核对两边的字段 (去掉 HTML 标签、空白归一化后比较，时间允许 1 秒误差)"""
+    mismatches = {'count': int(len(reference) != len(candidate)), 'title': 0, 'summary': 0, 'link': 0, 'published': 0}
+    for ref, got in zip(reference, candidate):
+        for index, field in enumerate(('title', 'summary', 'link')):
+            if _normalize(ref[index]) != _normalize(got[index]):
+                mismatches[field] += 1
+        if (ref[3] is None) != (got[3] is None) or (ref[3] is not None and abs(ref[3] - got[3]) > 1):
+            mismatches['published'] += 1
+    return mismatches
+
+
+def load_feeds(args) -> Dict[str, str]:
+    if args.files:
+        return {Path(path).name: Path(path).read_text(encoding='utf-8') for path in args.files}
+    feeds = {}
+    for entries in args.entries:
+        feeds[f"reddit_atom_{entries}"] = reddit_atom(entries, args.seed)
+        feeds[f"rss2_{entries}"] = rss2(entries, args.seed)
+    return feeds
+
+
+def print_rows(rows: List[Dict]) -> None:
+    print("\n" + "=" * 96)
+    print(f"{'feed':<22}{'大小(KB)':>10}{'条目':>6}{'feedparser 条/秒':>20}{'fast_feed 条/秒':>18}"
+          f"{'加速':>8}{'峰值内存(KB)':>16}{'不一致':>8}")
+    print("-" * 96)
+    for row in rows:
+        slow, fast = row['parsers']['feedparser'], row['parsers'].get('fast_feed')
+        if fast is None:
+            print(f"{row['feed']:<22}{row['size_kb']:>10.0f}{slow['entries']:>6}{slow['entries_per_second']:>20.0f}"
+                  f"{'回退':>18}")
+            continue
+        speedup = slow['mean_ms'] / fast['mean_ms'] if fast['mean_ms'] else 0
+        memory = f"{slow['peak_alloc_kb']:.0f}→{fast['peak_alloc_kb']:.0f}"
+        print(f"{row['feed']:<22}{row['size_kb']:>10.0f}{fast['entries']:>6}{slow['entries_per_second']:>20.0f}"
+              f"{fast['entries_per_second']:>18.0f}{speedup:>7.1f}x{memory:>16}{sum(row['mismatches'].values()):>8}")
+    print("=" * 96)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='🧪 RSS / Atom 解析基准测试')
+    parser.add_argument('--entries', type=int, nargs='+', default=[25, 100, 1000], help='合成 feed 的条目数')
+    parser.add_argument('--limit', type=int, default=50, help='每个 feed 取前几条 (与 FEED_ENTRY_LIMIT 一致)')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--files', nargs='*', default=None, help='改用保存下来的 feed 文件')
+    args = parser.parse_args()
+    
+    rows = []
+    for name, body in load_feeds(args).items():
+        row = {'feed': name, 'size_kb': round(len(body.encode('utf-8')) / 1024, 1), 'parsers': {}}
+        reference = parse_feedparser(body, args.limit)
+        row['parsers']['feedparser'] = measure(parse_feedparser, body, args.limit, args.repeat)
+        try:
+            candidate = parse_fast(body, args.limit)
+        except ValueError:
+            print(f"  ↩️ {name}: fast_feed 不认识的格式，线上会回退到 feedparser")
+            rows.append(row)
+            continue
+        row['parsers']['fast_feed'] = measure(parse_fast, body, args.limit, args.repeat)
+        row['mismatches'] = compare_rows(reference, candidate)
+        rows.append(row)
+        print(f"  ✅ {name}: {row['size_kb']} KB")
+    
+    print_rows(rows)
+    result = {
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'config': {k: v for k, v in vars(args).items()},
+        'feeds': rows,
+    }
+    RESULTS_DIR.mkdir(exist_ok=True)
+    out = RESULTS_DIR / f"feed_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    out.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f"\n💾 结果已保存: {out}")
+
+
+if __name__ == '__main__':
+    main()
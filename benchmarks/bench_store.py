@@ -0,0 +1,281 @@
+"""
+向量库规模基准测试 - 用合成语料把 my_market_brain 灌到几十万、上百万条，看存储什么时候开始变慢
+写入走 store.Store 的写线程 (与线上流水线入库阶段 store_pain / store_opportunity 相同的 add_if_absent 路径)，
+每到一个检查点测一次:
+  ingest    本段写入吞吐 (条/秒，不含语料生成与向量计算) 与查重挡下的条数
+  dedup     写入前的 id 查重 get(ids=..., include=[])
+  vectors   按 id 取向量 (趋势聚类的取数方式)
+  similar   向量近邻查询 query(n_results=10)
+  filter    元数据过滤 get(where={"product_Cursor": True})
+  scan      按页扫描元数据 (清理旧数据只能这样找，time 是字符串无法范围过滤)
+  disk      库目录占用
+结果保存到 benchmarks/results/store_*.json
+
+用法:
+    python -m benchmarks.bench_store --sizes 10000 100000 1000000
+    python -m benchmarks.bench_store --sizes 10000 50000 --embeddings model   # 用真实向量模型 (慢)
+
+默认用合成向量 (话题中心 + 噪声，近似重复贴近原条目)，只测存储本身的开销
+"""
+
+import sys
+import json
+import time
+import shutil
+import random
+import logging
+import argparse
+import tempfile
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.bench_cycle import RESULTS_DIR, git_revision, peak_rss_mb, percentile
+from benchmarks.corpus import CorpusConfig, SyntheticCorpus
+
+# 元数据扫描最多读多少行，更大的库按比例外推
+SCAN_ROWS = 50000
+SCAN_PAGE = 5000
+# 每次预先生成多少条语料 (含向量) 再计时写入，限制内存占用
+PREPARE_ROWS = 10000
+
+
+def dir_size_mb(path: Path) -> float:
+    return round(sum(p.stat().st_size for p in path.rglob('*') if p.is_file()) / 1024 / 1024, 1)
+
+
+def timed(fn: Callable, repeat: int) -> Dict[str, float]:
+    """重复执行 fn，返回耗时分位数 (毫秒)"""
+    values = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        values.append((time.perf_counter() - start) * 1000)
+    return {'p50_ms': round(percentile(values, 50), 2), 'p99_ms': round(percentile(values, 99), 2),
+            'max_ms': round(max(values), 2)}
+
+
+class Ingestor:
+    """把语料按顺序写进向量库，同时保留一份 id 样本供查询用"""
+    
+    def __init__(self, store, corpus: SyntheticCorpus, embeddings: str, window: int, chunk: int = 512):
+        self.store = store
+        self.corpus = corpus
+        self.embeddings = embeddings
+        self.window = window
+        self.chunk = chunk
+        self.position = 0
+        self.inserted = 0
+        self.skipped = 0
+        self.sample: Dict[str, List[str]] = {}      # 每个集合的 id 蓄水池样本
+        self.seen: Dict[str, int] = {}
+        self.queries: List = []                     # 近邻查询用的记录样本
+        self._embed = store_embedding_function() if embeddings == 'model' else None
+        self._pending: deque = deque()
+    
+    def run_until(self, target: int) -> float:
+        """
+        写到语料第 target 条为止
+        
+        Returns:
+            写入耗时 (秒)，每 PREPARE_ROWS 条的语料和向量在计时外预先生成
+        """
+        elapsed = 0.0
+        while self.position < target:
+            chunks = self._prepare(min(target, self.position + PREPARE_ROWS))
+            start = time.perf_counter()
+            for batch, vectors in chunks:
+                for record, vector in zip(batch, vectors):
+                    handle = self.store.collection(record.collection)
+                    self._pending.append(handle.submit_add_if_absent(record.doc_id, record.document,
+                                                                     record.metadata, vector))
+                    # 在途写操作有上限，避免队列无限堆积
+                    while len(self._pending) > self.window:
+                        self._settle(self._pending.popleft())
+            while self._pending:
+                self._settle(self._pending.popleft())
+            elapsed += time.perf_counter() - start
+        return elapsed
+    
+    def _prepare(self, end: int) -> List[Tuple[List, List[List[float]]]]:
+        """生成语料第 position 到 end 条 (被打标签规则过滤的跳过)，按 chunk 分批算好向量"""
+        records = []
+        for index in range(self.position, end):
+            record = self.corpus.record(index)
+            if record is not None:
+                records.append(record)
+                self._remember(record)
+        self.position = end
+        chunks = []
+        for offset in range(0, len(records), self.chunk):
+            batch = records[offset:offset + self.chunk]
+            chunks.append((batch, self._vectors(batch)))
+        return chunks
+    
+    def _vectors(self, batch) -> List[List[float]]:
+        import numpy as np
+        
+        if self._embed is not None:
+            return np.asarray(self._embed([record.document for record in batch])).tolist()
+        return self.corpus.embeddings(batch).tolist()
+    
+    def _settle(self, future) -> None:
+        if future.result():
+            self.inserted += 1
+        else:
+            self.skipped += 1
+    
+    def _remember(self, record) -> None:
+        """蓄水池抽样，每个集合保留最多 10000 个 id (完全重复的 id 已在样本里，跳过)"""
+        _reservoir(self.queries, record, record.index + 1, 1000)
+        if record.variant == 'duplicate':
+            return
+        count = self.seen.get(record.collection, 0) + 1
+        self.seen[record.collection] = count
+        _reservoir(self.sample.setdefault(record.collection, []), record.doc_id, count, 10000)
+
+
+def _reservoir(sample: List, item, count: int, limit: int) -> None:
+    if len(sample) < limit:
+        sample.append(item)
+        return
+    slot = random.randrange(count)
+    if slot < limit:
+        sample[slot] = item
+
+
+def store_embedding_function():
+    import store
+    return store.embedding_function()
+
+
+def measure(store, ingestor: Ingestor, probes: int) -> Dict[str, Dict]:
+    """在当前规模下测各类读操作"""
+    rng = random.Random(ingestor.position)
+    queries = rng.sample(ingestor.queries, min(probes, len(ingestor.queries)))
+    probe_vectors = ingestor._vectors(queries)
+    results: Dict[str, Dict] = {}
+    for name, ids in ingestor.sample.items():
+        raw = store.collection(name).raw
+        count = raw.count()
+        vector_iter = iter(probe_vectors)
+        
+        def pick(k: int) -> List[str]:
+            # 近似重复偶尔会改出同一条文本，样本里可能有重复 id
+            return list(dict.fromkeys(rng.sample(ids, min(k, len(ids)))))
+        
+        def dedup():
+            # 与写线程的查重一样: 一批 id，一半已存在一半不存在
+            batch = pick(32) + [f"missing_{rng.random()}" for _ in range(32)]
+            raw.get(ids=batch, include=[])
+        
+        row = {
+            'count': count,
+            'dedup': timed(dedup, probes),
+            'vectors': timed(lambda: raw.get(ids=pick(200), include=['embeddings']), probes),
+            'similar': timed(lambda: raw.query(query_embeddings=[next(vector_iter)], n_results=10), len(probe_vectors)),
+        }
+        if name.startswith('pain'):
+            row['filter'] = timed(lambda: raw.get(where={'product_Cursor': True}, limit=100), probes)
+        row['scan'] = scan(raw, count)
+        results[name] = row
+    return results
+
+
+def scan(raw, count: int) -> Dict[str, float]:
+    """分页读元数据，返回读完整个集合的耗时 (超过 SCAN_ROWS 时外推)"""
+    rows = min(count, SCAN_ROWS)
+    start = time.perf_counter()
+    for offset in range(0, rows, SCAN_PAGE):
+        raw.get(include=['metadatas'], limit=min(SCAN_PAGE, rows - offset), offset=offset)
+    elapsed = time.perf_counter() - start
+    return {'rows': rows, 'seconds': round(elapsed, 2),
+            'full_scan_seconds': round(elapsed * count / rows, 1) if rows else 0.0}
+
+
+def print_rows(rows: List[Dict]) -> None:
+    print("\n" + "=" * 100)
+    print(f"{'条目':>9} {'库内':>9} {'写入条/秒':>9} {'挡下':>7} {'磁盘MB':>8} {'RSS MB':>7}   "
+          f"{'集合':<17} {'查重p50':>7} {'取向量p50':>8} {'近邻p50':>7} {'过滤p50':>7} {'全扫(s)':>7}")
+    for row in rows:
+        first = True
+        for name, m in row['collections'].items():
+            head = (f"{row['items']:>11} {row['stored']:>11} {row['ingest_per_second']:>12.0f} {row['skipped']:>9} "
+                    f"{row['disk_mb']:>9.1f} {str(row['peak_rss_mb']):>8}" if first else ' ' * 66)
+            filt = f"{m['filter']['p50_ms']:>9.1f}" if 'filter' in m else f"{'-':>9}"
+            print(f"{head}   {name:<18} {m['dedup']['p50_ms']:>9.1f} {m['vectors']['p50_ms']:>11.1f} "
+                  f"{m['similar']['p50_ms']:>9.1f} {filt} {m['scan']['full_scan_seconds']:>9.1f}")
+            first = False
+    print("=" * 100)
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    
+    parser = argparse.ArgumentParser(description='🧪 向量库规模基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000],
+                        help='检查点 (语料条数，递增)')
+    parser.add_argument('--duplicate-rate', type=float, default=0.1)
+    parser.add_argument('--near-duplicate-rate', type=float, default=0.1)
+    parser.add_argument('--embeddings', choices=('synthetic', 'model'), default='synthetic')
+    parser.add_argument('--batch-size', type=int, default=256, help='写线程每批合并的写操作数')
+    parser.add_argument('--window', type=int, default=2048, help='在途写操作上限')
+    parser.add_argument('--probes', type=int, default=50, help='每项读操作的测量次数')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workdir', default=None, help='库目录所在位置 (默认临时目录，结束后删除)')
+    args = parser.parse_args()
+    
+    import store
+    
+    sizes = sorted(args.sizes)
+    corpus = SyntheticCorpus(CorpusConfig(size=sizes[-1], duplicate_rate=args.duplicate_rate,
+                                          near_duplicate_rate=args.near_duplicate_rate, seed=args.seed))
+    workdir = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix='bench_store_'))
+    path = workdir / 'my_market_brain'
+    service = store.Store(path=path, batch_size=args.batch_size)
+    ingestor = Ingestor(service, corpus, args.embeddings, args.window)
+    print(f"🧪 库目录 {path}, 检查点 {sizes}, 向量 {args.embeddings}")
+    
+    rows = []
+    try:
+        for size in sizes:
+            before = (ingestor.inserted, ingestor.skipped)
+            elapsed = ingestor.run_until(size)
+            processed = ingestor.inserted + ingestor.skipped - sum(before)
+            row = {
+                'items': size,
+                'stored': ingestor.inserted,
+                'skipped': ingestor.skipped,
+                'ingest_seconds': round(elapsed, 2),
+                'ingest_per_second': round(processed / elapsed, 1) if elapsed else 0,
+                'disk_mb': dir_size_mb(path),
+                'peak_rss_mb': peak_rss_mb(),
+                'writer': service.stats(),
+                'collections': measure(service, ingestor, args.probes),
+            }
+            rows.append(row)
+            print(f"  ✅ {size} 条: 写入 {row['ingest_per_second']:.0f} 条/秒, 库内 {row['stored']}, "
+                  f"磁盘 {row['disk_mb']} MB")
+    finally:
+        service.close()
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    
+    print_rows(rows)
+    result = {
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'config': {k: v for k, v in vars(args).items() if k != 'workdir'},
+        'checkpoints': rows,
+    }
+    RESULTS_DIR.mkdir(exist_ok=True)
+    out = RESULTS_DIR / f"store_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    out.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f"\n💾 结果已保存: {out}")
+
+
+if __name__ == '__main__':
+    main()
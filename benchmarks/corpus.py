@@ -0,0 +1,260 @@
+"""
+合成语料生成器 - 按真实的入库格式批量生成痛点、机会和 RSS 文章
+文本经过 pain_radar_v2 / opportunity_hunter 中真实的打标签和建记录函数，id 与元数据和线上一致；
+可控制完全重复 (同 id，应被查重挡下) 和近似重复 (改几个字，id 不同、向量相近) 的比例。
+第 i 条只由 (seed, i) 决定，生成百万条也不需要把前面的条目留在内存里
+
+用法:
+    python -m benchmarks.corpus --size 100000 --duplicate-rate 0.1 --near-duplicate-rate 0.1 --out corpus.jsonl.gz
+"""
+
+import sys
+import gzip
+import json
+import random
+import hashlib
+import argparse
+import datetime
+from pathlib import Path
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+EMBEDDING_DIM = 384     # 与 Chroma 默认模型 (all-MiniLM-L6-v2) 一致
+
+WORDS = ('agent api app benchmark billing build cache chat cli cloud code context cost dashboard data '
+         'debug deploy docs editor embedding error eval feature fine-tune gpu image index inference '
+         'integration key latency limit local log memory model monitor notebook open-source output '
+         'pipeline plugin pricing prompt quota rag release repo request response sdk search server '
+         'session speed stream team terminal test token tool training upload usage user video '
+         'vision voice web workflow workspace').split()
+OPPORTUNITY_PHRASES = ['raised a seed round to build', 'launches an open-source', 'new release of', 'startup founded to fix',
+                       'breakthrough in', 'Show HN: a tool for', 'Series A for', 'we built a faster']
+OPPORTUNITY_SOURCES = ['GitHub', 'HackerNews']
+COMMUNITY_FEEDS = ['Reddit - LocalLLaMA', 'Reddit - OpenAI', 'Reddit - Claude', 'Reddit - Cursor']
+RESEARCH_FEEDS = ['Reddit - Machine Learning', 'Hugging Face - Daily Papers', 'Y Combinator - Launches',
+                  'Product Hunt - Daily']
+
+# 近似重复: 转发、改标点、补一句之类的小改动
+NEAR_DUP_EDITS = [
+    lambda t: t + ' (edit)',
+    lambda t: t.replace(' ', '  ', 1),
+    lambda t: t.rstrip('.!?') + '!',
+    lambda t: 'RT ' + t,
+    lambda t: t + ' anyone else?',
+    lambda t: t.lower(),
+]
+
+
+@dataclass
+class CorpusConfig:
+    """语料配置"""
+    size: int = 10000
+    duplicate_rate: float = 0.1         # 完全重复 (与之前某条相同)
+    near_duplicate_rate: float = 0.1    # 近似重复 (之前某条的小改动)
+    article_share: float = 0.3          # RSS 文章占比
+    pain_share: float = 0.5             # 其余条目中痛点的占比，剩下的是机会
+    days: int = 180                     # 时间戳均匀分布在最近多少天内
+    seed: int = 42
+
+
+class SyntheticRecord(NamedTuple):
+    """一条待入库记录"""
+    index: int
+    kind: str               # pain / opportunity / article
+    variant: str            # original / duplicate / near_duplicate
+    base: int               # 原始条目序号 (重复和近似重复指向被复制的那条)
+    collection: str
+    doc_id: str
+    document: str
+    metadata: Dict
+
+
+class SyntheticCorpus:
+    """确定性语料: 第 i 条只由 (seed, i) 决定"""
+    
+    def __init__(self, config: CorpusConfig):
+        import pain_radar_v2 as pain
+        import opportunity_hunter as opp
+        import models
+        
+        self.config = config
+        self.pain = pain
+        self.opp = opp
+        self.models = models
+        self.products = list(pain.PAIN_KEYWORDS)
+        self.start = datetime.datetime.now() - datetime.timedelta(days=config.days)
+        # 词频近似 Zipf 分布
+        self.weights = [1 / (rank + 1) for rank in range(len(WORDS))]
+    
+    def _rng(self, *key) -> random.Random:
+        return random.Random(f"{self.config.seed}|{'|'.join(map(str, key))}")
+    
+    def __len__(self) -> int:
+        return self.config.size
+    
+    def __iter__(self) -> Iterator[SyntheticRecord]:
+        for index in range(self.config.size):
+            record = self.record(index)
+            if record is not None:
+                yield record
+    
+    # ---------- 原始条目 ----------
+    
+    def kind(self, base: int) -> str:
+        roll = self._rng('kind', base).random()
+        if roll < self.config.article_share:
+            return 'article'
+        if roll < self.config.article_share + self.config.pain_share * (1 - self.config.article_share):
+            return 'pain'
+        return 'opportunity'
+    
+    def topic(self, base: int) -> int:
+        """条目的话题 (产品 × 痛点词)，决定合成向量的聚类中心"""
+        rng = self._rng('topic', base)
+        product = rng.randrange(len(self.products))
+        keyword = rng.randrange(len(self.pain.PAIN_KEYWORDS[self.products[product]]))
+        return product * 16 + keyword
+    
+    def _filler(self, rng: random.Random, low: int, high: int) -> str:
+        return ' '.join(rng.choices(WORDS, weights=self.weights, k=rng.randint(low, high)))
+    
+    def text(self, base: int) -> Dict:
+        """原始条目的文本字段"""
+        rng = self._rng('text', base)
+        topic = self.topic(base)
+        product = self.products[topic // 16]
+        keyword = self.pain.PAIN_KEYWORDS[product][topic % 16]
+        kind = self.kind(base)
+        if kind == 'pain':
+            return {'source': rng.choice(['Twitter', 'HackerNews']), 'author': f"user{rng.randint(1, 50000)}",
+                    'text': f"{product} {keyword} when {self._filler(rng, 8, 40)} #{base}"}
+        if kind == 'article':
+            community = rng.random() < 0.5
+            return {'feed': rng.choice(COMMUNITY_FEEDS if community else RESEARCH_FEEDS), 'community': community,
+                    'title': f"{product} {keyword} {self._filler(rng, 3, 8)} #{base}",
+                    'summary': self._filler(rng, 20, 80)}
+        return {'source': rng.choice(OPPORTUNITY_SOURCES),
+                'title': f"{rng.choice(OPPORTUNITY_PHRASES)} {product} {self._filler(rng, 2, 6)} #{base}",
+                'description': self._filler(rng, 10, 40), 'stars': rng.randint(300, 50000)}
+    
+    # ---------- 记录 ----------
+    
+    def _variant(self, index: int):
+        """第 index 条是原创还是复制，复制时 base 为被复制的原创条目"""
+        rng = self._rng('variant', index)
+        roll = rng.random()
+        if index == 0 or roll >= self.config.duplicate_rate + self.config.near_duplicate_rate:
+            return index, 'original', rng
+        variant = 'duplicate' if roll < self.config.duplicate_rate else 'near_duplicate'
+        base = rng.randrange(index)
+        # 被选中的条目本身也是复制时，追溯到它复制的原创条目
+        while True:
+            origin, kind, _ = self._variant(base)
+            if kind == 'original':
+                return base, variant, rng
+            base = origin
+    
+    def record(self, index: int) -> Optional[SyntheticRecord]:
+        """第 index 条记录，被打标签规则过滤掉时为 None"""
+        base, variant, rng = self._variant(index)
+        
+        fields = self.text(base)
+        if variant == 'near_duplicate':
+            edit = rng.choice(NEAR_DUP_EDITS)
+            for key in ('text', 'title'):
+                if key in fields:
+                    fields[key] = edit(fields[key])
+        
+        built = self._build(self.kind(base), fields, base)
+        if built is None:
+            return None
+        collection, doc_id, document, metadata = built
+        # 完全重复保留原条目的时间，其余按序号铺满时间窗口
+        moment = base if variant == 'duplicate' else index
+        metadata['time'] = (self.start + datetime.timedelta(
+            days=self.config.days * moment / max(1, self.config.size))).isoformat()
+        return SyntheticRecord(index, self.kind(base), variant, base, collection, doc_id, document, metadata)
+    
+    def _build(self, kind: str, fields: Dict, base: int):
+        pain, opp, models = self.pain, self.opp, self.models
+        if kind == 'pain':
+            products, keywords = pain.tag_item(fields['text'])
+            item = models.pain(fields['source'], fields['author'], fields['text'], products, keywords)
+            if not pain.keep_pain(item):
+                return None
+            return pain.PAIN_COLLECTION, item.id, item.content, pain.pain_metadata(item)
+        
+        if kind == 'article':
+            article = models.article(fields['feed'], fields['title'], fields['summary'], f"https://example.com/{base}")
+            if fields['community']:
+                # 社区文章走痛点雷达的提取规则
+                for item in pain.reddit_pains([article]):
+                    return pain.PAIN_COLLECTION, item.id, item.content, pain.pain_metadata(item)
+                return None
+            item = next(opp.rss_opportunities([article]))
+        else:
+            item = models.opportunity(fields['source'], fields['title'], fields['description'],
+                                      f"https://example.com/{base}", category='OpenSource',
+                                      extra={'stars': fields['stars']})
+        return opp.OPPORTUNITY_COLLECTION, item.id, opp.opportunity_document(item), opp.opportunity_metadata(item)
+    
+    # ---------- 向量 ----------
+    
+    def embeddings(self, records: List[SyntheticRecord]):
+        """
+        合成向量: 话题中心 + 条目噪声，近似重复在原条目向量上再加少量噪声
+        
+        Returns:
+            numpy 数组 (len(records), EMBEDDING_DIM)，已归一化
+        """
+        import numpy as np
+        
+        vectors = np.empty((len(records), EMBEDDING_DIM), dtype=np.float32)
+        for row, record in enumerate(records):
+            centre = np.random.default_rng(self._seed('centre', self.topic(record.base))).standard_normal(EMBEDDING_DIM)
+            noise = np.random.default_rng(self._seed('noise', record.base)).standard_normal(EMBEDDING_DIM)
+            vector = centre + 0.6 * noise
+            if record.variant == 'near_duplicate':
+                vector += 0.05 * np.random.default_rng(self._seed('edit', record.index)).standard_normal(EMBEDDING_DIM)
+            vectors[row] = vector / np.linalg.norm(vector)
+        return vectors
+    
+    def _seed(self, *key) -> int:
+        return int.from_bytes(hashlib.blake2b(f"{self.config.seed}|{key}".encode(), digest_size=8).digest(), 'big')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='🧪 合成语料生成器')
+    parser.add_argument('--size', type=int, default=10000)
+    parser.add_argument('--duplicate-rate', type=float, default=0.1)
+    parser.add_argument('--near-duplicate-rate', type=float, default=0.1)
+    parser.add_argument('--days', type=int, default=180)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', default='-', help='输出 JSONL 文件 (.gz 结尾时压缩，- 为标准输出)')
+    args = parser.parse_args()
+    
+    corpus = SyntheticCorpus(CorpusConfig(size=args.size, duplicate_rate=args.duplicate_rate,
+                                          near_duplicate_rate=args.near_duplicate_rate,
+                                          days=args.days, seed=args.seed))
+    if args.out == '-':
+        out = sys.stdout
+    elif args.out.endswith('.gz'):
+        out = gzip.open(args.out, 'wt', encoding='utf-8')
+    else:
+        out = open(args.out, 'w', encoding='utf-8')
+    
+    counts: Dict[str, int] = {}
+    try:
+        for record in corpus:
+            counts[record.variant] = counts.get(record.variant, 0) + 1
+            out.write(json.dumps(record._asdict(), ensure_ascii=False) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"🧪 生成 {sum(counts.values())} 条: {counts}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
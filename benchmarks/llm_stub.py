@@ -0,0 +1,277 @@
+"""
+本地 Gemini 替身服务 - 不消耗真实配额地压测分析链路
+实现我们用到的 generateContent 与 streamGenerateContent (SSE) 子集，
+支持可配置的延迟分布、错误注入和确定性的固定输出
+
+用法:
+    python -m benchmarks.llm_stub --port 8089 --latency lognormal:2.0:0.5 --error-rate 0.1
+    GEMINI_BASE_URL=http://127.0.0.1:8089 PROXY_PORT=0 python run_monitor.py --pain
+"""
+
+import re
+import sys
+import json
+import math
+import time
+import random
+import hashlib
+import logging
+import argparse
+import threading
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_PATH_RE = re.compile(r'^/v1(?:beta|alpha)?/models/([^/:]+):(generateContent|streamGenerateContent)')
+
+REPORT_TEMPLATE = """### 🎯 Top 3 机会
+
+1. [{a}]
+   - 痛点: 用户反复提到 {a} 相关问题
+   - 市场规模: 中等
+   - 解决方案: 面向开发者的轻量工具
+   - 建议行动: 一周内做出 MVP
+
+2. [{b}]
+   - 痛点: {b} 的成本和稳定性
+   - 市场规模: 较大
+   - 解决方案: 托管服务
+   - 建议行动: 先做落地页验证需求
+
+3. [{c}]
+   - 痛点: {c} 缺少好用的替代品
+   - 市场规模: 小众
+   - 解决方案: 插件
+   - 建议行动: 在社区发帖收集反馈
+
+### 📊 数据统计
+- 总条目数: {lines}
+- 主要话题: {a}, {b}
+- 最热话题: {a}
+"""
+
+TOPICS = ['上下文管理', '限流重试', '账单监控', '代码索引', '图像一致性', '视频质检', '提示词版本', 'Agent 调试']
+
+
+@dataclass
+class StubConfig:
+    """替身服务配置"""
+    latency: str = 'fixed:0.5'       # fixed:秒 | uniform:最小:最大 | lognormal:中位数:sigma
+    error_rate: float = 0.0          # 注入错误的概率
+    error_codes: Tuple[int, ...] = (429, 503)
+    stream_chunks: int = 8           # 流式响应切分的片段数
+    seed: int = 42
+
+
+@dataclass
+class StubStats:
+    """请求统计"""
+    requests: int = 0
+    errors: int = 0
+    by_method: Dict[str, int] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    
+    def record(self, method: str, error: bool) -> None:
+        with self.lock:
+            self.requests += 1
+            self.errors += int(error)
+            self.by_method[method] = self.by_method.get(method, 0) + 1
+    
+    def snapshot(self) -> Dict:
+        with self.lock:
+            return {'requests': self.requests, 'errors': self.errors, 'by_method': dict(self.by_method)}
+
+
+def parse_latency(spec: str):
+    """
+    解析延迟分布描述
+    
+    Args:
+        spec: fixed:0.5 / uniform:0.2:1.5 / lognormal:1.0:0.5
+    
+    Returns:
+        采样函数 rng -> 秒
+    """
+    kind, *params = spec.split(':')
+    values = [float(p) for p in params]
+    if kind == 'fixed':
+        return lambda rng: values[0]
+    if kind == 'uniform':
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == 'lognormal':
+        mu = math.log(values[0])
+        return lambda rng: rng.lognormvariate(mu, values[1])
+    raise ValueError(f"未知的延迟分布: {spec}")
+
+
+def canned_output(prompt: str) -> str:
+    """按 prompt 生成确定性输出，识别分析链路中的三种 prompt"""
+    digest = int(hashlib.sha256(prompt.encode('utf-8')).hexdigest(), 16)
+    a, b, c = (TOPICS[(digest >> shift) % len(TOPICS)] for shift in (0, 8, 16))
+    lines = sum(1 for line in prompt.splitlines() if line.startswith('【') or line.startswith('['))
+    
+    if '## 当前摘要 (JSON)' in prompt:
+        return json.dumps({'entries': [
+            {'name': name, 'category': '工具', 'evidence': f'{name} 相关吐槽', 'mentions': lines or 1,
+             'sources': ['Twitter', 'HackerNews'], 'action': '验证需求'}
+            for name in dict.fromkeys((a, b, c))
+        ]}, ensure_ascii=False)
+    if 'Market Data Pre-Analyst' in prompt:
+        return "\n".join(f"[{name}] | {max(1, lines // 3)} | HackerNews | 多人反馈 {name}" for name in (a, b, c))
+    return REPORT_TEMPLATE.format(a=a, b=b, c=c, lines=lines)
+
+
+def _response_json(text: str, model: str) -> Dict:
+    return {
+        'candidates': [{
+            'content': {'parts': [{'text': text}], 'role': 'model'},
+            'finishReason': 'STOP',
+            'index': 0,
+        }],
+        'usageMetadata': {
+            'promptTokenCount': 0,
+            'candidatesTokenCount': len(text) // 4,
+            'totalTokenCount': len(text) // 4,
+        },
+        'modelVersion': model,
+    }
+
+
+def _prompt_text(body: Dict) -> str:
+    parts = []
+    for content in body.get('contents', []):
+        for part in content.get('parts', []):
+            parts.append(part.get('text', ''))
+    return ''.join(parts)
+
+
+def make_handler(config: StubConfig, stats: StubStats):
+    """构造请求处理器"""
+    rng = random.Random(config.seed)
+    rng_lock = threading.Lock()
+    sample_latency = parse_latency(config.latency)
+    
+    def draw() -> Tuple[float, bool, int]:
+        with rng_lock:
+            return (sample_latency(rng), rng.random() < config.error_rate, rng.choice(config.error_codes))
+    
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        
+        def log_message(self, fmt, *args):
+            logger.debug(fmt % args)
+        
+        def _send_json(self, status: int, payload: Dict) -> None:
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def do_GET(self):
+            if self.path == '/stats':
+                self._send_json(200, stats.snapshot())
+            else:
+                self._send_json(404, {'error': {'code': 404, 'message': 'not found', 'status': 'NOT_FOUND'}})
+        
+        def do_POST(self):
+            match = _PATH_RE.match(self.path)
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+            if not match:
+                self._send_json(404, {'error': {'code': 404, 'message': 'not found', 'status': 'NOT_FOUND'}})
+                return
+            
+            model, method = match.groups()
+            latency, fail, code = draw()
+            stats.record(method, fail)
+            
+            if fail:
+                time.sleep(min(latency, 0.2))
+                status = 'RESOURCE_EXHAUSTED' if code == 429 else 'UNAVAILABLE'
+                self._send_json(code, {'error': {'code': code, 'message': 'injected error', 'status': status}})
+                return
+            
+            text = canned_output(_prompt_text(body))
+            if method == 'generateContent':
+                time.sleep(latency)
+                self._send_json(200, _response_json(text, model))
+                return
+            
+            # 流式: 首包等待一半延迟，其余延迟均摊到各片段
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            n = max(1, config.stream_chunks)
+            size = max(1, math.ceil(len(text) / n))
+            pieces = [text[i:i + size] for i in range(0, len(text), size)] or ['']
+            time.sleep(latency / 2)
+            for piece in pieces:
+                event = f"data: {json.dumps(_response_json(piece, model), ensure_ascii=False)}\r\n\r\n".encode('utf-8')
+                self.wfile.write(f"{len(event):X}\r\n".encode() + event + b"\r\n")
+                self.wfile.flush()
+                time.sleep(latency / 2 / len(pieces))
+            self.wfile.write(b"0\r\n\r\n")
+    
+    return Handler
+
+
+def start_server(config: Optional[StubConfig] = None, host: str = '127.0.0.1',
+                 port: int = 0) -> Tuple[ThreadingHTTPServer, StubStats]:
+    """
+    在后台线程启动替身服务
+    
+    Args:
+        config: 服务配置
+        host: 监听地址
+        port: 端口 (0 为随机端口)
+    
+    Returns:
+        (server, stats)，server.server_address 为实际地址
+    """
+    config = config or StubConfig()
+    stats = StubStats()
+    server = ThreadingHTTPServer((host, port), make_handler(config, stats))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+def main(argv: Optional[List[str]] = None):
+    logging.basicConfig(level=logging.INFO)
+    
+    parser = argparse.ArgumentParser(description='🧪 本地 Gemini 替身服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', default='fixed:0.5', help='fixed:秒 | uniform:最小:最大 | lognormal:中位数:sigma')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-codes', default='429,503')
+    parser.add_argument('--stream-chunks', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+    
+    config = StubConfig(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        error_codes=tuple(int(c) for c in args.error_codes.split(',')),
+        stream_chunks=args.stream_chunks,
+        seed=args.seed,
+    )
+    parse_latency(config.latency)
+    
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(config, StubStats()))
+    print(f"🧪 Gemini 替身服务: http://{args.host}:{args.port} (延迟 {config.latency}, 错误率 {config.error_rate})")
+    print(f"   使用: GEMINI_BASE_URL=http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 已停止")
+        sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
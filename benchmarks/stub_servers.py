@@ -0,0 +1,377 @@
+"""
+数据源替身服务 - 不联网跑完整监控循环
+一个本地 HTTP 服务按路径模拟各数据源，返回录制的或合成的数据，支持可配置的延迟分布和错误注入:
+
+    /hn/v0/topstories.json, /hn/v0/item/<id>.json   HN Firebase API
+    /github/search/repositories                      GitHub 仓库搜索
+    /rss/<源键名>                                    RSSHunter.RSS_SOURCES 中的每个 RSS 源
+    /hf/papers                                       Hugging Face Daily Papers 页面
+    /pushplus/send                                   PushPlus 推送
+    /stats                                           请求统计
+
+录制数据: --fixtures 目录下与路径同名的文件优先返回 (如 rss/producthunt.xml、hn/item/123.json、
+hf/papers.html、github/search/repositories.json)，没有时返回合成数据。
+合成数据按轮次 (generation) 变化: 每轮约 fresh_rate 比例的条目是新的，其余与上一轮相同，用来模拟增量抓取和查重
+
+用法:
+    python -m benchmarks.stub_servers --port 8090 --latency lognormal:0.2:0.5 --error-rate 0.05
+    HN_API_BASE=http://127.0.0.1:8090/hn/v0 GITHUB_SEARCH_URL=http://127.0.0.1:8090/github/search/repositories \\
+    RSS_BASE_URL=http://127.0.0.1:8090/rss HF_PAPERS_URL=http://127.0.0.1:8090/hf/papers \\
+    PUSHPLUS_URL=http://127.0.0.1:8090/pushplus/send PROXY_PORT=0 python run_monitor.py --all
+(Twitter 与 Google Trends 走第三方客户端，不在替身范围内)
+"""
+
+import re
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import datetime
+import threading
+from pathlib import Path
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+from xml.sax.saxutils import escape
+
+from benchmarks.llm_stub import StubStats, parse_latency
+
+logger = logging.getLogger(__name__)
+
+ROUTES = ('hn', 'github', 'rss', 'hf', 'pushplus')
+
+PRODUCTS = ['ChatGPT', 'Claude', 'DeepSeek', 'Cursor', 'Midjourney', 'Sora']
+COMPLAINTS = ["doesn't work after the update", 'is so slow today', 'hit the rate limit again',
+              'crash on a large repo', 'hallucination in code review', 'too expensive for small teams',
+              'context window runs out', 'quality drop since last week']
+NEUTRAL = ['launches an open-source agent framework', 'raised $20M in a Series A', 'new release with faster inference',
+           'founded to fix LLM evals', 'shares a breakthrough on small models', 'weekly discussion thread']
+FILLER = ('details logs screenshots workflow team users model prompt output latency pricing '
+          'support docs issue thread update feedback').split()
+
+_ITEM_RE = re.compile(r'^/hn/v0/item/(\d+)\.json$')
+
+
+@dataclass
+class SourceStubConfig:
+    """替身服务配置"""
+    latency: str = 'fixed:0.05'      # fixed:秒 | uniform:最小:最大 | lognormal:中位数:sigma
+    route_latency: Dict[str, str] = field(default_factory=dict)   # 按路由覆盖延迟，如 {'rss': 'uniform:0.2:1'}
+    error_rate: float = 0.0          # 注入错误的概率 (PushPlus 除外)
+    error_codes: Tuple[int, ...] = (500, 503)
+    pushplus_error_rate: float = 0.0
+    feed_items: int = 30             # 每个 RSS 源的条目数
+    hn_stories: int = 60
+    papers: int = 20
+    pain_rate: float = 0.5           # 合成条目中带痛点描述的比例
+    fresh_rate: float = 0.2          # 每轮新出现的条目比例
+    fixtures: Optional[str] = None
+    seed: int = 42
+
+
+class SyntheticCorpus:
+    """按 (源, 序号, 轮次) 确定性地生成条目"""
+    
+    def __init__(self, config: SourceStubConfig):
+        self.config = config
+        self.generation = 0
+    
+    def _rng(self, *key) -> random.Random:
+        return random.Random(f"{self.config.seed}|{'|'.join(map(str, key))}")
+    
+    def version(self, source: str, index: int) -> int:
+        """条目最近一次刷新的轮次 (0 为从未刷新)"""
+        for gen in range(self.generation, 0, -1):
+            if self._rng(source, index, gen).random() < self.config.fresh_rate:
+                return gen
+        return 0
+    
+    def token(self, source: str, index: int) -> str:
+        """条目标识: 刷新过的条目带上轮次，其余保持不变"""
+        version = self.version(source, index)
+        return f"{index}g{version}" if version else str(index)
+    
+    def text(self, source: str, token: str) -> Tuple[str, str]:
+        """(标题, 正文)"""
+        rng = self._rng(source, token)
+        product = rng.choice(PRODUCTS)
+        if rng.random() < self.config.pain_rate:
+            title = f"{product} {rng.choice(COMPLAINTS)} #{token}"
+        else:
+            title = f"{product} {rng.choice(NEUTRAL)} #{token}"
+        body = ' '.join(rng.choice(FILLER) for _ in range(rng.randint(15, 60)))
+        return title, body
+    
+    # ---------- 各数据源 ----------
+    
+    def hn_top(self) -> List[int]:
+        return [self.version('hn', i) * 1000000 + i + 1 for i in range(self.config.hn_stories)]
+    
+    def hn_item(self, item_id: int) -> Dict:
+        rng = self._rng('hn-item', item_id)
+        title, body = self.text('hn', item_id)
+        return {
+            'id': item_id, 'type': 'story', 'by': f"user{rng.randint(1, 999)}",
+            'score': rng.randint(20, 600), 'time': int(time.time()) - rng.randint(0, 86400),
+            'title': title, 'text': body, 'url': f"https://example.com/hn/{item_id}",
+        }
+    
+    def github_search(self, query: str, per_page: int) -> Dict:
+        items = []
+        for i in range(per_page):
+            token = self.token(f"github:{query}", i)
+            rng = self._rng('github', query, token)
+            title, body = self.text(f"github:{query}", token)
+            updated = datetime.datetime.now() - datetime.timedelta(days=rng.randint(0, 120))
+            name = f"org{rng.randint(1, 99)}/{query.split()[0].lower()}-{token}"
+            items.append({
+                'full_name': name, 'description': title, 'html_url': f"https://github.com/{name}",
+                'stargazers_count': rng.randint(300, 20000), 'language': rng.choice(['Python', 'TypeScript', 'Rust']),
+                'updated_at': updated.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            })
+        return {'total_count': per_page, 'items': items}
+    
+    def rss(self, key: str) -> str:
+        now = datetime.datetime.now(datetime.timezone.utc)
+        entries = []
+        for i in range(self.config.feed_items):
+            token = self.token(f"rss:{key}", i)
+            title, body = self.text(f"rss:{key}", token)
+            published = (now - datetime.timedelta(minutes=i * 7)).strftime('%a, %d %b %Y %H:%M:%S +0000')
+            entries.append(
+                f"<item><title>{escape(title)}</title><link>https://example.com/{key}/{token}</link>"
+                f"<description>{escape(body)}</description><pubDate>{published}</pubDate>"
+                f"<guid>{key}-{token}</guid></item>"
+            )
+        return ('<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+                f"<title>{escape(key)}</title><link>https://example.com/{key}</link><description>stub</description>"
+                + ''.join(entries) + '</channel></rss>')
+    
+    def hf_papers(self) -> str:
+        articles = []
+        for i in range(self.config.papers):
+            token = self.token('hf', i)
+            title, body = self.text('hf', token)
+            articles.append(f'<article><a href="/papers/{token}"><h3>{escape(title)}</h3></a><p>{escape(body)}</p></article>')
+        return '<html><body><main>' + ''.join(articles) + '</main></body></html>'
+
+
+def make_handler(config: SourceStubConfig, corpus: SyntheticCorpus, stats: StubStats):
+    """构造请求处理器"""
+    rng = random.Random(config.seed)
+    rng_lock = threading.Lock()
+    default_latency = parse_latency(config.latency)
+    latencies = {route: parse_latency(spec) for route, spec in config.route_latency.items()}
+    fixtures = Path(config.fixtures) if config.fixtures else None
+    
+    def draw(route: str) -> Tuple[float, bool, int]:
+        error_rate = config.pushplus_error_rate if route == 'pushplus' else config.error_rate
+        with rng_lock:
+            return (latencies.get(route, default_latency)(rng), rng.random() < error_rate,
+                    rng.choice(config.error_codes))
+    
+    def fixture(path: str) -> Optional[bytes]:
+        if fixtures is None:
+            return None
+        base = fixtures / path.lstrip('/')
+        for candidate in (base, *(base.with_name(base.name + ext) for ext in ('.json', '.xml', '.html'))):
+            if candidate.is_file():
+                return candidate.read_bytes()
+        return None
+    
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        
+        def log_message(self, fmt, *args):
+            logger.debug(fmt % args)
+        
+        def _send(self, status: int, body: bytes, content_type: str) -> None:
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def _send_json(self, status: int, payload) -> None:
+            self._send(status, json.dumps(payload, ensure_ascii=False).encode('utf-8'), 'application/json')
+        
+        def _route(self, method: str) -> None:
+            url = urlsplit(self.path)
+            path = url.path
+            if path == '/stats':
+                self._send_json(200, {**stats.snapshot(), 'generation': corpus.generation})
+                return
+            route = path.strip('/').split('/', 1)[0]
+            if route not in ROUTES:
+                self._send_json(404, {'error': 'not found'})
+                return
+            
+            latency, fail, code = draw(route)
+            stats.record(route, fail)
+            time.sleep(latency)
+            if fail:
+                self._send_json(code, {'error': 'injected error', 'code': code})
+                return
+            
+            recorded = fixture(path)
+            if route == 'pushplus':
+                self._send_json(200, {'code': 200, 'msg': '请求成功', 'data': f"stub-{int(time.time() * 1000)}"})
+            elif recorded is not None:
+                content_type = 'application/json' if route in ('hn', 'github') else 'text/html' if route == 'hf' else 'application/rss+xml'
+                self._send(200, recorded, content_type)
+            elif path == '/hn/v0/topstories.json':
+                self._send_json(200, corpus.hn_top())
+            elif _ITEM_RE.match(path):
+                self._send_json(200, corpus.hn_item(int(_ITEM_RE.match(path).group(1))))
+            elif path == '/github/search/repositories':
+                query = parse_qs(url.query)
+                keyword = query.get('q', [''])[0].split(' stars:')[0] or 'ai'
+                self._send_json(200, corpus.github_search(keyword, int(query.get('per_page', ['3'])[0])))
+            elif route == 'rss':
+                self._send(200, corpus.rss(path.rsplit('/', 1)[-1]).encode('utf-8'), 'application/rss+xml')
+            elif path == '/hf/papers':
+                self._send(200, corpus.hf_papers().encode('utf-8'), 'text/html; charset=utf-8')
+            else:
+                self._send_json(404, {'error': 'not found'})
+        
+        def do_GET(self):
+            self._route('GET')
+        
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            self.rfile.read(length)
+            self._route('POST')
+    
+    return Handler
+
+
+class _Server(ThreadingHTTPServer):
+    # 抓取是高并发的，默认的监听队列 (5) 会丢 SYN，客户端要等 1 秒重传
+    request_queue_size = 256
+    daemon_threads = True
+
+
+class SourceStubServer:
+    """后台线程运行的替身服务"""
+    
+    def __init__(self, config: Optional[SourceStubConfig] = None, host: str = '127.0.0.1', port: int = 0):
+        self.config = config or SourceStubConfig()
+        self.corpus = SyntheticCorpus(self.config)
+        self.stats = StubStats()
+        self.server = _Server((host, port), make_handler(self.config, self.corpus, self.stats))
+    
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def start(self) -> 'SourceStubServer':
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+    
+    def advance(self) -> int:
+        """进入下一轮，部分条目刷新"""
+        self.corpus.generation += 1
+        return self.corpus.generation
+    
+    def shutdown(self) -> None:
+        self.server.shutdown()
+    
+    def apply(self, sources: bool = True) -> None:
+        """
+        把监控模块的数据源地址指向本服务 (进程内，在工作目录切换之后调用)
+        发件箱改用本服务的 PushPlus 且不等待合并窗口
+        
+        Args:
+            sources: 是否替换数据源地址 (回放卷带时保留录制时的地址)
+        """
+        import cycle
+        import outbox
+        import rss_hunter
+        import opportunity_hunter
+        
+        base = self.base_url
+        if sources:
+            cycle.HN_API_BASE = f"{base}/hn/v0"
+            opportunity_hunter.GITHUB_SEARCH_URL = f"{base}/github/search/repositories"
+            rss_hunter.HF_PAPERS_URL = f"{base}/hf/papers"
+            rss_hunter.RSS_BASE_URL = f"{base}/rss"
+        outbox.PUSHPLUS_URL = f"{base}/pushplus/send"
+        outbox.PUSHPLUS_TOKEN = 'stub-token'
+        outbox._outbox = outbox.Outbox(token='stub-token', url=outbox.PUSHPLUS_URL, merge_window=0)
+        outbox._outbox.start()
+
+
+def parse_route_latency(specs: List[str]) -> Dict[str, str]:
+    """['rss=uniform:0.2:1', ...] → {'rss': 'uniform:0.2:1'}"""
+    result = {}
+    for spec in specs or []:
+        route, _, latency = spec.partition('=')
+        if route not in ROUTES or not latency:
+            raise ValueError(f"无效的路由延迟: {spec}")
+        parse_latency(latency)
+        result[route] = latency
+    return result
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """替身服务的命令行参数 (bench_cycle 复用)"""
+    parser.add_argument('--latency', default='fixed:0.05', help='fixed:秒 | uniform:最小:最大 | lognormal:中位数:sigma')
+    parser.add_argument('--route-latency', nargs='*', default=[], help='按路由覆盖延迟，如 rss=uniform:0.2:1 hn=fixed:0.1')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-codes', default='500,503')
+    parser.add_argument('--pushplus-error-rate', type=float, default=0.0)
+    parser.add_argument('--feed-items', type=int, default=30)
+    parser.add_argument('--hn-stories', type=int, default=60)
+    parser.add_argument('--papers', type=int, default=20)
+    parser.add_argument('--pain-rate', type=float, default=0.5)
+    parser.add_argument('--fresh-rate', type=float, default=0.2)
+    parser.add_argument('--fixtures', default=None, help='录制数据目录')
+    parser.add_argument('--seed', type=int, default=42)
+
+
+def config_from_args(args) -> SourceStubConfig:
+    config = SourceStubConfig(
+        latency=args.latency,
+        route_latency=parse_route_latency(args.route_latency),
+        error_rate=args.error_rate,
+        error_codes=tuple(int(c) for c in args.error_codes.split(',')),
+        pushplus_error_rate=args.pushplus_error_rate,
+        feed_items=args.feed_items,
+        hn_stories=args.hn_stories,
+        papers=args.papers,
+        pain_rate=args.pain_rate,
+        fresh_rate=args.fresh_rate,
+        fixtures=args.fixtures,
+        seed=args.seed,
+    )
+    parse_latency(config.latency)
+    return config
+
+
+def main(argv: Optional[List[str]] = None):
+    logging.basicConfig(level=logging.INFO)
+    
+    parser = argparse.ArgumentParser(description='🧪 数据源替身服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    
+    stub = SourceStubServer(config_from_args(args), args.host, args.port)
+    print(f"🧪 数据源替身服务: {stub.base_url} (延迟 {stub.config.latency}, 错误率 {stub.config.error_rate})")
+    print(f"   使用: HN_API_BASE={stub.base_url}/hn/v0 GITHUB_SEARCH_URL={stub.base_url}/github/search/repositories \\\n"
+          f"         RSS_BASE_URL={stub.base_url}/rss HF_PAPERS_URL={stub.base_url}/hf/papers \\\n"
+          f"         PUSHPLUS_URL={stub.base_url}/pushplus/send PROXY_PORT=0 python run_monitor.py --all")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 已停止")
+        sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+"""
+HTTP 录制 / 回放 - run_monitor.py --record / --replay 使用
+录制: 一轮循环里经过 CycleContext 的所有出站交换 (HN、GitHub、RSS、HF、代理出去的请求) 以及
+pytrends / twikit 这类第三方客户端的返回值，按发生顺序写进 gzip 压缩的 JSONL 卷带 (cassette)。
+回放: 不联网，按请求 (方法 + 地址 + 参数 + 请求体) 把录到的响应原样返回，
+并按录制时的耗时等待 (--replay-speed 10 表示快 10 倍，0 表示不等待)，
+用来离线重现某一轮有问题的循环，或者让每个版本跑同一份负载
+
+卷带格式 (每行一个 JSON):
+    {"kind": "meta", "version": 1, "recorded_at": ...}
+    {"kind": "http", "t": 相对开始的秒数, "method", "url", "params", "json",
+     "status", "headers", "body" 或 "body_b64", "final_url", "elapsed", "error"}
+    {"kind": "call", "t", "name", "result", "elapsed", "error"}
+
+多进程模式下录制 / 回放在抓取进程里进行 (配置经环境变量传给子进程)
+"""
+
+import os
+import json
+import gzip
+import time
+import base64
+import asyncio
+import logging
+from pathlib import Path
+from collections import deque
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ==================== 配置 ====================
+
+# record / replay，留空为关闭，--record / --replay 优先
+CASSETTE_MODE = os.getenv('CASSETTE_MODE', '')
+# 录制时 {ts} 替换为本轮开始时间 (守护进程每轮一个文件)；回放时为要回放的卷带
+CASSETTE_PATH = os.getenv('CASSETTE_PATH') or './logs/cassette-{ts}.jsonl.gz'
+# 回放速度倍数: 1 为原速，10 为快 10 倍，0 为不等待
+REPLAY_SPEED = float(os.getenv('REPLAY_SPEED', 1))
+
+MODES = ('record', 'replay')
+VERSION = 1
+
+
+class CassetteMiss(Exception):
+    """回放时卷带里没有这个请求"""
+
+
+def request_key(method: str, url: str, params: Optional[Dict] = None, body: Any = None) -> str:
+    """请求的匹配键 (参数和请求体按键排序)"""
+    return json.dumps([method.upper(), url, params or {}, body], sort_keys=True, ensure_ascii=False, default=str)
+
+
+class Recorder:
+    """录制一轮循环，结束时写卷带"""
+    
+    replaying = False
+    
+    def __init__(self, path: str):
+        self.path = Path(path.replace('{ts}', datetime.now().strftime('%Y%m%d-%H%M%S')))
+        self.started = time.perf_counter()
+        self.entries: List[Dict] = []
+    
+    def _offset(self, start: float) -> float:
+        return round(start - self.started, 4)
+    
+    def record_http(self, start: float, method: str, url: str, params: Optional[Dict], body: Any,
+                    response=None, error: Optional[str] = None) -> None:
+        entry = {
+            'kind': 'http', 't': self._offset(start), 'method': method.upper(), 'url': url,
+            'params': params or {}, 'json': body,
+            'elapsed': round(time.perf_counter() - start, 4), 'error': error,
+        }
+        if response is not None:
+            entry.update(status=response.status, headers=response.headers, final_url=response.url)
+            try:
+                entry['body'] = response.body.decode('utf-8')
+            except UnicodeDecodeError:
+                entry['body_b64'] = base64.b64encode(response.body).decode('ascii')
+        self.entries.append(entry)
+    
+    async def call(self, name: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        start = time.perf_counter()
+        try:
+            result = await factory()
+        except Exception as e:
+            self.entries.append({'kind': 'call', 't': self._offset(start), 'name': name, 'result': None,
+                                 'elapsed': round(time.perf_counter() - start, 4), 'error': str(e)})
+            raise
+        self.entries.append({'kind': 'call', 't': self._offset(start), 'name': name, 'result': result,
+                             'elapsed': round(time.perf_counter() - start, 4), 'error': None})
+        return result
+    
+    def close(self) -> None:
+        """按开始时间排序后写卷带"""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with gzip.open(self.path, 'wt', encoding='utf-8') as f:
+                meta = {'kind': 'meta', 'version': VERSION, 'recorded_at': datetime.now().isoformat(),
+                        'duration': round(time.perf_counter() - self.started, 3)}
+                f.write(json.dumps(meta) + '\n')
+                for entry in sorted(self.entries, key=lambda e: e['t']):
+                    f.write(json.dumps(entry, ensure_ascii=False, default=str) + '\n')
+            print(f"📼 已录制 {len(self.entries)} 次交换 → {self.path}")
+        except Exception as e:
+            logger.warning(f"写入卷带失败: {str(e)}")
+
+
+class Player:
+    """回放一份卷带，每轮循环重新从头开始"""
+    
+    replaying = True
+    
+    def __init__(self, entries: List[Dict], speed: float = REPLAY_SPEED):
+        self.speed = speed
+        self.queues: Dict[str, deque] = {}
+        self.last: Dict[str, Dict] = {}
+        self.hits = 0
+        self.misses = 0
+        for entry in entries:
+            if entry['kind'] == 'http':
+                key = request_key(entry['method'], entry['url'], entry.get('params'), entry.get('json'))
+            else:
+                key = f"call:{entry['name']}"
+            self.queues.setdefault(key, deque()).append(entry)
+    
+    def _next(self, key: str) -> Optional[Dict]:
+        """同一请求录到多次时按顺序返回，用完后重复最后一次"""
+        queue = self.queues.get(key)
+        if queue:
+            self.last[key] = queue.popleft()
+        entry = self.last.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+    
+    async def _wait(self, entry: Dict) -> None:
+        if self.speed > 0 and entry.get('elapsed'):
+            await asyncio.sleep(entry['elapsed'] / self.speed)
+    
+    async def replay_http(self, method: str, url: str, params: Optional[Dict], body: Any) -> Tuple[Dict, bytes]:
+        """
+        回放一次 HTTP 交换
+        
+        Returns:
+            (卷带条目, 响应体)
+        
+        Raises:
+            CassetteMiss: 卷带里没有这个请求
+        """
+        entry = self._next(request_key(method, url, params, body))
+        if entry is None:
+            raise CassetteMiss(f"卷带中没有 {method.upper()} {url}")
+        await self._wait(entry)
+        if 'body_b64' in entry:
+            return entry, base64.b64decode(entry['body_b64'])
+        return entry, (entry.get('body') or '').encode('utf-8')
+    
+    async def call(self, name: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._next(f"call:{name}")
+        if entry is None:
+            raise CassetteMiss(f"卷带中没有 {name} 的调用")
+        await self._wait(entry)
+        if entry.get('error'):
+            raise RuntimeError(entry['error'])
+        return entry['result']
+    
+    def close(self) -> None:
+        print(f"📼 回放: 命中 {self.hits}, 未录到 {self.misses}")
+
+
+def load(path: str) -> List[Dict]:
+    """读取卷带条目 (不含 meta 行)"""
+    entries = []
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            entry = json.loads(line)
+            if entry.get('kind') == 'meta':
+                if entry.get('version') != VERSION:
+                    raise ValueError(f"不支持的卷带版本: {entry.get('version')}")
+                continue
+            entries.append(entry)
+    return entries
+
+
+_mode = CASSETTE_MODE
+_path = CASSETTE_PATH
+_speed = REPLAY_SPEED
+_entries: Optional[List[Dict]] = None
+
+
+def configure(mode: Optional[str], path: Optional[str] = None, speed: Optional[float] = None) -> None:
+    """
+    开启录制或回放
+    
+    Args:
+        mode: record / replay，空值表示关闭
+        path: 卷带路径 (录制时可含 {ts})
+        speed: 回放速度倍数
+    """
+    global _mode, _path, _speed, _entries
+    if mode and mode not in MODES:
+        raise ValueError(f"未知的卷带模式: {mode}")
+    _mode = mode or ''
+    _path = path or CASSETTE_PATH
+    _speed = REPLAY_SPEED if speed is None else speed
+    _entries = None
+    if _mode == 'replay':
+        _entries = load(_path)
+        print(f"📼 回放卷带 {_path}: {len(_entries)} 次交换, 速度 {_speed:g}x")
+    elif _mode == 'record':
+        print(f"📼 录制模式: 每轮写入 {_path}")
+    # 多进程模式的抓取进程用 spawn 启动，经环境变量继承配置
+    os.environ['CASSETTE_MODE'] = _mode
+    os.environ['CASSETTE_PATH'] = _path
+    os.environ['REPLAY_SPEED'] = str(_speed)
+
+
+def session():
+    """
+    一轮循环的录制器或回放器 (CycleContext 进入时调用)，未开启时返回 None
+    """
+    global _entries
+    if _mode == 'record':
+        return Recorder(_path)
+    if _mode == 'replay':
+        if _entries is None:
+            _entries = load(_path)
+        return Player(_entries, _speed)
+    return None
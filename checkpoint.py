@@ -0,0 +1,395 @@
+"""
+循环检查点 - 进程在一轮循环中途退出 (OOM、容器重启、Gemini 超时) 后，下一轮从断点继续
+记录在 SQLite 里 (与向量库同一个卷):
+  producers  各模块已完成的数据源 (数据源级游标)，续跑时不再抓取
+  items      本轮已入库的会话条目，续跑时恢复到 current_session_*，不会因为已在 Chroma 里被查重挡掉
+  stages     各模块的阶段: fetched 抓取完成 / analysis 分析结果 / delivered 报告已交付 (或无需交付)
+只有进程真的中断 (本机记录的进程已不在) 的一轮才续跑，已完成的抓取、入库 (含向量) 和 LLM 分析都不会重做。
+一轮的所有模块都成功、且有新条目的模块报告都已交付后，该轮才标记为完成；
+跑完但有报告未交付 (如 Gemini 不可用、模块超时) 的一轮标记为 pending，下一轮照常重新抓取，
+并把它未交付的条目带入下一轮一起分析，最多连续带入 CHECKPOINT_MAX_RESUMES 轮
+
+未开启或没有进行中的循环时，本模块的函数都是空操作
+"""
+
+import os
+import json
+import time
+import socket
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from models import Item
+
+logger = logging.getLogger(__name__)
+
+# ==================== 配置 ====================
+
+CHECKPOINT_ENABLED = os.getenv('CHECKPOINT_ENABLED', 'true').lower() == 'true'
+CHECKPOINT_DB = Path(os.getenv('CHECKPOINT_DB', './my_market_brain/checkpoint.db'))
+# 中断超过该秒数的循环不再续跑，直接开始新一轮
+CHECKPOINT_MAX_AGE = float(os.getenv('CHECKPOINT_MAX_AGE', 21600))
+# 同一轮最多续跑几次、未交付的条目最多连续带入几轮 (避免反复失败的一轮一直占着后续循环)
+CHECKPOINT_MAX_RESUMES = int(os.getenv('CHECKPOINT_MAX_RESUMES', 3))
+# 保留最近几轮的检查点记录
+CHECKPOINT_KEEP = int(os.getenv('CHECKPOINT_KEEP', 20))
+# 会话条目攒够该条数或距上次写入超过该秒数时批量写入 (进程被杀时最多丢这么多条的记录)
+CHECKPOINT_FLUSH_ITEMS = int(os.getenv('CHECKPOINT_FLUSH_ITEMS', 100))
+CHECKPOINT_FLUSH_INTERVAL = float(os.getenv('CHECKPOINT_FLUSH_INTERVAL', 1))
+
+# 循环状态: running 进行中 (或中断) | pending 跑完但有报告未交付 | carried 未交付条目已带入后续一轮
+#          | done 完成 | abandoned 放弃续跑
+# host / pid 为执行该轮的进程，carried 为未交付条目已连续带入的轮数
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cycles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'running',
+    resumes INTEGER NOT NULL DEFAULT 0,
+    host TEXT,
+    pid INTEGER,
+    carried INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS producers (
+    cycle_id INTEGER NOT NULL,
+    scope TEXT NOT NULL,
+    name TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (cycle_id, scope, name)
+);
+CREATE TABLE IF NOT EXISTS items (
+    cycle_id INTEGER NOT NULL,
+    scope TEXT NOT NULL,
+    doc_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    entry TEXT NOT NULL,
+    PRIMARY KEY (cycle_id, scope, doc_id)
+);
+CREATE TABLE IF NOT EXISTS stages (
+    cycle_id INTEGER NOT NULL,
+    scope TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    payload TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (cycle_id, scope, stage)
+);
+"""
+# 旧版数据库缺少的列
+MIGRATIONS = {
+    'host': "ALTER TABLE cycles ADD COLUMN host TEXT",
+    'pid': "ALTER TABLE cycles ADD COLUMN pid INTEGER",
+    'carried': "ALTER TABLE cycles ADD COLUMN carried INTEGER NOT NULL DEFAULT 0",
+}
+
+
+def _process_alive(pid: Optional[int]) -> bool:
+    """本机上 pid 是否是另一个仍在运行的进程 (自己的 pid 视为已退出: 容器重启后 pid 常被复用)"""
+    if not pid or pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+class CycleCheckpoint:
+    """一轮循环的检查点"""
+    
+    def __init__(self, db_path: Path = CHECKPOINT_DB, max_age: float = CHECKPOINT_MAX_AGE,
+                 max_resumes: int = CHECKPOINT_MAX_RESUMES):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # 条目在事件循环里写入，交付状态在渲染线程里写入
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+        self._closing = False
+        self.done = False
+        self._buffer: List[tuple] = []          # 待写入的会话条目
+        self._seq: Dict[str, int] = {}          # 各模块下一条会话条目的序号
+        self._flushed_at = time.monotonic()
+        self.host = socket.gethostname()
+        self.carried = 0
+        self.cycle_id, self.resumed = self._open(max_age, max_resumes)
+    
+    def _migrate(self) -> None:
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(cycles)")}
+        with self._conn:
+            for column, statement in MIGRATIONS.items():
+                if column not in columns:
+                    self._conn.execute(statement)
+    
+    def _open(self, max_age: float, max_resumes: int):
+        """续跑本机最近一轮中断的循环；没有可续跑的则新建，并带入之前各轮未交付的条目"""
+        now = time.time()
+        with self._lock, self._conn:
+            # 其他主机的循环由它们自己续跑 (升级前的记录没有 host，视为本机)
+            rows = self._conn.execute(
+                "SELECT id, updated_at, resumes, status, pid, carried FROM cycles "
+                "WHERE status IN ('running', 'pending') AND (host = ? OR host IS NULL) ORDER BY id DESC",
+                (self.host,)
+            ).fetchall()
+            interrupted = [row for row in rows if row[3] == 'running' and not _process_alive(row[4])]
+            if interrupted:
+                cycle_id, updated_at, resumes = interrupted[0][:3]
+                if now - updated_at <= max_age and resumes < max_resumes:
+                    self._conn.execute("UPDATE cycles SET resumes = resumes + 1, updated_at = ?, pid = ? WHERE id = ?",
+                                       (now, os.getpid(), cycle_id))
+                    return cycle_id, True
+                self._conn.executemany("UPDATE cycles SET status = 'abandoned' WHERE id = ?",
+                                       [(row[0],) for row in interrupted])
+                print(f"⚠️ 放弃续跑第 {cycle_id} 轮 (已续跑 {resumes} 次或中断过久)")
+            
+            pending = sorted(row for row in rows if row[3] == 'pending')
+            carry = [row for row in pending if now - row[1] <= max_age and row[5] < max_resumes]
+            self.carried = max((row[5] for row in carry), default=-1) + 1
+            cursor = self._conn.execute(
+                "INSERT INTO cycles (started_at, updated_at, host, pid, carried) VALUES (?, ?, ?, ?, ?)",
+                (now, now, self.host, os.getpid(), self.carried))
+            cycle_id = cursor.lastrowid
+            for row in carry:
+                self._carry(row[0], cycle_id)
+            self._conn.executemany("UPDATE cycles SET status = ? WHERE id = ?",
+                                   [('carried' if row in carry else 'abandoned', row[0]) for row in pending])
+            return cycle_id, False
+    
+    def _carry(self, source_id: int, cycle_id: int) -> None:
+        """把 source_id 轮中报告未交付的模块的条目复制到本轮 (排在本轮条目之前)"""
+        offset = self._conn.execute("SELECT COALESCE(MAX(seq), -1) + 1 FROM items WHERE cycle_id = ?",
+                                    (cycle_id,)).fetchone()[0]
+        cursor = self._conn.execute(
+            "INSERT OR IGNORE INTO items SELECT ?, scope, doc_id, seq + ?, entry FROM items i "
+            "WHERE cycle_id = ? AND NOT EXISTS (SELECT 1 FROM stages s WHERE s.cycle_id = i.cycle_id "
+            "AND s.scope = i.scope AND s.stage = 'delivered')",
+            (cycle_id, offset, source_id))
+        if cursor.rowcount:
+            print(f"📥 带入第 {source_id} 轮未交付的 {cursor.rowcount} 条，随本轮一起分析")
+    
+    def _touch(self) -> None:
+        self._conn.execute("UPDATE cycles SET updated_at = ? WHERE id = ?", (time.time(), self.cycle_id))
+    
+    # ---------- 数据源 ----------
+    
+    def producer_count(self, scope: str, name: str) -> Optional[int]:
+        """已完成的数据源的入库条数，未完成为 None"""
+        with self._lock:
+            row = self._conn.execute("SELECT count FROM producers WHERE cycle_id = ? AND scope = ? AND name = ?",
+                                     (self.cycle_id, scope, name)).fetchone()
+        return row[0] if row else None
+    
+    def mark_producer(self, scope: str, name: str, count: int) -> None:
+        with self._lock, self._conn:
+            # 数据源标记完成前，它的条目必须已经落盘
+            self._flush()
+            self._conn.execute("INSERT OR REPLACE INTO producers VALUES (?, ?, ?, ?)",
+                               (self.cycle_id, scope, name, count))
+            self._touch()
+    
+    # ---------- 条目 ----------
+    
+    def record_item(self, scope: str, item: Item) -> None:
+        """记录一条会话条目 (攒批写入，数据源完成、阶段变化和读取前都会先写入)"""
+        entry = json.dumps(item.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            if scope not in self._seq:
+                self._seq[scope] = self._conn.execute(
+                    "SELECT COALESCE(MAX(seq), -1) + 1 FROM items WHERE cycle_id = ? AND scope = ?",
+                    (self.cycle_id, scope)).fetchone()[0]
+            self._buffer.append((self.cycle_id, scope, item.id, self._seq[scope], entry))
+            self._seq[scope] += 1
+            if (len(self._buffer) >= CHECKPOINT_FLUSH_ITEMS
+                    or time.monotonic() - self._flushed_at >= CHECKPOINT_FLUSH_INTERVAL):
+                with self._conn:
+                    self._flush()
+    
+    def _flush(self) -> None:
+        # 调用方持有 _lock 并在事务中
+        if self._buffer:
+            self._conn.executemany("INSERT OR IGNORE INTO items VALUES (?, ?, ?, ?, ?)", self._buffer)
+            self._buffer = []
+        self._flushed_at = time.monotonic()
+    
+    def items(self, scope: str) -> List[Item]:
+        """本轮已入库的会话条目 (按入库顺序)"""
+        with self._lock:
+            with self._conn:
+                self._flush()
+            rows = self._conn.execute("SELECT entry FROM items WHERE cycle_id = ? AND scope = ? ORDER BY seq",
+                                      (self.cycle_id, scope)).fetchall()
+        items = []
+        for entry, in rows:
+            try:
+                items.append(Item.from_dict(json.loads(entry)))
+            except TypeError:
+                # 升级前写入的旧格式条目，跳过 (它们已在库中，只是不再计入本轮报告)
+                logger.warning(f"跳过无法恢复的检查点条目: {entry[:80]}")
+        return items
+    
+    # ---------- 阶段 ----------
+    
+    def stage(self, scope: str, stage: str) -> Optional[str]:
+        """阶段的记录内容，未完成为 None"""
+        with self._lock:
+            row = self._conn.execute("SELECT payload FROM stages WHERE cycle_id = ? AND scope = ? AND stage = ?",
+                                     (self.cycle_id, scope, stage)).fetchone()
+        return row[0] if row else None
+    
+    def mark_stage(self, scope: str, stage: str, payload: str = '') -> None:
+        with self._lock:
+            if self._conn is None:
+                # 已关闭: 该轮结束后才到的后台交付回调
+                return
+            with self._conn:
+                self._flush()
+                self._conn.execute("INSERT OR REPLACE INTO stages VALUES (?, ?, ?, ?)",
+                                   (self.cycle_id, scope, stage, payload))
+                self._touch()
+        if self._closing:
+            self._complete()
+    
+    # ---------- 结束 ----------
+    
+    def finish(self, results: Dict[str, str]) -> None:
+        """
+        本轮结束: 等后台交付都完成后标记为完成；有模块失败或报告未交付时标记为 pending，
+        下一轮重新抓取并带入未交付的条目
+        
+        Args:
+            results: {模块: success / failed / timeout}
+        """
+        if all(status == 'success' for status in results.values()):
+            self._closing = True
+            self._complete()
+        with self._lock:
+            if self.done or self._conn is None:
+                return
+            with self._conn:
+                self._conn.execute("UPDATE cycles SET status = 'pending', updated_at = ? "
+                                   "WHERE id = ? AND status = 'running'", (time.time(), self.cycle_id))
+    
+    def _complete(self) -> None:
+        with self._lock:
+            if self.done or self._conn is None:
+                return
+            with self._conn:
+                self._flush()
+                # 有新条目但报告还没交付 (后台渲染中，或分析失败) 的模块
+                undelivered = self._conn.execute(
+                    "SELECT COUNT(DISTINCT scope) FROM items i WHERE cycle_id = ? AND NOT EXISTS "
+                    "(SELECT 1 FROM stages s WHERE s.cycle_id = i.cycle_id AND s.scope = i.scope "
+                    "AND s.stage = 'delivered')",
+                    (self.cycle_id,)).fetchone()[0]
+                if undelivered:
+                    return
+                # pending 的一轮在后台交付完成后也转为完成 (已被带入下一轮的保持 carried)
+                self._conn.execute("UPDATE cycles SET status = 'done', updated_at = ? "
+                                   "WHERE id = ? AND status IN ('running', 'pending')",
+                                   (time.time(), self.cycle_id))
+                self.done = True
+                self._prune()
+            # 本轮已完成，不会再有写入
+            self._close()
+    
+    def close(self) -> None:
+        """写入缓冲中的条目并关闭连接 (之后迟到的交付回调不再记录)"""
+        with self._lock:
+            self._close()
+    
+    def _close(self) -> None:
+        # 调用方持有 _lock
+        if self._conn is None:
+            return
+        with self._conn:
+            self._flush()
+        self._conn.close()
+        self._conn = None
+    
+    def _prune(self) -> None:
+        """删除最近 CHECKPOINT_KEEP 轮之前的记录"""
+        keep_from = self.cycle_id - CHECKPOINT_KEEP
+        for table in ('producers', 'items', 'stages'):
+            self._conn.execute(f"DELETE FROM {table} WHERE cycle_id <= ?", (keep_from,))
+        self._conn.execute("DELETE FROM cycles WHERE id <= ?", (keep_from,))
+
+
+_active: Optional[CycleCheckpoint] = None
+
+
+def begin() -> Optional[CycleCheckpoint]:
+    """
+    开始一轮循环 (有中断的循环时续跑它)
+    
+    Returns:
+        检查点，未开启时为 None
+    """
+    global _active
+    if not CHECKPOINT_ENABLED:
+        return None
+    # 守护进程模式下每轮新建检查点，上一轮的连接在这里关闭
+    if _active is not None:
+        _active.close()
+    try:
+        _active = CycleCheckpoint()
+    except Exception as e:
+        logger.warning(f"打开检查点失败，本轮不记录: {str(e)}")
+        _active = None
+        return None
+    if _active.resumed:
+        print(f"♻️ 从第 {_active.cycle_id} 轮的断点继续 (上次运行中断)")
+    return _active
+
+
+def finish(results: Dict[str, str]) -> None:
+    if _active is not None:
+        _active.finish(results)
+
+
+def producer_count(scope: str, name: str) -> Optional[int]:
+    return _active.producer_count(scope, name) if _active is not None else None
+
+
+def mark_producer(scope: str, name: str, count: int) -> None:
+    if _active is not None:
+        _active.mark_producer(scope, name, count)
+
+
+def record_item(scope: str, item: Item) -> None:
+    """记录一条已入库的会话条目"""
+    if _active is not None:
+        _active.record_item(scope, item)
+
+
+def items(scope: str) -> List[Item]:
+    return _active.items(scope) if _active is not None else []
+
+
+def stage(scope: str, name: str) -> Optional[str]:
+    return _active.stage(scope, name) if _active is not None else None
+
+
+def mark_stage(scope: str, name: str, payload: str = '') -> None:
+    if _active is not None:
+        _active.mark_stage(scope, name, payload)
+
+
+def mark_delivered(scope: str, future) -> None:
+    """报告后台交付成功后记录 delivered"""
+    if _active is None or future is None:
+        return
+    active = _active
+    
+    def done(f):
+        if f.exception() is None:
+            active.mark_stage(scope, 'delivered')
+    future.add_done_callback(done)
@@ -0,0 +1,168 @@
+"""
+会话条目聚类压缩 - 复用 Chroma 已计算的向量，把近似重复的条目合并成一个代表
+prompt 大小随主题数而不是原始条目数增长，簇大小本身也作为热度信号进入报告
+"""
+
+import os
+import math
+import logging
+import importlib.util
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Sequence
+
+from models import Item
+
+logger = logging.getLogger(__name__)
+
+# ==================== 配置 ====================
+
+CLUSTER_ENABLED = os.getenv('CLUSTER_ENABLED', 'true').lower() == 'true'
+# 条目数少于该值时不聚类
+CLUSTER_MIN_ITEMS = int(os.getenv('CLUSTER_MIN_ITEMS', 10))
+# 与簇中心的余弦相似度低于该值的条目单独成簇，避免不同主题被硬塞进同一簇
+CLUSTER_SIMILARITY = float(os.getenv('CLUSTER_SIMILARITY', 0.8))
+
+
+def _normalize(matrix):
+    import numpy as np
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def minibatch_kmeans(vectors, k: int, batch_size: int = 64, iterations: int = 50, seed: int = 0):
+    """
+    球面 mini-batch k-means (向量已 L2 归一化，按余弦相似度分配)
+    
+    Args:
+        vectors: (n, d) 归一化向量矩阵
+        k: 簇数
+        batch_size: 每轮采样数
+        iterations: 迭代轮数
+        seed: 随机种子
+    
+    Returns:
+        (centroids, labels)
+    """
+    import numpy as np
+    
+    rng = np.random.default_rng(seed)
+    n = vectors.shape[0]
+    k = max(1, min(k, n))
+    
+    # k-means++ 初始化
+    centroids = [vectors[rng.integers(n)]]
+    for _ in range(1, k):
+        sims = vectors @ np.array(centroids).T
+        dist = np.clip(1.0 - sims.max(axis=1), 0.0, None) ** 2
+        total = dist.sum()
+        if total == 0:
+            break
+        centroids.append(vectors[rng.choice(n, p=dist / total)])
+    centroids = np.array(centroids)
+    counts = np.zeros(len(centroids))
+    
+    for _ in range(iterations):
+        batch = vectors[rng.choice(n, size=min(batch_size, n), replace=False)]
+        assign = (batch @ centroids.T).argmax(axis=1)
+        for vec, c in zip(batch, assign):
+            counts[c] += 1
+            centroids[c] += (vec - centroids[c]) / counts[c]
+        centroids = _normalize(centroids)
+    
+    labels = (vectors @ centroids.T).argmax(axis=1)
+    return centroids, labels
+
+
+def cluster_vectors(vectors: Sequence[Sequence[float]], similarity: float = CLUSTER_SIMILARITY) -> List[List[int]]:
+    """
+    聚类并返回每个簇的成员下标，第一个成员为代表 (最接近簇中心的条目)
+    
+    Args:
+        vectors: 向量列表
+        similarity: 成员与簇中心的最低余弦相似度
+    
+    Returns:
+        簇列表，按簇大小降序
+    """
+    import numpy as np
+    
+    matrix = _normalize(np.asarray(vectors, dtype=np.float32))
+    n = matrix.shape[0]
+    k = max(1, int(round(math.sqrt(n * 2))))
+    centroids, labels = minibatch_kmeans(matrix, k)
+    
+    sims = (matrix * centroids[labels]).sum(axis=1)
+    clusters: Dict[int, List[int]] = {}
+    singletons: List[List[int]] = []
+    for idx, (label, sim) in enumerate(zip(labels, sims)):
+        if sim >= similarity:
+            clusters.setdefault(int(label), []).append(idx)
+        else:
+            singletons.append([idx])
+    
+    result = []
+    for members in clusters.values():
+        members.sort(key=lambda i: -sims[i])
+        result.append(members)
+    result.extend(singletons)
+    result.sort(key=len, reverse=True)
+    return result
+
+
+def _fetch_embeddings(collection, ids: List[str]) -> Optional[Dict[str, Sequence[float]]]:
+    """从 Chroma 读取已存的向量，不重新计算"""
+    try:
+        result = collection.get(ids=ids, include=['embeddings'])
+        embeddings = result.get('embeddings')
+        if embeddings is None or len(embeddings) == 0:
+            return None
+        return dict(zip(result['ids'], embeddings))
+    except Exception as e:
+        logger.warning(f"读取向量失败: {str(e)}")
+        return None
+
+
+def compress_items(collection, items: List[Item], format_line: Callable[[Item], str]) -> List[str]:
+    """
+    把会话条目聚类压缩成 prompt 数据行
+    
+    每个簇输出一行: 簇大小、来源分布和代表条目。
+    聚类不可用 (未安装 numpy、向量缺失、条目太少) 时原样输出。
+    
+    Args:
+        collection: 条目所在的 Chroma 集合
+        items: 会话条目
+        format_line: 条目转 prompt 数据行
+    
+    Returns:
+        prompt 数据行列表
+    """
+    if not CLUSTER_ENABLED or len(items) < CLUSTER_MIN_ITEMS:
+        return [format_line(item) for item in items]
+    
+    if importlib.util.find_spec('numpy') is None:
+        logger.warning("numpy 未安装，跳过聚类")
+        return [format_line(item) for item in items]
+    
+    vectors_by_id = _fetch_embeddings(collection, [item.id for item in items])
+    if not vectors_by_id:
+        return [format_line(item) for item in items]
+    
+    embedded = [item for item in items if item.id in vectors_by_id]
+    missing = [item for item in items if item.id not in vectors_by_id]
+    clusters = cluster_vectors([vectors_by_id[item.id] for item in embedded])
+    
+    lines = []
+    for members in clusters:
+        representative = embedded[members[0]]
+        if len(members) == 1:
+            lines.append(format_line(representative))
+            continue
+        sources = Counter(embedded[i].source for i in members)
+        mix = ", ".join(f"{source}×{count}" for source, count in sources.most_common())
+        lines.append(f"[同类 {len(members)} 条 | {mix}] {format_line(representative)}")
+    lines.extend(format_line(item) for item in missing)
+    
+    print(f"🧬 聚类压缩: {len(items)} 条 → {len(lines)} 个主题")
+    return lines
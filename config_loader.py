@@ -7,7 +7,7 @@ import json
 import logging
 from pathlib import Path
 from typing import Dict, List, Any, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +25,7 @@ class KeywordsConfig:
     platforms: Dict[str, Dict]
     timing: Dict[str, Any]
     output: Dict[str, Any]
+    scrapers: Dict[str, Dict] = field(default_factory=dict)
 
 
 class ConfigLoader:
@@ -74,7 +75,8 @@ class ConfigLoader:
                 priority_keywords=data.get('priority_keywords', {}),
                 platforms=data.get('platforms', {}),
                 timing=data.get('timing', {}),
-                output=data.get('output', {})
+                output=data.get('output', {}),
+                scrapers=data.get('scrapers', {})
             )
             
             self.config_cache['keywords'] = config
@@ -296,6 +298,7 @@ class ConfigLoader:
                 'platforms': config.platforms,
                 'timing': config.timing,
                 'output': config.output,
+                'scrapers': config.scrapers,
             }
             
             with open(output_file, 'w', encoding='utf-8') as f:
@@ -0,0 +1,391 @@
+"""
+多实例协调 - 在共享卷上的 SQLite 里记录成员心跳、抓取单元认领和租约
+多个 market-monitor 容器挂载同一个 my_market_brain 时:
+  - 每个抓取单元 (HN、单个 RSS 源、单个 GitHub 关键词...) 按一致性哈希分给一个存活实例
+  - 实例心跳超时后，它的单元自动落到其余实例上
+  - 每个单元在每个周期内只会被认领一次，整个集群里同一查询每个周期只跑一次
+  - 每个模块的分析和交付只由持有 analysis:<模块> 租约的实例执行，其他实例把本轮条目交接给它，
+    报告由它汇总全集群的条目后写到共享卷上 (不会有多个实例写同一个报告文件)
+未开启 COORDINATION_ENABLED 时不创建数据库，所有单元都由本实例执行
+"""
+
+import os
+import json
+import time
+import atexit
+import socket
+import sqlite3
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import checkpoint
+from models import Item
+
+logger = logging.getLogger(__name__)
+
+# ==================== 配置 ====================
+
+COORDINATION_ENABLED = os.getenv('COORDINATION_ENABLED', 'false').lower() == 'true'
+COORD_DB = Path(os.getenv('COORD_DB', './my_market_brain/coordination.db'))
+# 实例标识，默认 主机名-进程号 (容器内主机名即容器 id)
+INSTANCE_ID = os.getenv('INSTANCE_ID') or f"{socket.gethostname()}-{os.getpid()}"
+# 心跳间隔与判定实例失联的时间 (秒)
+HEARTBEAT_INTERVAL = float(os.getenv('COORD_HEARTBEAT', 15))
+MEMBER_TTL = float(os.getenv('COORD_MEMBER_TTL', 60))
+# 认领周期 (秒)，默认与 --interval 一致
+COORD_INTERVAL = int(os.getenv('COORD_INTERVAL', 3600))
+# 分析租约有效期 (秒)，0 为两个认领周期: 持有者每轮续约，失联超过该时间后由其他实例接管
+ANALYSIS_LEASE_TTL = float(os.getenv('COORD_ANALYSIS_TTL', 0))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS members (
+    member_id TEXT PRIMARY KEY,
+    host TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    started_at REAL NOT NULL,
+    heartbeat_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS claims (
+    unit TEXT NOT NULL,
+    interval_start INTEGER NOT NULL,
+    member_id TEXT NOT NULL,
+    claimed_at REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'running',
+    PRIMARY KEY (unit, interval_start)
+);
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    member_id TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS handoff (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    scope TEXT NOT NULL,
+    member_id TEXT NOT NULL,
+    posted_at REAL NOT NULL,
+    entry TEXT NOT NULL
+);
+"""
+
+
+def rendezvous_owner(unit: str, members: Iterable[str]) -> Optional[str]:
+    """
+    最高随机权重哈希: 成员增减时只有落在该成员上的单元会移动
+    
+    Args:
+        unit: 单元名
+        members: 存活成员
+    
+    Returns:
+        负责该单元的成员，没有成员时为 None
+    """
+    best, best_score = None, -1
+    for member in members:
+        score = int.from_bytes(hashlib.sha1(f"{member}|{unit}".encode('utf-8')).digest()[:8], 'big')
+        if score > best_score:
+            best, best_score = member, score
+    return best
+
+
+class Coordinator:
+    """集群成员 + 单元认领 + 租约"""
+    
+    def __init__(self, db_path: Path = COORD_DB, member_id: str = INSTANCE_ID,
+                 interval: int = COORD_INTERVAL, member_ttl: float = MEMBER_TTL,
+                 heartbeat_interval: float = HEARTBEAT_INTERVAL):
+        self.db_path = Path(db_path)
+        self.member_id = member_id
+        self.interval = max(1, int(interval))
+        self.member_ttl = member_ttl
+        self.heartbeat_interval = heartbeat_interval
+        
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # 本实例持有的认领: 单元 → 认领时的周期起点 (完成时按它标记，跨过周期边界也不会错位)
+        self._claimed: Dict[str, int] = {}
+        
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+    
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """打开自动提交的连接 (需要原子性的地方显式 BEGIN IMMEDIATE)，退出时关闭"""
+        # 共享卷上可能有多个容器，不用 WAL (WAL 依赖同一主机的共享内存)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+    
+    # ---------- 成员 ----------
+    
+    def join(self) -> None:
+        """登记本实例并启动心跳线程"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO members (member_id, host, pid, started_at, heartbeat_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (self.member_id, socket.gethostname(), os.getpid(), now, now)
+            )
+            # 清理早已结束的周期和长期失联的成员
+            conn.execute("DELETE FROM claims WHERE interval_start < ?", (self.interval_start() - 2 * self.interval,))
+            conn.execute("DELETE FROM members WHERE heartbeat_at < ?", (now - 10 * self.member_ttl,))
+            conn.execute("DELETE FROM handoff WHERE posted_at < ?", (now - 10 * self.interval,))
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._heartbeat, name='coord-heartbeat', daemon=True)
+            self._thread.start()
+        print(f"🤝 已加入集群: {self.member_id} (存活实例 {len(self.members())} 个)")
+    
+    def leave(self) -> None:
+        """注销本实例，未完成的认领和租约立即可被接管"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM members WHERE member_id = ?", (self.member_id,))
+                conn.execute("DELETE FROM leases WHERE member_id = ?", (self.member_id,))
+        except sqlite3.Error as e:
+            logger.warning(f"注销实例失败: {str(e)}")
+    
+    def _heartbeat(self) -> None:
+        while not self._stop.wait(self.heartbeat_interval):
+            try:
+                with self._connect() as conn:
+                    conn.execute("UPDATE members SET heartbeat_at = ? WHERE member_id = ?",
+                                 (time.time(), self.member_id))
+            except sqlite3.Error as e:
+                logger.warning(f"心跳写入失败: {str(e)}")
+    
+    def members(self) -> List[str]:
+        """当前存活的成员 (总是包含自己)"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT member_id FROM members WHERE heartbeat_at >= ?",
+                                (time.time() - self.member_ttl,)).fetchall()
+        members = {row[0] for row in rows}
+        members.add(self.member_id)
+        return sorted(members)
+    
+    # ---------- 单元认领 ----------
+    
+    def interval_start(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        return int(now // self.interval) * self.interval
+    
+    def owns(self, unit: str, members: Optional[List[str]] = None) -> bool:
+        """按一致性哈希该单元是否归本实例负责"""
+        return rendezvous_owner(unit, members or self.members()) == self.member_id
+    
+    def acquire(self, unit: str, members: Optional[List[str]] = None) -> bool:
+        """
+        本周期是否由本实例执行该单元: 归本实例负责且认领成功
+        
+        Args:
+            unit: 单元名，如 'hn'、'rss:producthunt'、'github:LLM agent'
+            members: 存活成员 (批量判断时传入，避免重复查询)
+        
+        Returns:
+            是否执行
+        """
+        members = members or self.members()
+        if not self.owns(unit, members):
+            return False
+        return self.claim(unit)
+    
+    def claim(self, unit: str) -> bool:
+        """
+        认领本周期的单元。已被存活实例认领或本周期已完成时返回 False；
+        认领者失联且未完成时由本实例接管
+        """
+        start = self.interval_start()
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT c.member_id, c.status, m.heartbeat_at FROM claims c "
+                    "LEFT JOIN members m ON m.member_id = c.member_id "
+                    "WHERE c.unit = ? AND c.interval_start = ?",
+                    (unit, start)
+                ).fetchone()
+                if row is None:
+                    conn.execute(
+                        "INSERT INTO claims (unit, interval_start, member_id, claimed_at) VALUES (?, ?, ?, ?)",
+                        (unit, start, self.member_id, now)
+                    )
+                    acquired = True
+                elif row[0] == self.member_id:
+                    acquired = row[1] != 'done'
+                elif row[1] == 'done' or (row[2] is not None and row[2] >= now - self.member_ttl):
+                    acquired = False
+                else:
+                    conn.execute(
+                        "UPDATE claims SET member_id = ?, claimed_at = ? WHERE unit = ? AND interval_start = ?",
+                        (self.member_id, now, unit, start)
+                    )
+                    print(f"🤝 接管失联实例 {row[0]} 的单元: {unit}")
+                    acquired = True
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        if acquired:
+            self._claimed[unit] = start
+        return acquired
+    
+    def complete(self, units: Iterable[str]) -> None:
+        """标记已执行完的单元 (按认领时的周期，不是完成时的周期)"""
+        rows = [(unit, self._claimed.pop(unit), self.member_id) for unit in units if unit in self._claimed]
+        if not rows:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE claims SET status = 'done' WHERE unit = ? AND interval_start = ? AND member_id = ?",
+                rows
+            )
+    
+    # ---------- 租约 ----------
+    
+    def hold_lease(self, name: str, ttl: Optional[float] = None) -> bool:
+        """
+        获取或续约一个命名租约 (如发件箱发送者)，同一时刻只有一个实例持有
+        
+        Args:
+            name: 租约名
+            ttl: 有效期 (秒)，默认为成员失联时间
+        
+        Returns:
+            本实例是否持有该租约
+        """
+        now = time.time()
+        expires = now + (ttl or self.member_ttl)
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT member_id, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+                held = row is None or row[0] == self.member_id or row[1] < now
+                if held:
+                    conn.execute("INSERT OR REPLACE INTO leases (name, member_id, expires_at) VALUES (?, ?, ?)",
+                                 (name, self.member_id, expires))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return held
+    
+    # ---------- 分析交接 ----------
+    
+    def hand_off(self, scope: str, entries: List[str]) -> None:
+        """把本轮的会话条目 (JSON) 交给持有该模块分析租约的实例"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany("INSERT INTO handoff (scope, member_id, posted_at, entry) VALUES (?, ?, ?, ?)",
+                                 [(scope, self.member_id, now, entry) for entry in entries])
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+    
+    def take_handoff(self, scope: str) -> List[str]:
+        """取走其他实例交接的会话条目 (取走即删除，按交接顺序)"""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute("SELECT id, entry FROM handoff WHERE scope = ? ORDER BY id", (scope,)).fetchall()
+                if rows:
+                    conn.execute("DELETE FROM handoff WHERE scope = ? AND id <= ?", (scope, rows[-1][0]))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return [row[1] for row in rows]
+    
+    def status(self) -> Dict:
+        """集群概况: 存活成员与本周期各实例认领数"""
+        with self._connect() as conn:
+            claims = dict(conn.execute(
+                "SELECT member_id, COUNT(*) FROM claims WHERE interval_start = ? GROUP BY member_id",
+                (self.interval_start(),)
+            ).fetchall())
+        return {'member_id': self.member_id, 'members': self.members(), 'claims': claims}
+
+
+_coordinator: Optional[Coordinator] = None
+_coordinator_lock = threading.Lock()
+
+
+def get_coordinator(interval: Optional[int] = None) -> Optional[Coordinator]:
+    """
+    进程内共享的协调器，未开启协调时返回 None
+    
+    Args:
+        interval: 认领周期 (秒)，首次调用时生效
+    """
+    global _coordinator
+    if not COORDINATION_ENABLED:
+        return None
+    with _coordinator_lock:
+        if _coordinator is None:
+            _coordinator = Coordinator(interval=interval or COORD_INTERVAL)
+            _coordinator.join()
+            atexit.register(_coordinator.leave)
+        return _coordinator
+
+
+def hold_lease(name: str) -> bool:
+    """未开启协调时总是持有"""
+    coordinator = get_coordinator()
+    return coordinator is None or coordinator.hold_lease(name)
+
+
+def exchange_items(scope: str, items: List[Item]) -> Optional[List[Item]]:
+    """
+    集群模式下每个模块只由持有 analysis:<模块> 租约的实例分析和交付
+    
+    不持有租约的实例把本轮条目交接出去，由持有者在它的这一轮或下一轮一起分析；
+    持有者取走其他实例交接的条目，计入本轮检查点 (分析失败时随本轮带入下一轮)
+    
+    Args:
+        scope: 检查点中的模块名 (pain / opportunity)
+        items: 本实例本轮的会话条目
+    
+    Returns:
+        持有租约 (或未开启协调) 时为其他实例交接来的条目 (不含 items 中已有的)，
+        交接出去时为 None
+    """
+    coordinator = get_coordinator()
+    if coordinator is None:
+        return []
+    ttl = ANALYSIS_LEASE_TTL or 2 * coordinator.interval
+    if not coordinator.hold_lease(f'analysis:{scope}', ttl=ttl):
+        if items:
+            coordinator.hand_off(scope, [json.dumps(item.to_dict(), ensure_ascii=False, default=str)
+                                         for item in items])
+            print(f"🤝 本轮 {len(items)} 条交给持有分析租约的实例，随它的报告一起分析")
+        return None
+    
+    seen = {item.id for item in items}
+    received = []
+    for entry in coordinator.take_handoff(scope):
+        try:
+            item = Item.from_dict(json.loads(entry))
+        except (TypeError, ValueError):
+            logger.warning(f"跳过无法恢复的交接条目: {entry[:80]}")
+            continue
+        if item.id in seen:
+            continue
+        seen.add(item.id)
+        received.append(item)
+        checkpoint.record_item(scope, item)
+    if received:
+        print(f"📥 收到其他实例交接的 {len(received)} 条，随本轮一起分析")
+    return received
@@ -0,0 +1,454 @@
+"""
+监控循环上下文 - 一个事件循环跑完所有数据源
+所有出站 HTTP 都经过 CycleContext.request (并发上限、超时、统计、录制回放都在这里)，
+各数据源作为异步生产者并发运行，抓取阶段和整个循环各有截止时间，超时的任务会被取消
+"""
+
+import os
+import time
+import asyncio
+import logging
+import contextvars
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+import metrics
+import cassette
+import profiling
+import checkpoint
+
+logger = logging.getLogger(__name__)
+
+# ==================== 配置 ====================
+
+# 整个循环 (抓取 + 分析 + 交付) 的截止时间 (秒)
+CYCLE_DEADLINE = float(os.getenv('CYCLE_DEADLINE', 1800))
+# 抓取阶段的截止时间，到点后未完成的数据源被取消，已入库的条目照常分析
+FETCH_DEADLINE = float(os.getenv('FETCH_DEADLINE', 600))
+# 同时在途的 HTTP 请求上限
+HTTP_MAX_IN_FLIGHT = int(os.getenv('HTTP_MAX_IN_FLIGHT', 256))
+HTTP_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', 15))
+
+HN_API_BASE = os.getenv('HN_API_BASE') or 'https://hacker-news.firebaseio.com/v0'
+USER_AGENT = 'MarketHunter/v2'
+
+# 当前协程所属的数据源 (run_producers 创建任务时设置，gather 出的子任务继承)，用于把认领的单元归到数据源名下
+_producer: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('cycle_producer', default=None)
+
+
+class FetchError(Exception):
+    """HTTP 请求失败 (status 为 None 表示网络错误或超时)"""
+    
+    def __init__(self, url: str, status: Optional[int] = None, message: str = ''):
+        super().__init__(f"{status or 'ERR'} {url} {message}".strip())
+        self.url = url
+        self.status = status
+
+
+@dataclass
+class Response:
+    """一次 HTTP 交换的结果"""
+    url: str
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    elapsed: float
+    
+    def text(self, encoding: str = 'utf-8') -> str:
+        return self.body.decode(encoding, errors='replace')
+    
+    def json(self) -> Any:
+        import json
+        return json.loads(self.body)
+
+
+@dataclass
+class FetchStats:
+    """本轮 HTTP 统计"""
+    requests: int = 0
+    failures: int = 0
+    bytes: int = 0
+    latency: Dict[str, List[float]] = field(default_factory=dict)
+    
+    def record(self, host: str, elapsed: float, size: int, ok: bool) -> None:
+        self.requests += 1
+        self.failures += int(not ok)
+        self.bytes += size
+        self.latency.setdefault(host, []).append(elapsed)
+
+
+class CycleContext:
+    """
+    一轮监控循环的共享上下文
+    
+    用法:
+        async with CycleContext() as ctx:
+            data = await ctx.get_json(url)
+    
+    传入 coordination.Coordinator 时，数据源先用 ctx.acquire(单元名) 确认本实例负责该单元；
+    抓取失败的单元用 ctx.fail_unit(单元名) 报告，它和所属数据源失败或被取消的单元退出时不标记完成，
+    本周期内仍可由其他实例或下一轮重试
+    """
+    
+    def __init__(self, deadline: float = CYCLE_DEADLINE, fetch_deadline: float = FETCH_DEADLINE,
+                 max_in_flight: int = HTTP_MAX_IN_FLIGHT, timeout: float = HTTP_TIMEOUT,
+                 coordinator=None):
+        self.started = time.monotonic()
+        self.deadline = self.started + deadline
+        self.fetch_deadline = self.started + min(deadline, fetch_deadline)
+        self.timeout = timeout
+        self.stats = FetchStats()
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._session = None
+        self.cassette = None    # 录制器 / 回放器 (cassette.session)
+        self._memo: Dict[Any, asyncio.Task] = {}
+        self.coordinator = coordinator
+        self._members: Optional[List[str]] = None
+        self._units: Dict[str, bool] = {}
+        self._unit_producers: Dict[str, Set[Optional[str]]] = {}
+        self._producer_ok: Dict[str, bool] = {}
+        self.failed_units: Set[str] = set()
+    
+    async def __aenter__(self) -> 'CycleContext':
+        import aiohttp
+        
+        self.cassette = cassette.session()
+        self._session = aiohttp.ClientSession(
+            trust_env=True,   # 沿用 runtime.configure_proxy 设置的代理
+            headers={'User-Agent': USER_AGENT},
+            connector=aiohttp.TCPConnector(limit=0, ttl_dns_cache=300),
+        )
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        for task in self._memo.values():
+            task.cancel()
+        completed = self.completed_units(clean=exc_type is None)
+        if self.coordinator is not None and completed:
+            await asyncio.to_thread(self.coordinator.complete, completed)
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        if self.cassette is not None:
+            self.cassette.close()
+            self.cassette = None
+    
+    # ---------- 时间 ----------
+    
+    def remaining(self) -> float:
+        """距整个循环截止的秒数"""
+        return max(0.0, self.deadline - time.monotonic())
+    
+    def fetch_remaining(self) -> float:
+        """距抓取阶段截止的秒数"""
+        return max(0.0, self.fetch_deadline - time.monotonic())
+    
+    # ---------- HTTP ----------
+    
+    async def request(self, method: str, url: str, *, headers: Optional[Dict] = None,
+                      params: Optional[Dict] = None, json: Any = None,
+                      timeout: Optional[float] = None) -> Response:
+        """
+        所有出站 HTTP 的唯一入口
+        
+        Args:
+            method: GET / POST
+            url: 地址
+            headers: 额外请求头
+            params: 查询参数
+            json: JSON 请求体
+            timeout: 超时秒数，默认 HTTP_TIMEOUT
+        
+        Returns:
+            Response (任何状态码都返回，网络错误抛 FetchError)
+        """
+        from urllib.parse import urlsplit
+        
+        host = urlsplit(url).netloc
+        async with self._semaphore:
+            with profiling.span('fetch', host=host):
+                start = time.perf_counter()
+                try:
+                    if self.cassette is not None and self.cassette.replaying:
+                        resp = await self._replay(method, url, params, json, start)
+                    else:
+                        resp = await self._send(method, url, headers, params, json, timeout, start)
+                except FetchError as e:
+                    elapsed = time.perf_counter() - start
+                    self.stats.record(host, elapsed, 0, False)
+                    metrics.observe_fetch(host, elapsed, False)
+                    if self.cassette is not None and not self.cassette.replaying:
+                        self.cassette.record_http(start, method, url, params, json, error=str(e.__cause__ or e))
+                    raise
+                self.stats.record(host, resp.elapsed, len(resp.body), resp.status < 400)
+                metrics.observe_fetch(host, resp.elapsed, resp.status < 400)
+                if self.cassette is not None and not self.cassette.replaying:
+                    self.cassette.record_http(start, method, url, params, json, response=resp)
+                return resp
+    
+    async def _send(self, method: str, url: str, headers: Optional[Dict], params: Optional[Dict],
+                    json: Any, timeout: Optional[float], start: float) -> Response:
+        import aiohttp
+        
+        try:
+            async with self._session.request(
+                method, url, headers=headers, params=params, json=json,
+                timeout=aiohttp.ClientTimeout(total=timeout or self.timeout)
+            ) as resp:
+                body = await resp.read()
+                return Response(str(resp.url), resp.status, dict(resp.headers), body, time.perf_counter() - start)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise FetchError(url, None, str(e) or type(e).__name__) from e
+    
+    async def _replay(self, method: str, url: str, params: Optional[Dict], json: Any, start: float) -> Response:
+        """从卷带返回录到的响应，录制时的网络错误照样抛出"""
+        try:
+            entry, body = await self.cassette.replay_http(method, url, params, json)
+        except cassette.CassetteMiss as e:
+            raise FetchError(url, None, str(e)) from e
+        if entry.get('status') is None:
+            raise FetchError(url, None, entry.get('error') or '')
+        return Response(entry.get('final_url') or url, entry['status'], entry.get('headers') or {}, body,
+                        time.perf_counter() - start)
+    
+    async def get(self, url: str, **kwargs) -> Response:
+        resp = await self.request('GET', url, **kwargs)
+        if resp.status >= 400:
+            raise FetchError(url, resp.status)
+        return resp
+    
+    async def get_json(self, url: str, **kwargs) -> Any:
+        return (await self.get(url, **kwargs)).json()
+    
+    async def get_text(self, url: str, **kwargs) -> str:
+        return (await self.get(url, **kwargs)).text()
+    
+    async def call(self, name: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        不经过本上下文发请求的第三方客户端 (pytrends、twikit)，录制 / 回放其返回值
+        
+        Args:
+            name: 调用名，如 'trends'
+            factory: 返回协程的函数，结果需可 JSON 序列化
+        
+        Returns:
+            调用结果 (回放时元组会变成列表)
+        """
+        if self.cassette is None:
+            return await factory()
+        return await self.cassette.call(name, factory)
+    
+    def memo(self, key: Any, factory: Callable[[], Awaitable[Any]]) -> Awaitable[Any]:
+        """同一轮内相同 key 的抓取只做一次，多个数据源共享结果"""
+        task = self._memo.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._memo[key] = task
+        return asyncio.shield(task)
+    
+    # ---------- 集群协调 ----------
+    
+    async def acquire(self, unit: str) -> bool:
+        """
+        本轮是否由本实例执行该抓取单元 (未开启协调时总是执行，同一轮内结果不变)
+        
+        Args:
+            unit: 单元名，如 'hn'、'rss:producthunt'、'github:LLM agent'
+        
+        Returns:
+            是否执行
+        """
+        if self.coordinator is None:
+            return True
+        if unit not in self._units:
+            if self._members is None:
+                self._members = await asyncio.to_thread(self.coordinator.members)
+            self._units[unit] = await asyncio.to_thread(self.coordinator.acquire, unit, self._members)
+        self._unit_producers.setdefault(unit, set()).add(_producer.get())
+        return self._units[unit]
+    
+    def fail_unit(self, unit: str) -> None:
+        """报告该单元本轮抓取失败 (数据源自己捕获了异常时)，退出时不标记完成"""
+        self.failed_units.add(unit)
+    
+    def completed_units(self, clean: bool = True) -> List[str]:
+        """
+        本轮认领且成功执行的单元: 没有报告失败，且用到它的数据源都成功结束
+        
+        Args:
+            clean: 上下文是否正常退出，否则不在任何数据源名下认领的单元也不算完成
+        
+        Returns:
+            单元名列表
+        """
+        completed = []
+        for unit, acquired in self._units.items():
+            if not acquired or unit in self.failed_units:
+                continue
+            producers = self._unit_producers.get(unit, set())
+            if all(self._producer_ok.get(p, False) if p is not None else clean for p in producers):
+                completed.append(unit)
+        return completed
+    
+    # ---------- 生产者 ----------
+    
+    async def run_producers(self, producers: Dict[str, Awaitable[int]],
+                            scope: Optional[str] = None) -> Dict[str, int]:
+        """
+        并发运行各数据源，抓取截止时间到后取消未完成的数据源
+        
+        Args:
+            producers: {数据源名称: 返回入库条数的协程}
+            scope: 检查点中的模块名，给出时跳过上次中断前已完成的数据源，并记录本轮完成的数据源
+        
+        Returns:
+            {数据源名称: 入库条数}，失败或被取消的为 0
+        """
+        counts = {}
+        if scope is not None:
+            for name in list(producers):
+                count = checkpoint.producer_count(scope, name)
+                if count is not None:
+                    producers.pop(name).close()
+                    counts[name] = count
+                    print(f"⏭️ {name} 已在中断前完成 (入库 {count} 条)，跳过")
+        
+        keys = {name: f"{scope}/{name}" if scope else name for name in producers}
+        tasks = {}
+        for name, coro in producers.items():
+            token = _producer.set(keys[name])
+            try:
+                tasks[asyncio.ensure_future(coro)] = name
+            finally:
+                _producer.reset(token)
+        if not tasks:
+            return counts
+        if scope is not None:
+            # 每个数据源完成时立即记录，进程在等待其他数据源时退出也不会丢
+            for task, name in tasks.items():
+                task.add_done_callback(lambda t, name=name: self._mark_producer(scope, name, t))
+        done, pending = await asyncio.wait(tasks, timeout=self.fetch_remaining())
+        for task in pending:
+            task.cancel()
+            print(f"⏰ {tasks[task]} 超过抓取截止时间，已取消")
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        
+        for task, name in tasks.items():
+            succeeded = task in done and not task.cancelled() and task.exception() is None
+            self._producer_ok[keys[name]] = succeeded
+            if succeeded:
+                counts[name] = task.result()
+            else:
+                if task in done and not task.cancelled():
+                    print(f"❌ {name} 扫描失败: {task.exception()}")
+                counts[name] = 0
+        return counts
+    
+    @staticmethod
+    def _mark_producer(scope: str, name: str, task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is None:
+            checkpoint.mark_producer(scope, name, task.result())
+    
+    def summary(self) -> Dict:
+        """本轮 HTTP 统计摘要"""
+        hosts = {}
+        for host, values in self.stats.latency.items():
+            ordered = sorted(values)
+            hosts[host] = {
+                'requests': len(ordered),
+                'p50': round(ordered[len(ordered) // 2], 3),
+                'max': round(ordered[-1], 3),
+            }
+        return {
+            'requests': self.stats.requests,
+            'failures': self.stats.failures,
+            'bytes': self.stats.bytes,
+            'elapsed': round(time.monotonic() - self.started, 1),
+            'hosts': hosts,
+            'units': {'acquired': sum(self._units.values()),
+                      'skipped': len(self._units) - sum(self._units.values())},
+        }
+
+
+# ==================== 共享数据源 ====================
+
+async def fetch_hn_stories(ctx: CycleContext, limit: int) -> List[Dict]:
+    """
+    并发获取 HN 热门故事，top 列表和单条故事在一轮内只请求一次
+    
+    Args:
+        ctx: 循环上下文
+        limit: 取前多少条
+    
+    Returns:
+        故事列表 (获取失败的条目跳过)
+    """
+    if not await ctx.acquire('hn'):
+        return []
+    top_ids = await ctx.memo('hn:top', lambda: ctx.get_json(f'{HN_API_BASE}/topstories.json'))
+    
+    async def fetch_item(item_id):
+        try:
+            return await ctx.memo(('hn:item', item_id),
+                                  lambda: ctx.get_json(f'{HN_API_BASE}/item/{item_id}.json'))
+        except FetchError as e:
+            logger.debug(f"HN 条目获取失败: {e}")
+            return None
+    
+    items = await asyncio.gather(*(fetch_item(i) for i in top_ids[:limit]))
+    return [item for item in items if item]
+
+
+# ==================== 循环入口 ====================
+
+async def run_cycle(pain: bool = True, opportunity: bool = True) -> Dict[str, str]:
+    """
+    在一个事件循环里跑完一轮监控
+    
+    Args:
+        pain: 是否运行痛点雷达
+        opportunity: 是否运行机会猎手
+    
+    Returns:
+        {模块: success / failed / timeout}
+    """
+    import runtime
+    import coordination
+    
+    runtime.configure_proxy()
+    modules = {}
+    if pain:
+        import pain_radar_v2
+        modules['pain_radar'] = pain_radar_v2
+    if opportunity:
+        import opportunity_hunter
+        modules['opportunity_hunter'] = opportunity_hunter
+    
+    results = {}
+    async with CycleContext(coordinator=coordination.get_coordinator()) as ctx:
+        tasks = {name: asyncio.ensure_future(module.run(ctx)) for name, module in modules.items()}
+        done, pending = await asyncio.wait(tasks.values(), timeout=ctx.remaining())
+        for name, task in tasks.items():
+            if task in pending:
+                task.cancel()
+                results[name] = 'timeout'
+                print(f"⏰ {name} 超过循环截止时间，已取消")
+            elif task.cancelled():
+                results[name] = 'failed'
+                print(f"❌ {name} 被取消")
+            elif task.exception() is not None:
+                results[name] = 'failed'
+                print(f"❌ {name} 失败: {task.exception()}")
+            else:
+                results[name] = 'success'
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        
+        summary = ctx.summary()
+        print(f"🌐 HTTP: {summary['requests']} 次请求, 失败 {summary['failures']}, "
+              f"{summary['bytes'] / 1024:.0f} KB, 耗时 {summary['elapsed']} 秒")
+        if ctx.coordinator is not None:
+            print(f"🤝 抓取单元: 本实例执行 {summary['units']['acquired']}, "
+                  f"跳过 {summary['units']['skipped']} (其他实例负责或本周期已执行)")
+    return results
@@ -0,0 +1,184 @@
+"""
+增量日报 - 持久化当天的结构化机会摘要
+每个循环只把新条目和压缩后的当前摘要发给模型，由模型返回更新后的摘要，
+单次 prompt 大小与当天累计数据量无关
+"""
+
+import os
+import json
+import logging
+import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import llm_client
+import analysis_pipeline
+
+logger = logging.getLogger(__name__)
+
+# ==================== 配置 ====================
+
+SUMMARY_DIR = Path(os.getenv('DAILY_SUMMARY_DIR', './my_market_brain/daily'))
+INCREMENTAL_ENABLED = os.getenv('INCREMENTAL_ANALYSIS', 'false').lower() == 'true'
+# 摘要中保留的机会条数上限，决定摘要本身的 token 占用
+MAX_ENTRIES = int(os.getenv('DAILY_SUMMARY_MAX_ENTRIES', 12))
+# 每次合并的新条目 token 预算
+DELTA_TOKEN_BUDGET = int(os.getenv('DAILY_DELTA_TOKEN_BUDGET', 8000))
+
+MERGE_PROMPT = """# Role: {role}
+# Task: 维护今天的{kind}摘要。把新数据合并进当前摘要，返回更新后的摘要。
+
+## 规则
+1. 新数据与已有条目主题相同时合并: 累加 mentions，补充 sources 和 evidence
+2. 新主题作为新条目加入
+3. 按商业价值和 mentions 排序，最多保留 {max_entries} 条
+4. evidence 不超过80字，action 不超过50字
+
+## 当前摘要 (JSON)
+{summary}
+
+## 新数据 (共 {count} 条)
+{raw_data}
+
+## 输出格式
+只输出 JSON，不要任何解释，结构与当前摘要的 entries 相同:
+{{"entries": [{{"name": "...", "category": "...", "evidence": "...", "mentions": 1, "sources": ["..."], "action": "..."}}]}}
+"""
+
+
+def _summary_path(kind: str, day: datetime.date) -> Path:
+    return SUMMARY_DIR / f"{kind}_{day.isoformat()}.json"
+
+
+def load_summary(kind: str, day: Optional[datetime.date] = None) -> Dict:
+    """
+    加载当天摘要，不存在时返回空摘要
+
+    Args:
+        kind: 摘要类型 (pain / opportunity)
+        day: 日期，默认今天
+
+    Returns:
+        摘要字典
+    """
+    day = day or datetime.date.today()
+    path = _summary_path(kind, day)
+    if path.exists():
+        try:
+            return json.loads(path.read_text(encoding='utf-8'))
+        except Exception as e:
+            logger.warning(f"读取日报摘要失败 {path}: {str(e)}")
+    return {'date': day.isoformat(), 'kind': kind, 'items_seen': 0, 'cycles': 0, 'entries': []}
+
+
+def save_summary(summary: Dict) -> None:
+    """原子写入摘要"""
+    SUMMARY_DIR.mkdir(parents=True, exist_ok=True)
+    path = _summary_path(summary['kind'], datetime.date.fromisoformat(summary['date']))
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding='utf-8')
+    os.replace(tmp, path)
+
+
+def _parse_entries(text: str) -> Optional[List[Dict]]:
+    """从模型输出中提取 entries，兼容 ```json 代码块"""
+    text = text.strip()
+    if text.startswith('```'):
+        text = text.split('\n', 1)[1] if '\n' in text else ''
+        text = text.rsplit('```', 1)[0]
+    start, end = text.find('{'), text.rfind('}')
+    if start < 0 or end < 0:
+        return None
+    try:
+        entries = json.loads(text[start:end + 1]).get('entries')
+    except (ValueError, AttributeError):
+        return None
+    if not isinstance(entries, list):
+        return None
+    return [e for e in entries if isinstance(e, dict) and e.get('name')][:MAX_ENTRIES]
+
+
+def update_summary(client, raw_data: str, kind: str, kind_label: str, role: str,
+                   template_version: str) -> Optional[Dict]:
+    """
+    把本轮新条目合并进当天摘要
+
+    新条目超过预算时按块依次合并，每次调用只包含一块新数据和当前摘要。
+
+    Args:
+        client: genai.Client
+        raw_data: 本轮新条目 (每行一条)
+        kind: 摘要类型 (pain / opportunity)
+        kind_label: 报告中的类型名称
+        role: prompt 中的角色
+        template_version: 分析模板版本
+
+    Returns:
+        更新后的摘要，全部失败时返回 None (已有摘要保持不变)
+    """
+    summary = load_summary(kind)
+    lines = [line for line in raw_data.splitlines() if line.strip()]
+    merged_any = False
+
+    for chunk in analysis_pipeline.chunk_lines(lines, DELTA_TOKEN_BUDGET):
+        current = json.dumps({'entries': summary['entries']}, ensure_ascii=False)
+        delta = "\n".join(chunk)
+        prompt = MERGE_PROMPT.format(
+            role=role, kind=kind_label, max_entries=MAX_ENTRIES,
+            summary=current, count=len(chunk), raw_data=delta
+        )
+        text = llm_client.generate_text(
+            client, prompt,
+            template_version=f"{template_version}-incremental",
+            cache_input=f"{current}\n{delta}"
+        )
+        entries = _parse_entries(text) if text else None
+        if entries is None:
+            print(f"⚠️ 增量合并失败，保留当前摘要 ({len(chunk)} 条新数据未合并)")
+            continue
+
+        summary['entries'] = entries
+        summary['items_seen'] += len(chunk)
+        merged_any = True
+
+    if not merged_any:
+        return None
+
+    summary['cycles'] += 1
+    summary['updated'] = datetime.datetime.now().isoformat()
+    save_summary(summary)
+    print(f"📒 今日摘要已更新: {len(summary['entries'])} 个机会, 累计 {summary['items_seen']} 条数据")
+    return summary
+
+
+def render_markdown(summary: Dict, title: str, top_n: int = 5) -> str:
+    """
+    把摘要渲染成与一次性分析相同风格的 Markdown 报告
+
+    Args:
+        summary: 摘要字典
+        title: Top 列表标题 (如 "商业机会")
+        top_n: 展示条数
+
+    Returns:
+        Markdown 文本
+    """
+    entries = summary['entries'][:top_n]
+    lines = [f"### 🎯 Top {len(entries)} {title} (今日累计)", ""]
+
+    for idx, entry in enumerate(entries, 1):
+        sources = ", ".join(entry.get('sources') or [])
+        lines.append(f"{idx}. {entry['name']}")
+        if entry.get('category'):
+            lines.append(f"   - 类型: {entry['category']}")
+        lines.append(f"   - 证据: {entry.get('evidence', '')}")
+        lines.append(f"   - 提及次数: {entry.get('mentions', 1)} ({sources})")
+        if entry.get('action'):
+            lines.append(f"   - 建议行动: {entry['action']}")
+        lines.append("")
+
+    lines.append("### 📊 数据统计")
+    lines.append(f"- 今日累计条目: {summary['items_seen']}")
+    lines.append(f"- 今日分析轮次: {summary['cycles']}")
+    lines.append(f"- 摘要机会总数: {len(summary['entries'])}")
+    return "\n".join(lines)
@@ -0,0 +1,168 @@
+"""
+快速 RSS / Atom 解析 - lxml iterparse 流式解析已知格式，替代 feedparser 的完整解析
+已知格式: RSS 2.0 (YC、大多数博客) 与 Atom 1.0 (Reddit、Product Hunt)
+  - 只取文章需要的字段: 标题、摘要、链接、发布时间
+  - 取够 limit 条就停止解析，已处理的节点随即释放，大的 Reddit feed 不会整棵树留在内存里
+不认识的格式 (RSS 1.0 / RDF 等)、XML 有错或未安装 lxml 时返回 None，由调用方回退到 feedparser
+"""
+
+import io
+import os
+import logging
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import List, NamedTuple, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# ==================== 配置 ====================
+
+FAST_FEED_ENABLED = os.getenv('FAST_FEED_ENABLED', 'true').lower() == 'true'
+# 每个 feed 最多解析的条目数
+FEED_ENTRY_LIMIT = int(os.getenv('FEED_ENTRY_LIMIT', 50))
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+DC_DATE = '{http://purl.org/dc/elements/1.1/}date'
+CONTENT_ENCODED = '{http://purl.org/rss/1.0/modules/content/}encoded'
+
+
+class FeedEntry(NamedTuple):
+    """一条 feed 条目 (published 为 epoch 秒，缺失或无法解析时为 None)"""
+    title: str
+    summary: str
+    link: str
+    published: Optional[float]
+
+
+def _rfc822(value: Optional[str]) -> Optional[float]:
+    """RSS pubDate (Tue, 10 Jun 2025 04:00:00 +0000) → epoch 秒"""
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value.strip()).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _rfc3339(value: Optional[str]) -> Optional[float]:
+    """Atom / dc:date (2025-06-10T04:00:00+00:00) → epoch 秒，没有时区的按 UTC"""
+    if not value:
+        return None
+    try:
+        moment = datetime.fromisoformat(value.strip())
+    except ValueError:
+        return None
+    if moment.tzinfo is None:
+        return _rfc3339(value.strip() + '+00:00')
+    return moment.timestamp()
+
+
+def _text(elem) -> str:
+    return (elem.text or '').strip()
+
+
+def _rss_item(item) -> FeedEntry:
+    title = summary = link = encoded = ''
+    published = dc_date = None
+    for child in item:
+        tag = child.tag
+        if tag == 'title':
+            title = _text(child)
+        elif tag == 'link':
+            link = _text(child)
+        elif tag == 'description':
+            summary = _text(child)
+        elif tag == 'pubDate':
+            published = _rfc822(child.text)
+        elif tag == DC_DATE:
+            dc_date = _rfc3339(child.text)
+        elif tag == CONTENT_ENCODED:
+            encoded = _text(child)
+    return FeedEntry(title, summary or encoded, link, published if published is not None else dc_date)
+
+
+def _atom_entry(entry) -> FeedEntry:
+    title = summary = content = link = ''
+    published = updated = None
+    for child in entry:
+        tag = child.tag
+        if tag == ATOM + 'title':
+            title = _text(child)
+        elif tag == ATOM + 'link':
+            # rel 缺省即 alternate，取第一个
+            if not link and child.get('rel', 'alternate') == 'alternate':
+                link = child.get('href', '')
+        elif tag == ATOM + 'summary':
+            summary = _text(child)
+        elif tag == ATOM + 'content':
+            content = _text(child)
+        elif tag == ATOM + 'published':
+            published = _rfc3339(child.text)
+        elif tag == ATOM + 'updated':
+            updated = _rfc3339(child.text)
+    return FeedEntry(title, summary or content, link, published if published is not None else updated)
+
+
+# 根节点 → (条目节点, 提取函数)
+FORMATS = {
+    'rss': ('item', _rss_item),
+    ATOM + 'feed': (ATOM + 'entry', _atom_entry),
+}
+
+
+def parse(body: Union[str, bytes], limit: int = FEED_ENTRY_LIMIT) -> Optional[List[FeedEntry]]:
+    """
+    流式解析 feed 原文
+    
+    Args:
+        body: feed 原文 (str 按 UTF-8 处理，bytes 按 XML 声明的编码)
+        limit: 最多解析的条目数
+    
+    Returns:
+        条目列表；不是已知格式或解析失败时为 None (应回退到 feedparser)
+    """
+    if not FAST_FEED_ENABLED:
+        return None
+    try:
+        from lxml import etree
+    except ImportError:
+        return None
+    
+    if isinstance(body, str):
+        data, encoding = body.encode('utf-8'), 'utf-8'
+    else:
+        data, encoding = body, None
+    
+    entries: List[FeedEntry] = []
+    extract = None
+    try:
+        context = etree.iterparse(
+            io.BytesIO(data), events=('end',), tag=('item', ATOM + 'entry'), encoding=encoding,
+            resolve_entities=False, no_network=True, remove_comments=True,
+        )
+        for _, elem in context:
+            if extract is None:
+                root = elem.getroottree().getroot()
+                entry_tag, extract = FORMATS.get(root.tag, (None, None))
+                # RSS 只认 2.x (0.9x / 1.0 的字段不同)
+                if extract is None or (root.tag == 'rss' and not root.get('version', '2').startswith('2')):
+                    return None
+            if elem.tag != entry_tag:
+                continue
+            entries.append(extract(elem))
+            # 释放已处理的条目
+            elem.clear()
+            parent = elem.getparent()
+            while elem.getprevious() is not None:
+                del parent[0]
+            if len(entries) >= limit:
+                break
+        if extract is None:
+            # 没有任何条目: 已知格式的空 feed 返回空列表
+            root = context.root
+            if root is None or root.tag not in FORMATS:
+                return None
+    except etree.XMLSyntaxError as e:
+        logger.debug(f"快速解析失败，回退到 feedparser: {str(e)}")
+        return None
+    return entries
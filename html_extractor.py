@@ -0,0 +1,215 @@
+"""
+网页条目提取 - 按 CSS 选择器从没有 RSS 的页面 (Hugging Face Papers 等) 抽取条目
+  - 整页只解析一次，用 C 实现的解析器: selectolax (lexbor) 优先，其次 lxml + cssselect，
+    都没有安装时回退到 BeautifulSoup
+  - 每个来源的选择器在 keywords.yaml 的 scrapers 段声明，新增抓取来源只需加一段配置:
+        scrapers:
+          huggingface_papers:
+            item: article                       # 条目节点
+            fields:                             # "选择器" 取第一个匹配节点的文本，"选择器@属性" 取属性
+              title: h3
+              link: a@href
+              summary: p
+            required: [title]                   # 缺少这些字段的条目跳过
+            base_url: https://huggingface.co    # 相对链接的前缀
+            limit: 50
+    配置里同时写了 url / name / category 的来源会作为新的网页源加入 RSSHunter
+"""
+
+import os
+import logging
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+logger = logging.getLogger(__name__)
+
+# ==================== 配置 ====================
+
+# 解析器: auto | selectolax | lxml | bs4
+HTML_PARSER = os.getenv('HTML_PARSER', 'auto').lower()
+
+# 内置的抓取配置，keywords.yaml 中同名的配置按字段覆盖
+DEFAULT_SCRAPERS: Dict[str, Dict] = {
+    'huggingface_papers': {
+        'item': 'article',
+        'fields': {'title': 'h3', 'link': 'a@href', 'summary': 'p'},
+        'required': ['title'],
+        'base_url': 'https://huggingface.co',
+        'article_type': 'paper',
+        'limit': 50,
+    },
+}
+
+
+@dataclass(frozen=True)
+class Scraper:
+    """一个网页来源的提取规则"""
+    item: str
+    fields: Tuple[Tuple[str, str, Optional[str]], ...]     # (字段名, 选择器, 属性名或 None)
+    required: Tuple[str, ...] = ('title',)
+    base_url: str = ''
+    article_type: str = 'article'
+    limit: int = 50
+    
+    @classmethod
+    def from_config(cls, data: Dict) -> 'Scraper':
+        fields = []
+        for name, spec in (data.get('fields') or {}).items():
+            selector, _, attr = str(spec).partition('@')
+            fields.append((name, selector.strip(), attr.strip() or None))
+        if not data.get('item') or not fields:
+            raise ValueError("抓取配置需要 item 和 fields")
+        return cls(
+            item=data['item'],
+            fields=tuple(fields),
+            required=tuple(data.get('required') or ('title',)),
+            base_url=data.get('base_url', ''),
+            article_type=data.get('article_type', 'article'),
+            limit=int(data.get('limit', 50)),
+        )
+
+
+_configs: Optional[Dict[str, Dict]] = None
+_scrapers: Dict[str, Scraper] = {}
+_lock = threading.Lock()
+
+
+def configs(reload: bool = False) -> Dict[str, Dict]:
+    """内置配置合并 keywords.yaml 的 scrapers 段后的原始配置 (来源键名 → 配置)"""
+    global _configs
+    with _lock:
+        if _configs is None or reload:
+            merged = {key: dict(value) for key, value in DEFAULT_SCRAPERS.items()}
+            try:
+                from config_loader import ConfigLoader
+                for key, value in (ConfigLoader().load_keywords().scrapers or {}).items():
+                    merged.setdefault(key, {}).update(value or {})
+            except Exception as e:
+                logger.warning(f"读取抓取配置失败，使用内置配置: {str(e)}")
+            _configs = merged
+            _scrapers.clear()
+        return _configs
+
+
+def scraper(source_key: str) -> Optional[Scraper]:
+    """来源的提取规则，没有配置或配置无效时为 None"""
+    if source_key not in _scrapers:
+        data = configs().get(source_key)
+        if data is None:
+            return None
+        try:
+            _scrapers[source_key] = Scraper.from_config(data)
+        except (TypeError, ValueError) as e:
+            logger.error(f"❌ 抓取配置无效 {source_key}: {str(e)}")
+            return None
+    return _scrapers[source_key]
+
+
+# ==================== 解析后端 ====================
+
+def _selectolax(html: str, rule: Scraper) -> List[Dict[str, str]]:
+    from selectolax.lexbor import LexborHTMLParser
+    
+    rows = []
+    for node in LexborHTMLParser(html).css(rule.item)[:rule.limit]:
+        row = {}
+        for name, selector, attr in rule.fields:
+            found = node.css_first(selector)
+            if found is not None:
+                row[name] = (found.attributes.get(attr) or '') if attr else found.text(strip=True)
+        rows.append(row)
+    return rows
+
+
+@lru_cache(maxsize=256)
+def _xpath(selector: str, relative: bool):
+    """CSS 选择器 → 编译好的 XPath (按选择器缓存)"""
+    from lxml import etree
+    from cssselect import GenericTranslator
+    
+    prefix = 'descendant::' if relative else 'descendant-or-self::'
+    return etree.XPath(GenericTranslator().css_to_xpath(selector, prefix=prefix))
+
+
+def _lxml(html: str, rule: Scraper) -> List[Dict[str, str]]:
+    import lxml.html
+    
+    rows = []
+    for node in _xpath(rule.item, False)(lxml.html.document_fromstring(html))[:rule.limit]:
+        row = {}
+        for name, selector, attr in rule.fields:
+            found = _xpath(selector, True)(node)
+            if found:
+                row[name] = (found[0].get(attr) or '') if attr else ''.join(s.strip() for s in found[0].itertext())
+        rows.append(row)
+    return rows
+
+
+def _bs4(html: str, rule: Scraper) -> List[Dict[str, str]]:
+    from bs4 import BeautifulSoup
+    
+    rows = []
+    for node in BeautifulSoup(html, 'html.parser').select(rule.item, limit=rule.limit):
+        row = {}
+        for name, selector, attr in rule.fields:
+            found = node.select_one(selector)
+            if found is not None:
+                row[name] = (found.get(attr) or '') if attr else found.get_text(strip=True)
+        rows.append(row)
+    return rows
+
+
+# 后端 → (需要的模块, 提取函数)，auto 时按顺序取第一个可用的
+BACKENDS: Dict[str, Tuple[Tuple[str, ...], Callable[[str, Scraper], List[Dict[str, str]]]]] = {
+    'selectolax': (('selectolax.lexbor',), _selectolax),
+    'lxml': (('lxml.html', 'cssselect'), _lxml),
+    'bs4': (('bs4',), _bs4),
+}
+
+
+@lru_cache(maxsize=None)
+def backend() -> str:
+    """当前使用的解析后端"""
+    import importlib
+    
+    def available(name: str) -> bool:
+        try:
+            for module in BACKENDS[name][0]:
+                importlib.import_module(module)
+            return True
+        except ImportError:
+            return False
+    
+    if HTML_PARSER != 'auto':
+        if HTML_PARSER in BACKENDS and available(HTML_PARSER):
+            return HTML_PARSER
+        logger.warning(f"HTML 解析器 {HTML_PARSER} 不可用，自动选择")
+    for name in BACKENDS:
+        if available(name):
+            return name
+    raise ImportError("没有可用的 HTML 解析器 (selectolax / lxml+cssselect / beautifulsoup4)")
+
+
+def extract(html: str, rule: Scraper) -> List[Dict[str, str]]:
+    """
+    按规则从页面中提取条目
+    
+    Args:
+        html: 页面 HTML
+        rule: 提取规则
+    
+    Returns:
+        条目字段字典列表 (缺少必需字段的已跳过，link 已补全为绝对地址)
+    """
+    rows = BACKENDS[backend()][1](html, rule)
+    items = []
+    for row in rows:
+        if not all(row.get(name) for name in rule.required):
+            continue
+        if rule.base_url and row.get('link'):
+            row['link'] = urljoin(rule.base_url, row['link'])
+        items.append(row)
+    return items
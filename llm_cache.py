@@ -0,0 +1,181 @@
+"""
+LLM 响应缓存 - 按内容寻址的磁盘缓存
+键 = sha256(模型 + prompt 模板版本 + 归一化输入)，支持 TTL 与容量淘汰
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# ==================== 配置 ====================
+
+CACHE_DIR = Path(os.getenv('LLM_CACHE_DIR', './my_market_brain/llm_cache'))
+CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'true').lower() == 'true'
+CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', 7 * 24 * 3600))  # 默认7天
+CACHE_MAX_MB = float(os.getenv('LLM_CACHE_MAX_MB', 50))
+
+
+def normalize_input(raw_data: str) -> str:
+    """
+    归一化输入: 去掉空行和多余空白，并按行排序
+    同一批条目以不同顺序采集时得到相同的键 (重复的行保留，条数不同的两批键不同)
+    """
+    return '\n'.join(sorted(' '.join(line.split()) for line in raw_data.splitlines() if line.strip()))
+
+
+def make_key(model: str, template_version: str, raw_data: str) -> str:
+    """生成缓存键"""
+    digest = hashlib.sha256()
+    for part in (model, template_version, normalize_input(raw_data)):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """磁盘响应缓存 (每个键一个 JSON 文件，按 mtime 做 LRU 淘汰)"""
+
+    def __init__(self, cache_dir: Path = CACHE_DIR, ttl: int = CACHE_TTL,
+                 max_bytes: int = int(CACHE_MAX_MB * 1024 * 1024)):
+        """
+        初始化缓存
+
+        Args:
+            cache_dir: 缓存目录
+            ttl: 过期时间 (秒)
+            max_bytes: 缓存总容量上限
+        """
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'latency_saved': 0.0}
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        读取缓存
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存的响应文本，未命中或已过期返回 None
+        """
+        path = self._path(key)
+        entry = None
+        try:
+            entry = json.loads(path.read_text(encoding='utf-8'))
+            if time.time() - entry['created'] > self.ttl:
+                path.unlink(missing_ok=True)
+                entry = None
+            else:
+                os.utime(path)  # 刷新 LRU 时间
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"读取 LLM 缓存失败: {str(e)}")
+            entry = None
+
+        with self._lock:
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            self._stats['hits'] += 1
+            self._stats['latency_saved'] += entry.get('latency', 0.0)
+        return entry['text']
+
+    def put(self, key: str, text: str, latency: float, model: str = '') -> None:
+        """
+        写入缓存 (原子写)
+
+        Args:
+            key: 缓存键
+            text: 响应文本
+            latency: 原始调用耗时 (秒)，用于统计节省的延迟
+            model: 模型名
+        """
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+            tmp.write_text(json.dumps({
+                'created': time.time(),
+                'latency': latency,
+                'model': model,
+                'text': text,
+            }, ensure_ascii=False), encoding='utf-8')
+            os.replace(tmp, path)
+            self.evict()
+        except Exception as e:
+            logger.warning(f"写入 LLM 缓存失败: {str(e)}")
+
+    def evict(self) -> int:
+        """
+        淘汰过期条目，并在超出容量时按最近使用时间淘汰
+
+        Returns:
+            删除的条目数
+        """
+        if not self.cache_dir.exists():
+            return 0
+
+        now = time.time()
+        entries = []
+        removed = 0
+        for path in self.cache_dir.glob('*/*.json'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            # get 命中时会刷新 mtime，这里按闲置时长判断过期
+            if now - stat.st_mtime > self.ttl:
+                path.unlink(missing_ok=True)
+                removed += 1
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        if total > self.max_bytes:
+            for _, size, path in sorted(entries):
+                path.unlink(missing_ok=True)
+                removed += 1
+                total -= size
+                if total <= self.max_bytes:
+                    break
+        return removed
+
+    def stats(self) -> Dict[str, float]:
+        """命中率与节省的延迟"""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                'hits': self._stats['hits'],
+                'misses': self._stats['misses'],
+                'hit_rate': round(self._stats['hits'] / lookups, 4) if lookups else 0.0,
+                'latency_saved': round(self._stats['latency_saved'], 2),
+            }
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Optional[ResponseCache]:
+    """获取进程内共享的缓存，禁用时返回 None"""
+    global _cache
+    if not CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
@@ -0,0 +1,251 @@
+"""
+Gemini 调用封装 - 重试 (指数退避 + 抖动) + 响应缓存
+同步接口供线程中的模块使用，异步流式接口供事件循环使用
+pain_radar_v2 与 opportunity_hunter 共用
+"""
+
+import os
+import time
+import random
+import asyncio
+import logging
+from functools import lru_cache
+from typing import Callable, List, Optional
+
+import llm_cache
+import metrics
+
+logger = logging.getLogger(__name__)
+
+MODEL = 'gemini-2.5-flash'
+
+# 指向本地替身服务 (benchmarks/llm_stub.py) 等兼容端点时设置
+GEMINI_BASE_URL = os.getenv('GEMINI_BASE_URL', '')
+
+# 单次调用 (含流式读取) 的截止时间 (秒)
+CALL_DEADLINE = float(os.getenv('LLM_CALL_DEADLINE', 120))
+# 退避参数: 第 n 次重试等待 uniform(0, min(cap, base * 2^n)) 秒
+BACKOFF_BASE = float(os.getenv('LLM_BACKOFF_BASE', 2))
+BACKOFF_CAP = float(os.getenv('LLM_BACKOFF_CAP', 60))
+
+# 可重试的 HTTP 状态码: 限流与服务端错误
+RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+
+
+def create_client(api_key: str):
+    """
+    创建 genai.Client，配置了 GEMINI_BASE_URL 时改连该端点
+    
+    Args:
+        api_key: Gemini API 密钥
+    
+    Returns:
+        genai.Client
+    """
+    from google import genai
+    
+    if GEMINI_BASE_URL:
+        return genai.Client(api_key=api_key, http_options={'base_url': GEMINI_BASE_URL})
+    return genai.Client(api_key=api_key)
+
+
+def _status_code(exc: Exception) -> Optional[int]:
+    """从 SDK 异常中取 HTTP 状态码 (google.genai.errors.APIError.code)"""
+    code = getattr(exc, 'code', None) or getattr(exc, 'status_code', None)
+    return code if isinstance(code, int) else None
+
+
+@lru_cache(maxsize=None)
+def _network_errors() -> tuple:
+    """超时与网络异常类型 (SDK 底层的 httpx / aiohttp 未安装的跳过)"""
+    types = [TimeoutError, ConnectionError]
+    try:
+        import httpx
+        types.append(httpx.TransportError)
+    except ImportError:
+        pass
+    try:
+        import aiohttp
+        types.append(aiohttp.ClientConnectionError)
+        types.append(aiohttp.ClientPayloadError)
+    except ImportError:
+        pass
+    return tuple(types)
+
+
+def is_retryable(exc: Exception) -> bool:
+    """429/5xx、超时与网络错误可重试，其余 4xx (如密钥错误) 和程序错误 (ValueError 等) 直接失败"""
+    code = _status_code(exc)
+    if code is not None:
+        return code in RETRYABLE_CODES
+    return isinstance(exc, _network_errors())
+
+
+def backoff_delay(attempt: int) -> float:
+    """指数退避 + 全抖动"""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+
+def _cache_lookup(template_version: str, cache_input: str, model: str):
+    cache = llm_cache.get_cache()
+    key = llm_cache.make_key(model, template_version, cache_input)
+    cached = cache.get(key) if cache is not None else None
+    if cache is not None:
+        metrics.observe_llm_cache(cached is not None)
+    if cached is not None:
+        print(f"⚡ 命中 LLM 缓存 ({template_version})")
+    return cache, key, cached
+
+
+def generate_text(client, prompt: str, *, template_version: str, cache_input: str,
+                  model: str = MODEL, max_retries: int = 3) -> Optional[str]:
+    """
+    调用 Gemini 生成文本，命中缓存时直接返回
+    
+    Args:
+        client: genai.Client
+        prompt: 完整 prompt
+        template_version: prompt 模板版本 (模板改动时递增，使旧缓存失效)
+        cache_input: 参与缓存键计算的原始输入
+        model: 模型名
+        max_retries: 最大重试次数
+    
+    Returns:
+        响应文本，全部失败返回 None
+    """
+    cache, key, cached = _cache_lookup(template_version, cache_input, model)
+    if cached is not None:
+        return cached
+    
+    for attempt in range(max_retries):
+        try:
+            start = time.perf_counter()
+            response = client.models.generate_content(
+                model=model,
+                contents=prompt
+            )
+            latency = time.perf_counter() - start
+            metrics.observe_llm('sync', 'ok', latency, getattr(response, 'usage_metadata', None))
+            text = response.text
+            if text and cache is not None:
+                cache.put(key, text, latency, model=model)
+            return text
+        except Exception as e:
+            metrics.observe_llm('sync', 'error', time.perf_counter() - start)
+            print(f"⚠️ 分析尝试 {attempt+1}/{max_retries} 失败: {e}")
+            if not is_retryable(e):
+                break
+            if attempt < max_retries - 1:
+                time.sleep(backoff_delay(attempt))
+    
+    return None
+
+
+async def generate_text_async(client, prompt: str, *, template_version: str, cache_input: str,
+                              model: str = MODEL, max_retries: int = 3,
+                              deadline: float = CALL_DEADLINE,
+                              on_text: Optional[Callable[[Optional[str]], None]] = None) -> Optional[str]:
+    """
+    异步流式调用 Gemini，不阻塞事件循环
+    
+    Args:
+        client: genai.Client (使用 client.aio)
+        prompt: 完整 prompt
+        template_version: prompt 模板版本
+        cache_input: 参与缓存键计算的原始输入
+        model: 模型名
+        max_retries: 最大重试次数
+        deadline: 单次调用 (含流式读取) 的截止时间 (秒)
+        on_text: 每收到一段文本时回调；重试前会以 None 回调，通知消费方丢弃已收到的部分
+    
+    Returns:
+        完整响应文本，全部失败返回 None
+    """
+    cache, key, cached = _cache_lookup(template_version, cache_input, model)
+    if cached is not None:
+        if on_text:
+            on_text(cached)
+        return cached
+    
+    usage = []
+    
+    async def _stream(parts: List[str]) -> None:
+        stream = await client.aio.models.generate_content_stream(
+            model=model,
+            contents=prompt
+        )
+        async for chunk in stream:
+            # 用量在最后一个分片里给出
+            if getattr(chunk, 'usage_metadata', None) is not None:
+                usage[:] = [chunk.usage_metadata]
+            piece = chunk.text
+            if piece:
+                parts.append(piece)
+                if on_text:
+                    on_text(piece)
+    
+    for attempt in range(max_retries):
+        parts: List[str] = []
+        try:
+            start = time.perf_counter()
+            await asyncio.wait_for(_stream(parts), timeout=deadline)
+            latency = time.perf_counter() - start
+            metrics.observe_llm('stream', 'ok', latency, usage[0] if usage else None)
+            text = ''.join(parts)
+            if text and cache is not None:
+                cache.put(key, text, latency, model=model)
+            return text
+        except asyncio.TimeoutError:
+            metrics.observe_llm('stream', 'timeout', time.perf_counter() - start)
+            print(f"⚠️ 分析尝试 {attempt+1}/{max_retries} 超时 ({deadline:.0f}秒)")
+        except Exception as e:
+            metrics.observe_llm('stream', 'error', time.perf_counter() - start)
+            print(f"⚠️ 分析尝试 {attempt+1}/{max_retries} 失败: {e}")
+            if not is_retryable(e):
+                break
+        if parts and on_text:
+            on_text(None)
+        if attempt < max_retries - 1:
+            await asyncio.sleep(backoff_delay(attempt))
+    
+    return None
+
+
+class LineAssembler:
+    """把流式文本片段拼成完整行，逐行交给消费方，使报告渲染可以边收边做"""
+    
+    def __init__(self, on_line: Callable[[str], None]):
+        self.on_line = on_line
+        self._buffer = ''
+        self.lines = 0
+        self.resets = 0
+    
+    def feed(self, piece: Optional[str]) -> None:
+        """接收一段文本；None 表示上游重试，已输出的行作废"""
+        if piece is None:
+            self._buffer = ''
+            self.resets += 1
+            return
+        self._buffer += piece
+        *complete, self._buffer = self._buffer.split('\n')
+        for line in complete:
+            self.lines += 1
+            self.on_line(line)
+    
+    def flush(self) -> None:
+        """输出最后一行残余"""
+        if self._buffer:
+            self.lines += 1
+            self.on_line(self._buffer)
+            self._buffer = ''
+    
+    @property
+    def is_clean(self) -> bool:
+        """是否完整无重试地收到了内容"""
+        return self.lines > 0 and self.resets == 0
+
+
+def cache_stats() -> Optional[dict]:
+    """LLM 缓存统计，缓存禁用时返回 None"""
+    cache = llm_cache.get_cache()
+    return cache.stats() if cache is not None else None
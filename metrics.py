@@ -0,0 +1,246 @@
+"""
+运行指标 - Prometheus /metrics 与基于最近一次成功循环的 /healthz
+各模块只调用本模块的 observe_* / count_* 函数；未安装 prometheus_client 或 METRICS_ENABLED=false 时
+这些函数什么都不做，/healthz 照常提供 (守护进程模式下由 docker-compose 健康检查调用)
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# ==================== 配置 ====================
+
+# 只控制指标采集与 /metrics，/healthz 总是提供
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+METRICS_PORT = int(os.getenv('METRICS_PORT', 8000))
+# 距最近一次成功循环超过该秒数即判定不健康，0 表示按循环间隔自动计算
+HEALTH_MAX_AGE = float(os.getenv('HEALTH_MAX_AGE', 0))
+
+FETCH_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+STORE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 5)
+LLM_BUCKETS = (0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+CYCLE_BUCKETS = (10, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+PUSH_BUCKETS = (1, 5, 30, 60, 300, 900, 3600)
+
+_lock = threading.Lock()
+_metrics = None
+_unavailable = False
+_started_at = time.time()
+_last_success: Optional[float] = None
+_last_results: Dict[str, str] = {}
+_max_age = HEALTH_MAX_AGE
+_server = None
+
+
+class _Metrics:
+    """全部指标对象 (首次使用时才导入 prometheus_client)"""
+    
+    def __init__(self):
+        from prometheus_client import Counter, Gauge, Histogram
+        
+        self.fetch_seconds = Histogram(
+            'market_monitor_fetch_seconds', '单次 HTTP 抓取耗时', ['host'], buckets=FETCH_BUCKETS)
+        self.fetch_requests = Counter(
+            'market_monitor_fetch_requests_total', 'HTTP 抓取次数', ['host', 'outcome'])
+        self.items = Counter(
+            'market_monitor_items_total', '条目数 (fetched 候选 / filtered 过滤 / deduped 重复 / stored 新入库)',
+            ['collection', 'source', 'stage'])
+        self.llm_cache = Counter(
+            'market_monitor_llm_cache_requests_total', 'LLM 缓存查询', ['result'])
+        self.store_write_seconds = Histogram(
+            'market_monitor_store_write_seconds', 'Chroma 单次批量写入耗时', ['kind'], buckets=STORE_BUCKETS)
+        self.store_write_ops = Counter(
+            'market_monitor_store_write_ops_total', 'Chroma 写操作数', ['kind'])
+        self.llm_seconds = Histogram(
+            'market_monitor_llm_request_seconds', 'Gemini 单次调用耗时', ['mode', 'outcome'], buckets=LLM_BUCKETS)
+        self.llm_tokens = Counter(
+            'market_monitor_llm_tokens_total', 'Gemini token 用量', ['direction'])
+        self.push = Counter(
+            'market_monitor_push_total', 'PushPlus 推送结果', ['outcome'])
+        self.push_latency = Histogram(
+            'market_monitor_push_delivery_seconds', '推送从入队到送达的延迟', buckets=PUSH_BUCKETS)
+        self.cycle_seconds = Histogram(
+            'market_monitor_cycle_seconds', '监控循环耗时', buckets=CYCLE_BUCKETS)
+        self.cycles = Counter(
+            'market_monitor_cycles_total', '各模块循环结果', ['module', 'result'])
+        self.last_success = Gauge(
+            'market_monitor_last_success_timestamp_seconds', '最近一次成功循环的完成时间')
+
+
+def _get() -> Optional[_Metrics]:
+    global _metrics, _unavailable
+    if _metrics is not None or _unavailable or not METRICS_ENABLED:
+        return _metrics
+    with _lock:
+        if _metrics is None and not _unavailable:
+            try:
+                _metrics = _Metrics()
+            except ImportError:
+                _unavailable = True
+                logger.info("prometheus_client 未安装，指标采集已关闭")
+    return _metrics
+
+
+# ==================== 采集 ====================
+
+def observe_fetch(host: str, seconds: float, ok: bool) -> None:
+    m = _get()
+    if m is not None:
+        m.fetch_seconds.labels(host).observe(seconds)
+        m.fetch_requests.labels(host, 'ok' if ok else 'error').inc()
+
+
+def count_items(collection: str, source: str, stage: str, n: int = 1) -> None:
+    """
+    条目计数
+    
+    Args:
+        collection: 集合名
+        source: 数据源
+        stage: fetched / filtered / deduped / stored
+        n: 数量
+    """
+    m = _get()
+    if m is not None and n:
+        m.items.labels(collection, source, stage).inc(n)
+
+
+def observe_llm_cache(hit: bool) -> None:
+    m = _get()
+    if m is not None:
+        m.llm_cache.labels('hit' if hit else 'miss').inc()
+
+
+def observe_store_write(kind: str, seconds: float, ops: int) -> None:
+    m = _get()
+    if m is not None:
+        m.store_write_seconds.labels(kind).observe(seconds)
+        m.store_write_ops.labels(kind).inc(ops)
+
+
+def observe_llm(mode: str, outcome: str, seconds: float, usage=None) -> None:
+    """
+    记录一次 Gemini 调用
+    
+    Args:
+        mode: sync / stream
+        outcome: ok / error / timeout
+        seconds: 耗时
+        usage: 响应的 usage_metadata (含 prompt_token_count / candidates_token_count)
+    """
+    m = _get()
+    if m is None:
+        return
+    m.llm_seconds.labels(mode, outcome).observe(seconds)
+    if usage is not None:
+        m.llm_tokens.labels('input').inc(getattr(usage, 'prompt_token_count', None) or 0)
+        m.llm_tokens.labels('output').inc(getattr(usage, 'candidates_token_count', None) or 0)
+
+
+def count_push(outcome: str, latency: Optional[float] = None) -> None:
+    m = _get()
+    if m is not None:
+        m.push.labels(outcome).inc()
+        if latency is not None:
+            m.push_latency.observe(latency)
+
+
+def observe_cycle(seconds: float, results: Dict[str, str]) -> None:
+    """记录一轮循环；所有模块都成功时刷新健康检查的时间戳"""
+    global _last_success, _last_results
+    _last_results = dict(results)
+    ok = bool(results) and all(result == 'success' for result in results.values())
+    if ok:
+        _last_success = time.time()
+    
+    m = _get()
+    if m is None:
+        return
+    m.cycle_seconds.observe(seconds)
+    for module, result in results.items():
+        m.cycles.labels(module, result).inc()
+    if ok:
+        m.last_success.set(_last_success)
+
+
+# ==================== 健康检查与 HTTP 服务 ====================
+
+def health() -> Dict:
+    """
+    健康状态: 启动后尚未完成首轮时在宽限期内视为健康
+    
+    Returns:
+        {'healthy': bool, 'last_success_age': 秒或 None, 'max_age': 秒, 'last_results': {...}}
+    """
+    now = time.time()
+    age = now - _last_success if _last_success is not None else None
+    reference = age if age is not None else now - _started_at
+    return {
+        'healthy': _max_age <= 0 or reference <= _max_age,
+        'last_success_age': round(age, 1) if age is not None else None,
+        'max_age': _max_age,
+        'last_results': _last_results,
+    }
+
+
+def start_server(port: int = METRICS_PORT, max_age: Optional[float] = None) -> bool:
+    """
+    在后台线程启动 /healthz 与 /metrics (METRICS_ENABLED=false 时只有 /healthz)
+    
+    Args:
+        port: 监听端口
+        max_age: 健康检查允许的最近成功循环最大间隔 (秒)，HEALTH_MAX_AGE 已设置时以环境变量为准
+    
+    Returns:
+        是否已启动
+    """
+    global _server, _max_age
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    if not HEALTH_MAX_AGE and max_age:
+        _max_age = max_age
+    if _server is not None:
+        return True
+    
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+        
+        def _reply(self, status: int, body: bytes, content_type: str) -> None:
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def do_GET(self):
+            path = self.path.split('?', 1)[0]
+            if path == '/healthz':
+                state = health()
+                body = json.dumps(state, ensure_ascii=False).encode('utf-8')
+                self._reply(200 if state['healthy'] else 503, body, 'application/json')
+            elif path == '/metrics' and METRICS_ENABLED:
+                if _get() is None:
+                    self._reply(503, "prometheus_client 未安装\n".encode('utf-8'), 'text/plain; charset=utf-8')
+                    return
+                from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+                self._reply(200, generate_latest(), CONTENT_TYPE_LATEST)
+            else:
+                self._reply(404, b'not found\n', 'text/plain')
+    
+    try:
+        _server = ThreadingHTTPServer(('0.0.0.0', port), Handler)
+    except OSError as e:
+        print(f"⚠️ 指标服务启动失败 (端口 {port}): {e}")
+        return False
+    threading.Thread(target=_server.serve_forever, name='metrics-http', daemon=True).start()
+    if METRICS_ENABLED:
+        print(f"📈 指标服务已启动: http://0.0.0.0:{port}/metrics , /healthz")
+    else:
+        print(f"📈 健康检查已启动: http://0.0.0.0:{port}/healthz (指标已关闭)")
+    return True
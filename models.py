@@ -0,0 +1,122 @@
+"""
+统一的条目模型 - 痛点、机会、RSS 文章从抓取到入库都用同一个紧凑的 Item
+  - dataclass(slots=True)，每条没有 __dict__
+  - 来源、类别、产品、痛点词等反复出现的短字符串经 sys.intern 共享同一个对象
+  - 时间统一为 epoch 秒 (float)，只在写入 Chroma 元数据时格式化一次
+  - 内容指纹在构造时算一次，doc id 由它拼出 (不单独保存)
+"""
+
+import sys
+import time
+import hashlib
+from datetime import datetime
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+# 产品 / 痛点词组合的共享元组 (组合数有限，条目之间复用同一个元组)
+_TUPLES: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+_TUPLES_MAX = 4096
+
+
+def _shared(values) -> Tuple[str, ...]:
+    values = tuple(sys.intern(v) for v in values)
+    if not values:
+        return ()
+    shared = _TUPLES.get(values)
+    if shared is None:
+        if len(_TUPLES) >= _TUPLES_MAX:
+            return values
+        shared = _TUPLES[values] = values
+    return shared
+
+
+@dataclass(slots=True)
+class Item:
+    """一条痛点 / 机会 / 文章"""
+    kind: str                           # pain / opportunity / article
+    source: str                         # 来源: Reddit、GitHub、RSS 源名称等
+    title: str = ''
+    content: str = ''                   # 痛点正文 / 机会描述 / 文章摘要
+    link: str = ''
+    author: str = ''
+    category: str = ''                  # 机会类型 (OpenSource、Funding 等)，文章为 article / paper
+    group: str = ''                     # RSS 源分组 (community、research 等)
+    products: Tuple[str, ...] = ()      # 痛点涉及的产品，第一个为主产品
+    keywords: Tuple[str, ...] = ()      # 命中的痛点词
+    published: float = 0.0              # 发布时间 (epoch 秒)，未知为 0
+    fetched: float = 0.0                # 抓取时间 (epoch 秒)
+    fingerprint: str = ''               # 内容指纹 (md5)
+    extra: Optional[Dict] = None        # 来源特有的少量字段 (stars、score 等)
+    
+    def __post_init__(self):
+        self.source = sys.intern(self.source)
+        self.category = sys.intern(self.category)
+        self.group = sys.intern(self.group)
+        self.products = _shared(self.products)
+        self.keywords = _shared(self.keywords)
+    
+    @property
+    def id(self) -> str:
+        """
+        向量库 doc id (与旧版一致):
+          痛点 PAIN_<来源>_<主产品>_<指纹>，没有产品标签时为空
+          机会 OPP_<来源>_<指纹>
+        文章不入库，为空
+        """
+        if self.kind == 'pain':
+            return f"PAIN_{self.source}_{self.products[0]}_{self.fingerprint}" if self.products else ''
+        if self.kind == 'opportunity':
+            return f"OPP_{self.source}_{self.fingerprint}"
+        return ''
+    
+    def to_dict(self) -> Dict:
+        """转成可 JSON 序列化的字典 (检查点用)"""
+        return {name: getattr(self, name) for name in self.__slots__}
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Item':
+        return cls(**{name: data[name] for name in cls.__slots__ if name in data})
+
+
+def fingerprint(text: str) -> str:
+    return hashlib.md5(text.encode('utf-8')).hexdigest()
+
+
+def isoformat(timestamp: float) -> str:
+    """epoch 秒 → 本地时间 ISO 字符串 (与库中已有的 time 元数据格式一致)"""
+    return datetime.fromtimestamp(timestamp).isoformat()
+
+
+def pain(source: str, author, content: str, products, keywords=()) -> Item:
+    """痛点条目 (不做过滤)，指纹按正文计算"""
+    return Item(
+        kind='pain', source=source, author=str(author), content=content,
+        products=products, keywords=keywords,
+        fetched=time.time(), fingerprint=fingerprint(content),
+    )
+
+
+def opportunity(source: str, title: str, description: str, link: str, category: str = 'unknown',
+                published: float = 0.0, extra: Optional[Dict] = None) -> Item:
+    """机会条目，指纹按入库文本 "来源: 标题 | 描述" 计算"""
+    return Item(
+        kind='opportunity', source=source, title=title, content=description, link=link,
+        category=category, published=published, extra=extra or None,
+        fetched=time.time(), fingerprint=fingerprint(f"{source}: {title} | {description}"),
+    )
+
+
+def article(source: str, title: str, summary: str, link: str, category: str = 'article',
+            group: str = '', published: Optional[float] = None) -> Item:
+    """
+    RSS / 网页文章 (指纹按完整摘要计算，保存的摘要截断到 500 字)
+    
+    Args:
+        published: 发布时间 (epoch 秒)，未知时取当前时间
+    """
+    now = time.time()
+    return Item(
+        kind='article', source=source, title=title, content=summary[:500], link=link,
+        category=category, group=group, published=published or now, fetched=now,
+        fingerprint=fingerprint(f"{title}{summary}"),
+    )
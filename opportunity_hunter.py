@@ -7,31 +7,32 @@ Purpose: 发现融资项目、创业团队、技术突破
 """
 
 import os
+import asyncio
 import datetime
-import time
-import hashlib
 import json
-import sys
-from pathlib import Path
-
-try:
-    from google import genai
-    import requests
-    import chromadb
-    from docx import Document
-    from docx.shared import Pt, RGBColor
-except ImportError as e:
-    print(f"❌ 依赖库缺失: {e}")
-    sys.exit(1)
+
+import cycle
+import runtime
+import store
+import triage
+import analysis_pipeline
+import daily_summary
+import clustering
+import report_renderer
+import metrics
+import profiling
+import checkpoint
+import coordination
+import models
+import pipeline
+from rss_hunter import RSSHunter, GoogleTrendsMonitor
 
 # ==================== 🛠️ 用户配置区 ====================
 
 GEMINI_KEY = os.getenv('GEMINI_API_KEY', '填入自己的API-key')
-PUSHPLUS_TOKEN = os.getenv('PUSHPLUS_TOKEN', '填入自己的TOKEN')
 GITHUB_TOKEN = os.getenv('GITHUB_TOKEN', '')
 
 YOUR_PORT = int(os.getenv('PROXY_PORT', 19828))
-USE_PROXY = YOUR_PORT > 0
 
 # GitHub搜索关键词 - 精确版
 GITHUB_KEYWORDS = [
@@ -60,6 +61,16 @@ GITHUB_KEYWORDS = [
 MIN_STARS = 300
 DAYS_SINCE_UPDATE = 90
 
+# GitHub 搜索接口
+GITHUB_SEARCH_URL = os.getenv('GITHUB_SEARCH_URL') or 'https://api.github.com/search/repositories'
+
+# Hacker News 扫描范围
+HN_TOP_LIMIT = 15
+HN_MIN_SCORE = 150
+
+# Google Trends 地区
+TRENDS_REGION = os.getenv('GOOGLE_TRENDS_REGION', 'united_states')
+
 # Hacker News关键词
 HN_KEYWORDS = [
     'AI', 'machine learning', 'LLM', 'GPT', 'Claude',
@@ -69,207 +80,239 @@ HN_KEYWORDS = [
 
 # =======================================================================
 
-if USE_PROXY:
-    PROXY_URL = f'http://127.0.0.1:{YOUR_PORT}'
-    os.environ['http_proxy'] = PROXY_URL
-    os.environ['https_proxy'] = PROXY_URL
-    print(f"📡 代理已启用: {PROXY_URL}")
+OPPORTUNITY_COLLECTION = "opportunities_v2"
 
-DATA_DIR = Path('./my_market_brain')
-DATA_DIR.mkdir(exist_ok=True)
+# 客户端在第一次使用时由 runtime / store 创建，导入本模块不联网、不建库
 
-print(f"🔍 机会猎手 v2.0 启动... [时间: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}]")
+def get_gemini_client():
+    return runtime.get_gemini_client(GEMINI_KEY)
 
-try:
-    gemini_client = genai.Client(api_key=GEMINI_KEY)
-    chroma_client = chromadb.PersistentClient(path=str(DATA_DIR))
-    opportunity_collection = chroma_client.get_or_create_collection(name="opportunities_v2")
-    print("✅ 所有组件加载完毕")
-except Exception as e:
-    print(f"❌ 初始化失败: {e}")
-    sys.exit(1)
+def get_opportunity_collection():
+    return store.get_collection(OPPORTUNITY_COLLECTION)
 
 current_session_opportunities = []
 
 # ==================== 工具函数 ====================
 
-def create_robust_session():
-    """创建抗网络波动的会话"""
-    session = requests.Session()
-    if USE_PROXY:
-        session.proxies = {"http": PROXY_URL, "https": PROXY_URL}
-    return session
+def opportunity_metadata(item):
+    """机会写入 Chroma 的元数据（时间在这里格式化一次）"""
+    return {
+        "source": item.source,
+        "title": item.title,
+        "type": item.category,
+        "time": models.isoformat(item.fetched),
+        "link": item.link
+    }
 
-http = create_robust_session()
+def opportunity_document(item):
+    """机会的入库文本（指纹按它计算）"""
+    return f"{item.source}: {item.title} | {item.content}"
 
-def save_opportunity(source, title, description, link, metadata):
-    """保存机会"""
-    try:
-        content = f"{source}: {title} | {description}"
-        content_fingerprint = hashlib.md5(content.encode('utf-8')).hexdigest()
-        doc_id = f"OPP_{source}_{content_fingerprint}"
-        
-        # 检查重复
-        existing = opportunity_collection.get(ids=[doc_id])
-        if existing and existing['ids']:
-            return False
-        
-        current_time = datetime.datetime.now().isoformat()
-        opportunity_collection.upsert(
-            documents=[content],
-            metadatas=[{
-                "source": source,
-                "title": title,
-                "type": metadata.get('type', 'unknown'),
-                "time": current_time,
-                "link": link
-            }],
-            ids=[doc_id]
-        )
-        
-        current_session_opportunities.append({
-            'source': source,
-            'title': title,
-            'description': description,
-            'link': link,
-            'metadata': metadata,
-            'time': current_time
-        })
-        
-        print(f"  💡 [{source}] {title[:50]}...")
-        return True
-    except Exception as e:
-        print(f"  ⚠️ 保存失败: {e}")
-        return False
+def record_opportunity(item):
+    """把已入库的机会计入本轮会话 (流水线的会话阶段)"""
+    current_session_opportunities.append(item)
+    checkpoint.record_item('opportunity', item)
+    print(f"  💡 [{item.source}] {item.title[:50]}...")
+    return item
 
-def hunt_github():
-    """GitHub项目猎手"""
-    print("\n🐙 [1/2] 正在扫描 GitHub...")
-    count = 0
-    
-    headers = {
-        'Accept': 'application/vnd.github.v3+json',
-        'User-Agent': 'MarketHunter/v2'
-    }
+# ==================== 处理流水线 ====================
+# 数据源只负责抓取，抓到的每批原始数据送入流水线: 解析 → 过滤 → 查重+入库 → 会话
+
+def parse_batch(job):
+    """解析阶段: (提取函数, 一批原始数据) → 机会条目"""
+    extract, raw = job
+    with profiling.span('match', module='opportunity'):
+        return list(extract(raw))
+
+def filter_opportunity(item):
+    """过滤阶段: 只计数 (机会的筛选已在各提取函数中完成)"""
+    metrics.count_items(OPPORTUNITY_COLLECTION, item.source, 'fetched')
+    return item
+
+async def store_opportunity(item):
+    """入库阶段: 查重和写入在 store 写线程内一次完成，已存在则丢弃"""
+    collection = get_opportunity_collection()
+    if not await collection.add_if_absent_async(item.id, opportunity_document(item), opportunity_metadata(item)):
+        metrics.count_items(OPPORTUNITY_COLLECTION, item.source, 'deduped')
+        return None
+    metrics.count_items(OPPORTUNITY_COLLECTION, item.source, 'stored')
+    return item
+
+def build_pipeline():
+    """本轮的机会处理流水线"""
+    return pipeline.Pipeline([
+        pipeline.Stage('parse', parse_batch, expand=True),
+        pipeline.Stage('filter', filter_opportunity, inline=True),
+        pipeline.Stage('store', store_opportunity, workers=pipeline.PIPELINE_STORE_WORKERS),
+        pipeline.Stage('session', record_opportunity, inline=True),
+    ], name='opportunity')
+
+async def feed(pipe, extract, raw):
+    """把一批原始数据送入流水线，返回其中新入库的条数"""
+    return len(await pipe.feed((extract, raw)))
+
+# ==================== 数据源 ====================
+# 每个数据源拆成 抓取 (I/O) 和 提取 (纯计算) 两步，多进程模式下两步在不同进程执行
+
+def github_headers():
+    headers = {'Accept': 'application/vnd.github.v3+json'}
     if GITHUB_TOKEN:
         headers['Authorization'] = f'token {GITHUB_TOKEN}'
+    return headers
+
+async def search_github(ctx, keyword):
+    """
+    按关键词搜索 GitHub 仓库
     
+    Returns:
+        仓库列表，频率超限或出错时为空
+    """
+    print(f"  🔍 搜索: {keyword}")
     try:
-        for keyword in GITHUB_KEYWORDS[:5]:  # 每次选5个关键词
-            print(f"  🔍 搜索: {keyword}")
-            
-            api_url = f"https://api.github.com/search/repositories?q={keyword}+stars:>{MIN_STARS}&sort=updated&order=desc&per_page=3"
+        resp = await ctx.request('GET', GITHUB_SEARCH_URL, headers=github_headers(), params={
+            'q': f"{keyword} stars:>{MIN_STARS}",
+            'sort': 'updated',
+            'order': 'desc',
+            'per_page': 3,
+        })
+        
+        if resp.status == 403:
+            print("⛔ GitHub API 频率超限")
+        elif resp.status != 200:
+            print(f"     ⚠️ 搜索出错: HTTP {resp.status}")
+        else:
+            return resp.json().get('items', [])
+    except Exception as e:
+        print(f"     ⚠️ 搜索出错: {e}")
+    ctx.fail_unit(f'github:{keyword}')
+    return []
+
+def github_opportunities(items):
+    """从 GitHub 搜索结果中提取近期活跃的仓库"""
+    for item in items:
+        updated_at = item['updated_at'][:10]
+        last_update = datetime.datetime.strptime(updated_at, "%Y-%m-%d")
+        days_diff = (datetime.datetime.now() - last_update).days
+        
+        if days_diff > DAYS_SINCE_UPDATE:
+            continue
+        
+        yield models.opportunity(
+            source="GitHub",
+            title=item['full_name'],
+            description=item['description'] or "No description",
+            link=item['html_url'],
+            category='OpenSource',
+            published=last_update.timestamp(),
+            extra={'stars': item['stargazers_count'], 'language': item['language']}
+        )
+
+def classify_story(title, text):
+    """按关键词判断 HN 故事的机会类型，不是机会时返回 None"""
+    content_lower = (title + text).lower()
+    if any(kw in content_lower for kw in ['funding', 'series', 'raised', 'investment']):
+        return 'Funding'
+    if any(kw in content_lower for kw in ['startup', 'founded', 'launch']):
+        return 'Startup'
+    if any(kw in content_lower for kw in ['breakthrough', 'SOTA', 'new', 'release']):
+        return 'Technology'
+    return None
+
+def hn_opportunities(stories):
+    """从 HN 热门故事中提取机会（高分且命中机会关键词）"""
+    for item in stories[:HN_TOP_LIMIT]:
+        if item.get('score', 0) >= HN_MIN_SCORE:
+            title = item.get('title', '')
+            text = item.get('text', '')
             
-            try:
-                resp = http.get(api_url, headers=headers, timeout=15)
-                
-                if resp.status_code == 200:
-                    items = resp.json().get('items', [])
-                    
-                    for item in items:
-                        updated_at = item['updated_at'][:10]
-                        last_update = datetime.datetime.strptime(updated_at, "%Y-%m-%d")
-                        days_diff = (datetime.datetime.now() - last_update).days
-                        
-                        if days_diff > DAYS_SINCE_UPDATE:
-                            continue
-                        
-                        if save_opportunity(
-                            source="GitHub",
-                            title=item['full_name'],
-                            description=item['description'] or "No description",
-                            link=item['html_url'],
-                            metadata={
-                                'type': 'OpenSource',
-                                'stars': item['stargazers_count'],
-                                'language': item['language'],
-                                'updated': updated_at
-                            }
-                        ):
-                            count += 1
-                
-                elif resp.status_code == 403:
-                    print("⛔ GitHub API 频率超限")
-                    break
-                
-                time.sleep(1)
-                
-            except Exception as e:
-                print(f"     ⚠️ 搜索出错: {e}")
-                continue
+            # 检查是否包含机会关键词
+            opp_type = classify_story(title, text)
+            if opp_type:
+                yield models.opportunity(
+                    source="HackerNews",
+                    title=title,
+                    description=text[:200],
+                    link=item.get('url', ''),
+                    category=opp_type,
+                    published=item.get('time', 0),
+                    extra={'score': item.get('score', 0)}
+                )
+
+def rss_opportunities(articles):
+    """RSS 文章原样作为机会候选"""
+    for article in articles:
+        yield models.opportunity(
+            source=article.source,
+            title=article.title,
+            description=article.content[:200],
+            link=article.link,
+            category=article.category,
+            published=article.published
+        )
+
+def trend_opportunities(trends):
+    """从 Google Trends 热搜中提取与 AI 相关的词"""
+    keywords = [k.lower() for k in HN_KEYWORDS]
+    for trend in trends:
+        keyword = str(trend['keyword'])
+        if any(k in keyword.lower() for k in keywords):
+            yield models.opportunity(
+                source="GoogleTrends",
+                title=keyword,
+                description=f"{trend['region']} 热搜第 {trend['rank']} 位",
+                link='',
+                category='Trend',
+                extra={'rank': trend['rank']}
+            )
+
+def fetch_trends():
+    """获取 Google Trends 热搜（pytrends 为同步库）"""
+    return GoogleTrendsMonitor().get_trending_searches(TRENDS_REGION)
+
+async def hunt_github(ctx, pipe):
+    """GitHub项目猎手（各关键词并发搜索，每个关键词的结果到了就送入流水线）"""
+    print("\n🐙 [机会] 正在扫描 GitHub...")
+    keywords = [k for k in GITHUB_KEYWORDS[:5] if await ctx.acquire(f'github:{k}')]  # 每次选5个关键词
     
-    except Exception as e:
-        print(f"❌ GitHub 扫描失败: {e}")
+    async def search_and_feed(keyword):
+        return await feed(pipe, github_opportunities, await search_github(ctx, keyword))
     
-    return count
+    return sum(await asyncio.gather(*(search_and_feed(k) for k in keywords)))
 
-def hunt_hacker_news():
-    """Hacker News机会猎手"""
-    print("\n📰 [2/2] 正在扫描 Hacker News...")
-    count = 0
-    
+async def hunt_hacker_news(ctx, pipe):
+    """Hacker News机会猎手（热门故事与痛点雷达共享同一次抓取）"""
+    print("\n📰 [机会] 正在扫描 Hacker News...")
     try:
-        resp = requests.get(
-            'https://hacker-news.firebaseio.com/v0/topstories.json',
-            timeout=10
-        )
-        top_ids = resp.json()[:15]
-        
-        for item_id in top_ids:
-            try:
-                item = requests.get(
-                    f'https://hacker-news.firebaseio.com/v0/item/{item_id}.json',
-                    timeout=10
-                ).json()
-                
-                if item and item.get('score', 0) >= 150:
-                    title = item.get('title', '')
-                    text = item.get('text', '')
-                    url = item.get('url', '')
-                    
-                    # 检查是否包含机会关键词
-                    content_lower = (title + text).lower()
-                    is_opportunity = False
-                    opp_type = 'News'
-                    
-                    if any(kw in content_lower for kw in ['funding', 'series', 'raised', 'investment']):
-                        is_opportunity = True
-                        opp_type = 'Funding'
-                    elif any(kw in content_lower for kw in ['startup', 'founded', 'launch']):
-                        is_opportunity = True
-                        opp_type = 'Startup'
-                    elif any(kw in content_lower for kw in ['breakthrough', 'SOTA', 'new', 'release']):
-                        is_opportunity = True
-                        opp_type = 'Technology'
-                    
-                    if is_opportunity:
-                        if save_opportunity(
-                            source="HackerNews",
-                            title=title,
-                            description=text[:200],
-                            link=url,
-                            metadata={
-                                'type': opp_type,
-                                'score': item.get('score', 0)
-                            }
-                        ):
-                            count += 1
-                
-                time.sleep(0.5)
-            except:
-                pass
-    
+        stories = await cycle.fetch_hn_stories(ctx, limit=HN_TOP_LIMIT)
+        return await feed(pipe, hn_opportunities, stories)
     except Exception as e:
         print(f"❌ HN 扫描失败: {e}")
-    
-    return count
+        ctx.fail_unit('hn')
+        return 0
 
-def analyze_opportunities_ai(raw_data):
-    """AI分析机会"""
-    print("\n🧠 正在用AI分析机会...")
+async def hunt_rss(ctx, pipe):
+    """RSS 机会源: Hugging Face 论文、YC、Product Hunt 等（社区吐槽归痛点雷达，每个 feed 抓到就送入流水线）"""
+    print("\n📡 [机会] 正在扫描 RSS...")
+    hunter = RSSHunter()
+    keys = [k for k in RSSHunter.sources_by_category('research', 'startup', 'product')
+            if await ctx.acquire(f'rss:{k}')]
     
-    prompt = f"""
-# Role: Investment & Startup Analyst
+    async def fetch_and_feed(key):
+        return await feed(pipe, rss_opportunities, await hunter.fetch_rss_feed_async(ctx, key))
+    
+    return sum(await asyncio.gather(*(fetch_and_feed(key) for key in keys)))
+
+async def hunt_trends(ctx, pipe):
+    """Google Trends 热搜中与 AI 相关的词（放到工作线程）"""
+    if not await ctx.acquire('trends'):
+        return 0
+    print("\n📈 [机会] 正在扫描 Google Trends...")
+    return await feed(pipe, trend_opportunities, await ctx.call('trends', lambda: asyncio.to_thread(fetch_trends)))
+
+# prompt 模板改动时递增版本号，使旧的 LLM 缓存失效
+PROMPT_VERSION = 'opportunity-v1'
+
+ANALYSIS_PROMPT = """# Role: Investment & Startup Analyst
 # Task: 从技术新闻和开源项目中识别商业机会
 
 ## 分析维度
@@ -298,106 +341,161 @@ def analyze_opportunities_ai(raw_data):
 - 融资热度: ...
 - 技术方向: ...
 """
+
+def analyze_opportunities_ai(raw_data):
+    """AI分析机会"""
+    print("\n🧠 正在用AI分析机会...")
     
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            response = gemini_client.models.generate_content(
-                model='gemini-2.5-flash',
-                contents=prompt
-            )
-            return response.text
-        except Exception as e:
-            print(f"⚠️ 分析尝试 {attempt+1} 失败: {e}")
-            if attempt < max_retries - 1:
-                time.sleep(5)
+    # 增量模式: 只把新条目合并进今日摘要
+    if daily_summary.INCREMENTAL_ENABLED:
+        summary = daily_summary.update_summary(
+            get_gemini_client(), raw_data,
+            kind='opportunity',
+            kind_label='机会',
+            role='Investment & Startup Analyst',
+            template_version=PROMPT_VERSION
+        )
+        return daily_summary.render_markdown(summary, '机会', top_n=5) if summary else "❌ AI分析失败"
     
-    return "❌ AI分析失败"
+    # 超出 token 预算时自动切块并发分析
+    text = analysis_pipeline.analyze(
+        get_gemini_client(), raw_data,
+        final_template=ANALYSIS_PROMPT,
+        template_version=PROMPT_VERSION,
+        kind='机会'
+    )
+    return text if text else "❌ AI分析失败"
+
+async def analyze_opportunities_ai_async(raw_data, on_text=None):
+    """AI分析机会（异步流式，不阻塞事件循环）"""
+    if daily_summary.INCREMENTAL_ENABLED:
+        return await asyncio.to_thread(analyze_opportunities_ai, raw_data)
+    
+    print("\n🧠 正在用AI分析机会...")
+    
+    text = await analysis_pipeline.analyze_async(
+        get_gemini_client(), raw_data,
+        final_template=ANALYSIS_PROMPT,
+        template_version=PROMPT_VERSION,
+        kind='机会',
+        on_text=on_text
+    )
+    return text if text else "❌ AI分析失败"
+
+REPORT_SPEC = report_renderer.ReportSpec(
+    heading='🔍 机会发现报告',
+    basename='Opportunities_Report',
+    count_label='发现机会数',
+    push_title='【机会】',
+    push_heading='🔍 机会发现报告',
+)
 
 def deliver_report(content):
-    """交付报告"""
-    if content.startswith("❌"):
-        print(f"\n🚫 {content}")
+    """交付报告：后台渲染 output.formats 中的所有格式并推送"""
+    return report_renderer.deliver(content, REPORT_SPEC, len(current_session_opportunities))
+
+# ==================== 主程序 ====================
+
+async def analyze_and_deliver(opps, collection=None):
+    """
+    分诊 → 聚类 → 分析 → 交付
+    
+    Args:
+        opps: 本轮新入库的机会会话条目
+        collection: 提供聚类向量的集合，默认为机会集合
+    """
+    if checkpoint.stage('opportunity', 'delivered') is not None:
+        print("⏭️ 本轮机会报告已在中断前交付")
+        return
+    # 中断前已完成分析的，直接交付保存的结果，不再调用 LLM
+    analysis = checkpoint.stage('opportunity', 'analysis')
+    if analysis is not None:
+        print("⏭️ 使用中断前保存的机会分析结果")
+        checkpoint.mark_delivered('opportunity', deliver_report(analysis))
         return
     
-    today = datetime.date.today().strftime("%Y-%m-%d")
-    filename = f"Opportunities_Report_{today}.docx"
+    # 集群模式下只有持有分析租约的实例出报告，其他实例的条目交接给它一起分析
+    received = await asyncio.to_thread(coordination.exchange_items, 'opportunity', opps)
+    if received is None:
+        checkpoint.mark_stage('opportunity', 'delivered')
+        return
+    if received:
+        current_session_opportunities.extend(received)
+        opps = opps + received
+        # 交接来的条目的向量不在本进程，从 Chroma 读取
+        collection = None
+    if not opps:
+        print("🤷 未发现新机会")
+        return
     
-    # 保存Word
-    try:
-        doc = Document()
-        doc.add_heading(f'🔍 机会发现报告 - {today}', 0)
-        doc.add_paragraph(f"生成时间: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        doc.add_paragraph(f"发现机会数: {len(current_session_opportunities)}")
-        doc.add_paragraph("=" * 50)
+    with profiling.span('analyze', module='opportunity', items=len(opps)):
+        # 本地分诊，只把有价值的条目送入 LLM（按入库文本打分，与训练样本一致）
+        opps = await asyncio.to_thread(
+            triage.filter_items,
+            opps,
+            opportunity_document,
+            '机会'
+        )
+        if not opps:
+            print("🤷 分诊后没有值得分析的机会")
+            checkpoint.mark_stage('opportunity', 'delivered')
+            return
         
-        for line in content.split('\n'):
-            line = line.strip()
-            if not line:
-                continue
-            if line.startswith('# '):
-                doc.add_heading(line.replace('# ', ''), level=1)
-            elif line.startswith('## '):
-                doc.add_heading(line.replace('## ', ''), level=2)
-            elif line.startswith('### '):
-                doc.add_heading(line.replace('### ', ''), level=3)
-            else:
-                doc.add_paragraph(line)
+        # 近似重复的条目按向量聚类合并
+        lines = await asyncio.to_thread(
+            clustering.compress_items, collection or get_opportunity_collection(), opps,
+            lambda o: f"【{o.source}】{o.title}: {o.content}"
+        )
         
-        doc.save(filename)
-        print(f"\n💾 ✅ 报告已生成: {filename}")
-    except Exception as e:
-        print(f"❌ Word生成失败: {e}")
-    
-    # 推送微信
-    if PUSHPLUS_TOKEN and PUSHPLUS_TOKEN != '填入自己的TOKEN':
-        try:
-            print("📨 正在推送到微信...")
-            wechat_body = f"# 🔍 机会发现报告 ({today})\n\n{content}"
-            
-            requests.post(
-                'http://www.pushplus.plus/send',
-                json={
-                    "token": PUSHPLUS_TOKEN,
-                    "title": f"【机会】{today}",
-                    "content": wechat_body,
-                    "template": "markdown"
-                },
-                timeout=10
-            )
-            print("📨 ✅ 微信推送完成")
-        except Exception as e:
-            print(f"⚠️ 推送失败: {e}")
+        analysis = await analyze_opportunities_ai_async("\n".join(lines))
+        if not analysis.startswith("❌"):
+            checkpoint.mark_stage('opportunity', 'analysis', analysis)
+        checkpoint.mark_delivered('opportunity', deliver_report(analysis))
 
-# ==================== 主程序 ====================
-
-def main():
+async def run(ctx):
+    """在给定的循环上下文中跑一轮: 抓取 → 分诊 → 聚类 → 分析 → 交付"""
+    current_session_opportunities.clear()
     print("\n" + "="*60)
     print("🚀 开始机会猎手循环")
     print("="*60)
     
-    c1 = hunt_github()
-    c2 = hunt_hacker_news()
+    # 续跑中断的一轮时，先恢复中断前已入库的机会
+    current_session_opportunities.extend(checkpoint.items('opportunity'))
+    if checkpoint.stage('opportunity', 'fetched') is None:
+        # 各数据源并发抓取，边抓边经流水线入库；抓取截止时间到后未完成的数据源被取消
+        async with build_pipeline() as pipe:
+            counts = await ctx.run_producers({
+                'GitHub': hunt_github(ctx, pipe),
+                'HackerNews': hunt_hacker_news(ctx, pipe),
+                'RSS': hunt_rss(ctx, pipe),
+                'GoogleTrends': hunt_trends(ctx, pipe),
+            }, scope='opportunity')
+        pipe.print_summary()
+        checkpoint.mark_stage('opportunity', 'fetched')
+    else:
+        counts = {'恢复': len(current_session_opportunities)}
+        print("⏭️ 抓取已在中断前完成")
     
-    total = c1 + c2
-    print(f"\n📊 本次发现机会数: {total}")
+    total = len(current_session_opportunities)
+    print(f"\n📊 本次发现机会数: {total} {counts}")
     
-    if total > 0:
-        raw_opps = "\n".join([
-            f"【{o['source']}】{o['title']}: {o['description']}"
-            for o in current_session_opportunities
-        ])
-        
-        analysis = analyze_opportunities_ai(raw_opps)
-        deliver_report(analysis)
+    # 集群模式下本实例没有新条目时也可能要分析其他实例交接来的条目
+    if total > 0 or coordination.get_coordinator() is not None:
+        await analyze_and_deliver(list(current_session_opportunities))
     else:
         print("🤷 未发现新机会")
     
     print("\n✅ 机会猎手循环完成")
 
+async def main():
+    runtime.configure_proxy(YOUR_PORT)
+    print(f"🔍 机会猎手 v2.0 启动... [时间: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}]")
+    async with cycle.CycleContext() as ctx:
+        await asyncio.wait_for(run(ctx), timeout=ctx.remaining())
+
 if __name__ == "__main__":
     try:
-        main()
+        asyncio.run(main())
     except KeyboardInterrupt:
         print("\n⚠️ 用户中断")
     except Exception as e:
@@ -0,0 +1,442 @@
+"""
+推送发件箱 - PushPlus 消息先落盘到 SQLite，再由后台线程发送
+发送失败按指数退避重试；短时间内到达的多条消息合并成一次推送，超长内容按上限拆分
+进程退出或推送服务不可用时消息不会丢失，下次启动继续发送
+"""
+
+import os
+import time
+import random
+import sqlite3
+import logging
+import datetime
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import metrics
+import profiling
+
+logger = logging.getLogger(__name__)
+
+# ==================== 配置 ====================
+
+PUSHPLUS_TOKEN = os.getenv('PUSHPLUS_TOKEN', '填入自己的TOKEN')
+PUSHPLUS_URL = os.getenv('PUSHPLUS_URL', 'http://www.pushplus.plus/send')
+OUTBOX_DB = Path(os.getenv('OUTBOX_DB', './my_market_brain/outbox.db'))
+# 同一窗口内到达的消息合并成一次推送 (秒)
+MERGE_WINDOW = float(os.getenv('OUTBOX_MERGE_WINDOW', 60))
+# PushPlus 单条内容长度上限，超出则拆分
+MAX_CHARS = int(os.getenv('PUSHPLUS_MAX_CHARS', 18000))
+MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 8))
+BACKOFF_BASE = float(os.getenv('OUTBOX_BACKOFF_BASE', 30))
+BACKOFF_CAP = float(os.getenv('OUTBOX_BACKOFF_CAP', 3600))
+SEND_TIMEOUT = float(os.getenv('OUTBOX_SEND_TIMEOUT', 10))
+
+MERGE_SEPARATOR = "\n\n---\n\n"
+
+# 消息状态: pending 待发送 | sent 已发送 | dead 超过重试次数 | merged / split 已被合并或拆分成新消息
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    prepared INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    parent_id INTEGER,
+    last_error TEXT,
+    sent_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_status ON messages (status, next_attempt_at);
+"""
+
+
+def backoff_delay(attempts: int) -> float:
+    """第 attempts 次失败后的等待时间 (指数退避 + 抖动)"""
+    delay = min(BACKOFF_CAP, BACKOFF_BASE * (2 ** max(0, attempts - 1)))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def split_content(content: str, limit: int = MAX_CHARS) -> List[str]:
+    """
+    按段落、行、字符的顺序切分超长内容
+    
+    Args:
+        content: 推送正文
+        limit: 单条长度上限
+    
+    Returns:
+        分段列表，每段不超过 limit
+    """
+    if len(content) <= limit:
+        return [content]
+    
+    parts: List[str] = []
+    current = ""
+    for paragraph in content.split("\n\n"):
+        pieces = [paragraph] if len(paragraph) <= limit else _split_long(paragraph, limit)
+        for piece in pieces:
+            joined = f"{current}\n\n{piece}" if current else piece
+            if len(joined) <= limit:
+                current = joined
+            else:
+                parts.append(current)
+                current = piece
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _split_long(text: str, limit: int) -> List[str]:
+    """单个段落超长时按行切，单行超长时硬切"""
+    chunks: List[str] = []
+    current = ""
+    for line in text.split("\n"):
+        while len(line) > limit:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:limit])
+            line = line[limit:]
+        joined = f"{current}\n{line}" if current else line
+        if len(joined) <= limit:
+            current = joined
+        else:
+            chunks.append(current)
+            current = line
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class Outbox:
+    """SQLite 发件箱 + 后台发送线程"""
+    
+    def __init__(self, db_path: Path = OUTBOX_DB, token: str = PUSHPLUS_TOKEN,
+                 url: str = PUSHPLUS_URL, merge_window: float = MERGE_WINDOW,
+                 max_chars: int = MAX_CHARS):
+        self.db_path = Path(db_path)
+        self.token = token
+        self.url = url
+        self.merge_window = merge_window
+        self.max_chars = max_chars
+        
+        self._wake = threading.Event()
+        self._idle = threading.Condition()
+        # flush 请求的代数: 请求时递增，发送线程完成一轮在请求之后开始的发送后记为已完成
+        self._flush_generation = 0
+        self._flushed_generation = 0
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        
+        self._stats_lock = threading.Lock()
+        self._sent = 0
+        self._failures = 0
+        self._dead = 0
+        self._latencies: List[float] = []
+        
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+    
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """打开连接，退出时提交 (异常时回滚) 并关闭"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+    
+    # ---------- 生产者 ----------
+    
+    def enqueue(self, title: str, content: str) -> int:
+        """消息落盘并唤醒发送线程，立即返回消息 id"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO messages (title, content, created_at) VALUES (?, ?, ?)",
+                (title, content, time.time())
+            )
+            message_id = cursor.lastrowid
+        self._wake.set()
+        return message_id
+    
+    # ---------- 发送线程 ----------
+    
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='outbox-sender', daemon=True)
+            self._thread.start()
+    
+    def stop(self, timeout: float = 5) -> None:
+        self._stopping = True
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+    
+    def flush(self, timeout: float = 30) -> bool:
+        """
+        忽略合并窗口立即发送所有到期消息，等待发送线程空闲
+        
+        Args:
+            timeout: 最长等待秒数
+        
+        Returns:
+            超时前是否已没有可立即发送的消息 (处于退避中的消息不计)
+        """
+        self.start()
+        deadline = time.monotonic() + timeout
+        with self._idle:
+            self._flush_generation += 1
+            generation = self._flush_generation
+            self._wake.set()
+            # 等一轮在本次请求之后开始的发送完成 (已在进行中的那轮可能没有忽略合并窗口)
+            while self._flushed_generation < generation:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+    
+    def _run(self) -> None:
+        while not self._stopping:
+            with self._idle:
+                generation = self._flush_generation
+            try:
+                wait = self._drain(force=generation > self._flushed_generation)
+            except Exception as e:
+                logger.error(f"发件箱发送出错: {str(e)}")
+                wait = BACKOFF_BASE
+            with self._idle:
+                if generation > self._flushed_generation and wait > 0:
+                    self._flushed_generation = generation
+                    self._idle.notify_all()
+            self._wake.wait(timeout=wait)
+            self._wake.clear()
+    
+    def _drain(self, force: bool = False) -> float:
+        """
+        发送所有到期消息
+        
+        Args:
+            force: 忽略合并窗口 (flush 时)
+        
+        Returns:
+            距下一条消息到期的秒数
+        """
+        import coordination
+        
+        # 多实例共用一个发件箱时只有租约持有者负责合并和发送，其余实例的消息由它代发
+        if not coordination.hold_lease('outbox'):
+            return min(self._next_wakeup(force), coordination.MEMBER_TTL)
+        
+        self._prepare(force=force)
+        
+        now = time.time()
+        with self._connect() as conn:
+            ready = conn.execute(
+                "SELECT id, title, content, created_at, attempts FROM messages "
+                "WHERE status = 'pending' AND prepared = 1 AND next_attempt_at <= ? ORDER BY id",
+                (now,)
+            ).fetchall()
+        
+        # 按入队顺序发送，失败即停，避免拆分后的分段乱序到达
+        for row in ready:
+            if self._stopping:
+                return 0
+            if not self._deliver(*row):
+                break
+        
+        return self._next_wakeup(force)
+    
+    def _prepare(self, force: bool) -> None:
+        """把合并窗口已结束的新消息合并、拆分成待发送消息"""
+        now = time.time()
+        with self._connect() as conn:
+            fresh = conn.execute(
+                "SELECT id, title, content, created_at FROM messages "
+                "WHERE status = 'pending' AND prepared = 0 ORDER BY id"
+            ).fetchall()
+            if not fresh:
+                return
+            if not force and now - fresh[0][3] < self.merge_window:
+                return
+            
+            ids = [row[0] for row in fresh]
+            created_at = fresh[0][3]
+            if len(fresh) == 1:
+                title, content = fresh[0][1], fresh[0][2]
+            else:
+                today = datetime.date.today().strftime("%Y-%m-%d")
+                title = f"【市场监控】{today} ({len(fresh)} 份报告)"
+                content = MERGE_SEPARATOR.join(row[2] for row in fresh)
+            
+            parts = split_content(content, self.max_chars)
+            if len(fresh) == 1 and len(parts) == 1:
+                conn.execute("UPDATE messages SET prepared = 1 WHERE id = ?", (ids[0],))
+                return
+            
+            for index, part in enumerate(parts, 1):
+                part_title = title if len(parts) == 1 else f"{title} ({index}/{len(parts)})"
+                conn.execute(
+                    "INSERT INTO messages (title, content, created_at, prepared, parent_id) "
+                    "VALUES (?, ?, ?, 1, ?)",
+                    (part_title, part, created_at, ids[0])
+                )
+            status = 'merged' if len(fresh) > 1 else 'split'
+            conn.executemany(
+                "UPDATE messages SET status = ? WHERE id = ?",
+                [(status, message_id) for message_id in ids]
+            )
+        print(f"📨 发件箱: {len(fresh)} 条消息 → {len(parts)} 次推送")
+    
+    def _deliver(self, message_id: int, title: str, content: str, created_at: float, attempts: int) -> bool:
+        with profiling.span('push', message=message_id, attempt=attempts + 1):
+            error = self._send(title, content)
+        now = time.time()
+        with self._connect() as conn:
+            if error is None:
+                conn.execute(
+                    "UPDATE messages SET status = 'sent', sent_at = ?, attempts = ? WHERE id = ?",
+                    (now, attempts + 1, message_id)
+                )
+                with self._stats_lock:
+                    self._sent += 1
+                    self._latencies.append(now - created_at)
+                metrics.count_push('sent', now - created_at)
+                print(f"📨 ✅ 微信推送完成: {title}")
+                return True
+            
+            attempts += 1
+            with self._stats_lock:
+                self._failures += 1
+            metrics.count_push('failed')
+            if attempts >= MAX_ATTEMPTS:
+                conn.execute(
+                    "UPDATE messages SET status = 'dead', attempts = ?, last_error = ? WHERE id = ?",
+                    (attempts, error, message_id)
+                )
+                with self._stats_lock:
+                    self._dead += 1
+                metrics.count_push('dead')
+                print(f"❌ 推送失败 {attempts} 次，放弃: {title} ({error})")
+            else:
+                delay = backoff_delay(attempts)
+                conn.execute(
+                    "UPDATE messages SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                    (attempts, now + delay, error, message_id)
+                )
+                # 后面的消息一起顺延，推送服务恢复后按原顺序发送
+                conn.execute(
+                    "UPDATE messages SET next_attempt_at = ? "
+                    "WHERE status = 'pending' AND prepared = 1 AND id > ? AND next_attempt_at < ?",
+                    (now + delay, message_id, now + delay)
+                )
+                print(f"⚠️ 推送失败 ({error})，{delay:.0f} 秒后重试 ({attempts}/{MAX_ATTEMPTS})")
+        return False
+    
+    def _send(self, title: str, content: str) -> Optional[str]:
+        """调用 PushPlus，成功返回 None，失败返回错误描述"""
+        import requests
+        
+        try:
+            resp = requests.post(
+                self.url,
+                json={
+                    "token": self.token,
+                    "title": title,
+                    "content": content,
+                    "template": "markdown"
+                },
+                timeout=SEND_TIMEOUT
+            )
+            if resp.status_code != 200:
+                return f"HTTP {resp.status_code}"
+            code = resp.json().get('code')
+            if code != 200:
+                return f"PushPlus code {code}"
+            return None
+        except Exception as e:
+            return str(e)
+    
+    def _next_wakeup(self, force: bool = False) -> float:
+        now = time.time()
+        with self._connect() as conn:
+            retry_at = conn.execute(
+                "SELECT MIN(next_attempt_at) FROM messages WHERE status = 'pending' AND prepared = 1"
+            ).fetchone()[0]
+            fresh_at = conn.execute(
+                "SELECT MIN(created_at) FROM messages WHERE status = 'pending' AND prepared = 0"
+            ).fetchone()[0]
+        candidates = []
+        if retry_at is not None:
+            candidates.append(retry_at - now)
+        if fresh_at is not None:
+            candidates.append(0 if force else fresh_at + self.merge_window - now)
+        if not candidates:
+            return 3600
+        return max(0.0, min(candidates))
+    
+    # ---------- 指标 ----------
+    
+    def stats(self) -> Dict:
+        """发送统计: 待发送数、成功/失败/放弃次数、投递延迟 (入队到送达)"""
+        with self._connect() as conn:
+            counts = dict(conn.execute(
+                "SELECT status, COUNT(*) FROM messages WHERE status IN ('pending', 'dead') GROUP BY status"
+            ).fetchall())
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+            result = {
+                'pending': counts.get('pending', 0),
+                'dead_total': counts.get('dead', 0),
+                'sent': self._sent,
+                'failures': self._failures,
+                'dead': self._dead,
+                'latency_p50': latencies[len(latencies) // 2] if latencies else 0.0,
+                'latency_max': latencies[-1] if latencies else 0.0,
+            }
+        return result
+
+
+_outbox: Optional[Outbox] = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox() -> Optional[Outbox]:
+    """进程内共享的发件箱，未配置 PushPlus token 时返回 None"""
+    global _outbox
+    if not PUSHPLUS_TOKEN or PUSHPLUS_TOKEN == '填入自己的TOKEN':
+        return None
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = Outbox()
+            _outbox.start()
+        return _outbox
+
+
+def enqueue(title: str, content: str) -> Optional[int]:
+    """投递一条推送，未配置 token 时忽略"""
+    box = get_outbox()
+    if box is None:
+        return None
+    return box.enqueue(title, content)
+
+
+def flush(timeout: float = 30) -> bool:
+    """发送所有到期消息 (包括上次运行遗留的)，用于单次运行结束前"""
+    box = get_outbox()
+    if box is None:
+        return True
+    return box.flush(timeout)
+
+
+def stats() -> Optional[Dict]:
+    return _outbox.stats() if _outbox else None
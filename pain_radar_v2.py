@@ -9,34 +9,35 @@ Purpose: 从全网用户吐槽中提取可商业化的市场机会
 import os
 import asyncio
 import datetime
-import time
-import hashlib
 import random
+import re
 import json
-import sys
-from pathlib import Path
 
-try:
-    from google import genai
-    from twikit import Client
-    import requests
-    import chromadb
-    from docx import Document
-except ImportError as e:
-    print(f"❌ 依赖库缺失: {e}")
-    print("请运行: pip install google-genai twikit requests chromadb python-docx")
-    sys.exit(1)
+import cycle
+import runtime
+import store
+import triage
+import llm_client
+import analysis_pipeline
+import daily_summary
+import clustering
+import report_renderer
+import metrics
+import profiling
+import checkpoint
+import coordination
+import models
+import pipeline
+from rss_hunter import RSSHunter
 
 # ==================== 🛠️ 用户配置区 ====================
 
 # API密钥配置
 GEMINI_KEY = os.getenv('GEMINI_API_KEY', '填入自己的API-key')
-PUSHPLUS_TOKEN = os.getenv('PUSHPLUS_TOKEN', '填入自己的TOKEN')
 GITHUB_TOKEN = os.getenv('GITHUB_TOKEN', '')
 
 # 网络配置
 YOUR_PORT = int(os.getenv('PROXY_PORT', 19828))  # 梯子端口，如果不需要代理设为0
-USE_PROXY = YOUR_PORT > 0
 
 # 监控配置 - 精确关键词（已优化）
 PAIN_KEYWORDS = {
@@ -66,6 +67,10 @@ PAIN_KEYWORDS = {
     ]
 }
 
+# Hacker News 扫描范围
+HN_TOP_LIMIT = 10
+HN_MIN_SCORE = 100
+
 # 垃圾词黑名单
 SPAM_FILTERS = [
     '100+ AI Tools', 'Check my bio', 'Sign up now',
@@ -75,35 +80,35 @@ SPAM_FILTERS = [
 
 # =======================================================================
 
-# 环境配置
-if USE_PROXY:
-    PROXY_URL = f'http://127.0.0.1:{YOUR_PORT}'
-    os.environ['http_proxy'] = PROXY_URL
-    os.environ['https_proxy'] = PROXY_URL
-    os.environ['HTTP_PROXY'] = PROXY_URL
-    os.environ['HTTPS_PROXY'] = PROXY_URL
-    print(f"📡 代理已启用: {PROXY_URL}")
-else:
-    print("📡 代理已禁用（直连模式）")
-
-# 创建数据目录
-DATA_DIR = Path('./my_market_brain')
-DATA_DIR.mkdir(exist_ok=True)
-
-print(f"🎯 痛点雷达 v2.0 启动... [时间: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}]")
-
-# 初始化组件
-try:
-    gemini_client = genai.Client(api_key=GEMINI_KEY)
-    chroma_client = chromadb.PersistentClient(path=str(DATA_DIR))
-    pain_collection = chroma_client.get_or_create_collection(name="pain_points_v2")
-    print("✅ 所有组件加载完毕")
-except Exception as e:
-    print(f"❌ 初始化失败: {e}")
-    sys.exit(1)
+PAIN_COLLECTION = "pain_points_v2"
+
+# 客户端在第一次使用时由 runtime / store 创建，导入本模块不联网、不建库
+
+def get_gemini_client():
+    return runtime.get_gemini_client(GEMINI_KEY)
+
+def get_pain_collection():
+    return store.get_collection(PAIN_COLLECTION)
 
 current_session_pains = []
 
+# ==================== 标签索引 ====================
+# 一次正则扫描即可拿到条目提到的全部产品和痛点词，避免逐产品逐关键词的嵌套循环
+# 只匹配完整的词 (precursor 里的 cursor 不算)，长的优先
+
+_PRODUCT_PATTERN = re.compile(
+    r'\b(?:' + '|'.join(re.escape(p.lower()) for p in sorted(PAIN_KEYWORDS, key=len, reverse=True)) + r')\b'
+)
+_KEYWORD_PRODUCTS = {}
+for _product, _keywords in PAIN_KEYWORDS.items():
+    for _keyword in _keywords:
+        _KEYWORD_PRODUCTS.setdefault(_keyword.lower(), []).append(_product)
+_KEYWORD_PATTERN = re.compile(
+    r'\b(?:' + '|'.join(re.escape(k) for k in sorted(_KEYWORD_PRODUCTS, key=len, reverse=True)) + r')\b'
+)
+_PRODUCT_ORDER = {p.lower(): i for i, p in enumerate(PAIN_KEYWORDS)}
+_PRODUCT_NAMES = {p.lower(): p for p in PAIN_KEYWORDS}
+
 # ==================== 工具函数 ====================
 
 def is_spam(text):
@@ -114,144 +119,198 @@ def is_spam(text):
             return True
     return False
 
-def save_pain(source, author, content, product):
-    """保存痛点到数据库"""
-    try:
-        if is_spam(content):
-            return False
-            
-        current_time = datetime.datetime.now().isoformat()
-        content_fingerprint = hashlib.md5(content.encode('utf-8')).hexdigest()
-        doc_id = f"PAIN_{source}_{product}_{content_fingerprint}"
-        
-        # 检查是否已存在
-        existing = pain_collection.get(ids=[doc_id])
-        if existing and existing['ids']:
-            return False
-        
-        pain_collection.upsert(
-            documents=[content],
-            metadatas=[{
-                "source": source,
-                "author": str(author),
-                "product": product,
-                "type": "pain",
-                "time": current_time
-            }],
-            ids=[doc_id]
-        )
-        current_session_pains.append({
-            'source': source,
-            'author': author,
-            'product': product,
-            'content': content,
-            'time': current_time
-        })
-        print(f"  🩸 [{product}] {content[:50]}...")
-        return True
-    except Exception as e:
-        print(f"  ⚠️ 保存失败: {e}")
-        return False
+def tag_item(text, extra_products=()):
+    """
+    单次扫描给条目打标签
 
-async def scan_twitter():
-    """扫描Twitter痛点"""
-    print("\n🐦 [1/3] 正在扫描 Twitter...")
+    返回 (产品列表, 命中的痛点词列表)。产品优先取正文中明确提到的产品；
+    正文没提到任何产品时，退回到痛点词所属的产品。extra_products 用于
+    合并已知的产品（如 Twitter 搜索词里的产品）。
+    """
+    text_lower = text.lower()
+    mentioned = {m.group(0) for m in _PRODUCT_PATTERN.finditer(text_lower)}
+    keywords = list(dict.fromkeys(m.group(0) for m in _KEYWORD_PATTERN.finditer(text_lower)))
+
+    products = {_PRODUCT_NAMES[p] for p in mentioned}
+    products.update(extra_products)
+    if not products:
+        for keyword in keywords:
+            products.update(_KEYWORD_PRODUCTS[keyword])
+
+    ordered = sorted(products, key=lambda p: _PRODUCT_ORDER.get(p.lower(), len(_PRODUCT_ORDER)))
+    return ordered, keywords
+
+def keep_pain(item):
+    """过滤规则: 有产品标签且不是垃圾内容"""
+    return bool(item.products) and not is_spam(item.content)
+
+def pain_metadata(item):
+    """痛点写入 Chroma 的元数据（时间在这里格式化一次）"""
+    metadata = {
+        "source": item.source,
+        "author": item.author,
+        "product": item.products[0],
+        "products": ",".join(item.products),
+        "keywords": ",".join(item.keywords),
+        "type": "pain",
+        "time": models.isoformat(item.fetched)
+    }
+    # 布尔标记便于 where={"product_Cursor": True} 这类过滤
+    for product in item.products:
+        metadata[f"product_{product}"] = True
+    return metadata
+
+def record_pain(item):
+    """把已入库的痛点计入本轮会话 (流水线的会话阶段)"""
+    current_session_pains.append(item)
+    checkpoint.record_item('pain', item)
+    print(f"  🩸 [{'/'.join(item.products)}] {item.content[:50]}...")
+    return item
+
+# ==================== 处理流水线 ====================
+# 数据源只负责抓取，抓到的每批原始数据送入流水线: 解析 → 过滤/打标签 → 查重+入库 → 会话
+
+def parse_batch(job):
+    """解析阶段: (提取函数, 一批原始数据) → 痛点条目"""
+    extract, raw = job
+    with profiling.span('match', module='pain'):
+        return list(extract(raw))
+
+def filter_pain(item):
+    """过滤阶段: 垃圾内容或无产品标签时丢弃"""
+    metrics.count_items(PAIN_COLLECTION, item.source, 'fetched')
+    if not keep_pain(item):
+        metrics.count_items(PAIN_COLLECTION, item.source, 'filtered')
+        return None
+    return item
+
+async def store_pain(item):
+    """入库阶段: 查重和写入在 store 写线程内一次完成，已存在则丢弃"""
+    if not await get_pain_collection().add_if_absent_async(item.id, item.content, pain_metadata(item)):
+        metrics.count_items(PAIN_COLLECTION, item.source, 'deduped')
+        return None
+    metrics.count_items(PAIN_COLLECTION, item.source, 'stored')
+    return item
+
+def build_pipeline():
+    """本轮的痛点处理流水线"""
+    return pipeline.Pipeline([
+        pipeline.Stage('parse', parse_batch, expand=True),
+        pipeline.Stage('filter', filter_pain, inline=True),
+        pipeline.Stage('store', store_pain, workers=pipeline.PIPELINE_STORE_WORKERS),
+        pipeline.Stage('session', record_pain, inline=True),
+    ], name='pain')
+
+async def feed(pipe, extract, raw):
+    """把一批原始数据送入流水线，返回其中新入库的条数"""
+    return len(await pipe.feed((extract, raw)))
+
+# ==================== 数据源 ====================
+# 每个数据源拆成 抓取 (I/O) 和 提取 (纯计算) 两步，多进程模式下两步在不同进程执行
+
+async def search_tweets():
+    """
+    按随机选取的搜索词抓取推文
+    
+    Returns:
+        [(搜索词对应的产品, 作者, 正文)]
+    """
+    from twikit import Client
+    
     client = Client(language='en-US')
-    count = 0
+    client.load_cookies('cookies.json')
+    
+    # 构建搜索查询
+    search_queries = []
+    for product, keywords in PAIN_KEYWORDS.items():
+        for keyword in keywords[:2]:  # 每个产品选2个关键词
+            search_queries.append((product, f'"{product}" {keyword}'))
     
+    # 随机选择5个查询
+    selected_queries = random.sample(search_queries, min(5, len(search_queries)))
+    print(f"  🎯 今日搜索词: {[q for _, q in selected_queries]}")
+    
+    results = []
+    for query_product, query in selected_queries:
+        try:
+            print(f"  🔍 搜索: {query}")
+            tweets = await client.search_tweet(query, product='Latest', count=3)
+            
+            for tweet in tweets or []:
+                text = tweet.text.replace('\n', ' ')
+                user = tweet.user.name if tweet.user else "Unknown"
+                results.append((query_product, user, text))
+            
+            await asyncio.sleep(1)
+        except Exception as e:
+            print(f"     ⚠️ 搜索出错: {e}")
+            continue
+    return results
+
+def twitter_pains(tweets):
+    """从推文中提取痛点"""
+    for query_product, user, text in tweets:
+        products, keywords = tag_item(text, extra_products=(query_product,))
+        yield models.pain("Twitter", user, text, products, keywords)
+
+def hn_pains(stories):
+    """从 HN 热门故事中提取痛点（高分且包含痛点关键词）"""
+    for item in stories[:HN_TOP_LIMIT]:
+        if item.get('score', 0) >= HN_MIN_SCORE:
+            title = item.get('title', '')
+            text = item.get('text', '')
+            
+            # 检查是否包含痛点关键词（单次打标签，一条记录）
+            products, keywords = tag_item(f"{title} {text}")
+            if keywords:
+                yield models.pain("HackerNews", "Tech", f"Title: {title} | Text: {text[:100]}", products, keywords)
+
+def reddit_pains(articles):
+    """从 Reddit 社区文章中提取痛点"""
+    for article in articles:
+        products, keywords = tag_item(f"{article.title} {article.content}")
+        if keywords:
+            content = f"Title: {article.title} | Text: {article.content[:200]}"
+            yield models.pain("Reddit", article.source, content, products, keywords)
+
+async def scan_twitter(ctx, pipe):
+    """扫描Twitter痛点"""
+    if not await ctx.acquire('twitter'):
+        return 0
+    print("\n🐦 [痛点] 正在扫描 Twitter...")
     try:
-        client.load_cookies('cookies.json')
-        
-        # 构建搜索查询
-        search_queries = []
-        for product, keywords in PAIN_KEYWORDS.items():
-            for keyword in keywords[:2]:  # 每个产品选2个关键词
-                search_queries.append(f'"{product}" {keyword}')
-        
-        # 随机选择5个查询
-        selected_queries = random.sample(search_queries, min(5, len(search_queries)))
-        print(f"  🎯 今日搜索词: {selected_queries}")
-        
-        for query in selected_queries:
-            try:
-                print(f"  🔍 搜索: {query}")
-                tweets = await client.search_tweet(query, product='Latest', count=3)
-                
-                if not tweets:
-                    continue
-                
-                for tweet in tweets:
-                    text = tweet.text.replace('\n', ' ')
-                    user = tweet.user.name if tweet.user else "Unknown"
-                    
-                    # 提取产品名
-                    product = None
-                    for prod in PAIN_KEYWORDS.keys():
-                        if prod.lower() in query.lower():
-                            product = prod
-                            break
-                    
-                    if product and save_pain("Twitter", user, text, product):
-                        count += 1
-                
-                await asyncio.sleep(1)
-            except Exception as e:
-                print(f"     ⚠️ 搜索出错: {e}")
-                continue
-                
+        return await feed(pipe, twitter_pains, await ctx.call('twitter', search_tweets))
     except Exception as e:
         print(f"❌ Twitter 扫描失败: {e}")
-    
-    return count
+        ctx.fail_unit('twitter')
+        return 0
 
-def scan_hacker_news():
-    """扫描Hacker News"""
-    print("\n📰 [2/3] 正在扫描 Hacker News...")
-    count = 0
-    
+async def scan_hacker_news(ctx, pipe):
+    """扫描Hacker News（热门故事与机会猎手共享同一次抓取）"""
+    print("\n📰 [痛点] 正在扫描 Hacker News...")
     try:
-        # 获取热门故事
-        resp = requests.get(
-            'https://hacker-news.firebaseio.com/v0/topstories.json',
-            timeout=10
-        )
-        top_ids = resp.json()[:10]
-        
-        for item_id in top_ids:
-            try:
-                item = requests.get(
-                    f'https://hacker-news.firebaseio.com/v0/item/{item_id}.json',
-                    timeout=10
-                ).json()
-                
-                if item and item.get('score', 0) >= 100:
-                    title = item.get('title', '')
-                    text = item.get('text', '')
-                    
-                    # 检查是否包含痛点关键词
-                    for product, keywords in PAIN_KEYWORDS.items():
-                        for keyword in keywords:
-                            if keyword.lower() in (title + text).lower():
-                                content = f"Title: {title} | Text: {text[:100]}"
-                                if save_pain("HackerNews", "Tech", content, product):
-                                    count += 1
-                                break
-                
-                time.sleep(0.5)
-            except:
-                pass
-                
+        stories = await cycle.fetch_hn_stories(ctx, limit=HN_TOP_LIMIT)
+        return await feed(pipe, hn_pains, stories)
     except Exception as e:
         print(f"❌ HN 扫描失败: {e}")
+        ctx.fail_unit('hn')
+        return 0
+
+async def scan_reddit(ctx, pipe):
+    """扫描 Reddit 社区 RSS（用户吐槽集中地，每个 feed 抓到就送入流水线）"""
+    print("\n👽 [痛点] 正在扫描 Reddit...")
+    hunter = RSSHunter()
+    keys = [k for k in RSSHunter.sources_by_category('community') if await ctx.acquire(f'rss:{k}')]
     
-    return count
-
-def analyze_opportunities(raw_data):
-    """用AI分析市场机会"""
-    print("\n🧠 [3/3] AI 正在分析市场机会...")
+    async def fetch_and_feed(key):
+        return await feed(pipe, reddit_pains, await hunter.fetch_rss_feed_async(ctx, key))
     
-    prompt = f"""
-# Role: Market Opportunity Analyst
+    return sum(await asyncio.gather(*(fetch_and_feed(key) for key in keys)))
+
+# prompt 模板改动时递增版本号，使旧的 LLM 缓存失效
+PROMPT_VERSION = 'pain-v1'
+
+ANALYSIS_PROMPT = """# Role: Market Opportunity Analyst
 # Task: 从用户吐槽中提取可商业化的市场机会
 
 ## 分析框架
@@ -294,110 +353,161 @@ def analyze_opportunities(raw_data):
 - 主要产品: ...
 - 最热话题: ...
 """
+
+def analyze_opportunities(raw_data):
+    """用AI分析市场机会"""
+    print("\n🧠 [3/3] AI 正在分析市场机会...")
     
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            response = gemini_client.models.generate_content(
-                model='gemini-2.5-flash',
-                contents=prompt
-            )
-            return response.text
-        except Exception as e:
-            print(f"⚠️ 分析尝试 {attempt+1}/{max_retries} 失败: {e}")
-            if attempt < max_retries - 1:
-                time.sleep(5)
-            else:
-                return "❌ AI分析失败，请检查API密钥"
+    # 增量模式: 只把新条目合并进今日摘要
+    if daily_summary.INCREMENTAL_ENABLED:
+        summary = daily_summary.update_summary(
+            get_gemini_client(), raw_data,
+            kind='pain',
+            kind_label='市场机会',
+            role='Market Opportunity Analyst',
+            template_version=PROMPT_VERSION
+        )
+        return daily_summary.render_markdown(summary, '商业机会', top_n=3) if summary else "❌ AI分析失败，请检查API密钥"
     
-    return "❌ AI分析失败"
+    # 超出 token 预算时自动切块并发分析
+    text = analysis_pipeline.analyze(
+        get_gemini_client(), raw_data,
+        final_template=ANALYSIS_PROMPT,
+        template_version=PROMPT_VERSION,
+        kind='市场机会'
+    )
+    return text if text else "❌ AI分析失败，请检查API密钥"
+
+async def analyze_opportunities_async(raw_data, on_text=None):
+    """用AI分析市场机会（异步流式，不阻塞事件循环）"""
+    if daily_summary.INCREMENTAL_ENABLED:
+        return await asyncio.to_thread(analyze_opportunities, raw_data)
+    
+    print("\n🧠 [3/3] AI 正在分析市场机会...")
+    
+    text = await analysis_pipeline.analyze_async(
+        get_gemini_client(), raw_data,
+        final_template=ANALYSIS_PROMPT,
+        template_version=PROMPT_VERSION,
+        kind='市场机会',
+        on_text=on_text
+    )
+    return text if text else "❌ AI分析失败，请检查API密钥"
+
+REPORT_SPEC = report_renderer.ReportSpec(
+    heading='🎯 市场机会分析报告',
+    basename='Market_Opportunities',
+    count_label='捕获痛点数',
+    push_title='【市场机会】',
+    push_heading='🎯 市场机会分析',
+)
+
+def deliver_report(content, blocks=None):
+    """交付报告：后台渲染 output.formats 中的所有格式并推送（blocks 为流式阶段已解析好的文档树）"""
+    return report_renderer.deliver(content, REPORT_SPEC, len(current_session_pains), blocks=blocks)
+
+# ==================== 主程序 ====================
 
-def deliver_report(content):
-    """交付报告"""
-    if content.startswith("❌"):
-        print(f"\n🚫 {content}")
+async def analyze_and_deliver(pains, collection=None):
+    """
+    分诊 → 聚类 → 流式分析 → 交付
+    
+    Args:
+        pains: 本轮新入库的痛点会话条目
+        collection: 提供聚类向量的集合，默认为痛点集合
+    """
+    if checkpoint.stage('pain', 'delivered') is not None:
+        print("⏭️ 本轮痛点报告已在中断前交付")
+        return
+    # 中断前已完成分析的，直接交付保存的结果，不再调用 LLM
+    analysis = checkpoint.stage('pain', 'analysis')
+    if analysis is not None:
+        print("⏭️ 使用中断前保存的痛点分析结果")
+        checkpoint.mark_delivered('pain', deliver_report(analysis))
         return
     
-    today = datetime.date.today().strftime("%Y-%m-%d")
-    filename = f"Market_Opportunities_{today}.docx"
+    # 集群模式下只有持有分析租约的实例出报告，其他实例的条目交接给它一起分析
+    received = await asyncio.to_thread(coordination.exchange_items, 'pain', pains)
+    if received is None:
+        checkpoint.mark_stage('pain', 'delivered')
+        return
+    if received:
+        current_session_pains.extend(received)
+        pains = pains + received
+        # 交接来的条目的向量不在本进程，从 Chroma 读取
+        collection = None
+    if not pains:
+        print("🤷 未捕获到新痛点")
+        return
     
-    # 保存Word文档
-    try:
-        doc = Document()
-        doc.add_heading(f'🎯 市场机会分析报告 - {today}', 0)
-        doc.add_paragraph(f"生成时间: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        doc.add_paragraph(f"捕获痛点数: {len(current_session_pains)}")
-        doc.add_paragraph("=" * 50)
+    with profiling.span('analyze', module='pain', items=len(pains)):
+        # 本地分诊，只把有价值的条目送入 LLM（按入库文本打分，与训练样本一致）
+        pains = await asyncio.to_thread(
+            triage.filter_items, pains, lambda p: p.content, '痛点'
+        )
+        if not pains:
+            print("🤷 分诊后没有值得分析的痛点")
+            checkpoint.mark_stage('pain', 'delivered')
+            return
         
-        for line in content.split('\n'):
-            line = line.strip()
-            if not line:
-                continue
-            if line.startswith('# '):
-                doc.add_heading(line.replace('# ', ''), level=1)
-            elif line.startswith('## '):
-                doc.add_heading(line.replace('## ', ''), level=2)
-            elif line.startswith('### '):
-                doc.add_heading(line.replace('### ', ''), level=3)
-            else:
-                doc.add_paragraph(line)
+        # 格式化痛点数据（近似重复的吐槽按向量聚类合并）
+        lines = await asyncio.to_thread(
+            clustering.compress_items, collection or get_pain_collection(), pains,
+            lambda p: f"【{p.source}】({'/'.join(p.products)}) @{p.author}: {p.content}"
+        )
+        raw_pains = "\n".join(lines)
         
-        doc.save(filename)
-        print(f"\n💾 ✅ 报告已生成: {filename}")
-    except Exception as e:
-        print(f"❌ Word生成失败: {e}")
-    
-    # 推送微信
-    if PUSHPLUS_TOKEN and PUSHPLUS_TOKEN != '填入自己的TOKEN':
-        try:
-            print("📨 正在推送到微信...")
-            wechat_body = f"# 🎯 市场机会分析 ({today})\n\n{content}"
-            
-            requests.post(
-                'http://www.pushplus.plus/send',
-                json={
-                    "token": PUSHPLUS_TOKEN,
-                    "title": f"【市场机会】{today}",
-                    "content": wechat_body,
-                    "template": "markdown"
-                },
-                timeout=10
-            )
-            print("📨 ✅ 微信推送完成")
-        except Exception as e:
-            print(f"⚠️ 推送失败: {e}")
-
-# ==================== 主程序 ====================
+        # AI分析：流式接收，边收边解析成报告文档树
+        builder = report_renderer.ReportBuilder()
+        assembler = llm_client.LineAssembler(builder.add_line)
+        analysis = await analyze_opportunities_async(raw_pains, on_text=assembler.feed)
+        assembler.flush()
+        if not analysis.startswith("❌"):
+            checkpoint.mark_stage('pain', 'analysis', analysis)
+        
+        # 交付报告（中途重试过则按完整结果重新生成）
+        checkpoint.mark_delivered('pain', deliver_report(analysis, blocks=builder.blocks if assembler.is_clean else None))
 
-async def main():
+async def run(ctx):
+    """在给定的循环上下文中跑一轮: 抓取 → 分诊 → 聚类 → 流式分析 → 交付"""
+    current_session_pains.clear()
     print("\n" + "="*60)
     print("🚀 开始监控循环")
     print("="*60)
     
-    # 执行扫描
-    c1 = await scan_twitter()
-    c2 = scan_hacker_news()
+    # 续跑中断的一轮时，先恢复中断前已入库的痛点
+    current_session_pains.extend(checkpoint.items('pain'))
+    if checkpoint.stage('pain', 'fetched') is None:
+        # 各数据源并发抓取，边抓边经流水线入库；抓取截止时间到后未完成的数据源被取消
+        async with build_pipeline() as pipe:
+            counts = await ctx.run_producers({
+                'Twitter': scan_twitter(ctx, pipe),
+                'HackerNews': scan_hacker_news(ctx, pipe),
+                'Reddit': scan_reddit(ctx, pipe),
+            }, scope='pain')
+        pipe.print_summary()
+        checkpoint.mark_stage('pain', 'fetched')
+    else:
+        counts = {'恢复': len(current_session_pains)}
+        print("⏭️ 抓取已在中断前完成")
     
-    total = c1 + c2
-    print(f"\n📊 本次捕获痛点数: {total}")
+    total = len(current_session_pains)
+    print(f"\n📊 本次捕获痛点数: {total} {counts}")
     
-    if total > 0:
-        # 格式化痛点数据
-        raw_pains = "\n".join([
-            f"【{p['source']}】({p['product']}) @{p['author']}: {p['content']}"
-            for p in current_session_pains
-        ])
-        
-        # AI分析
-        analysis = analyze_opportunities(raw_pains)
-        
-        # 交付报告
-        deliver_report(analysis)
+    # 集群模式下本实例没有新条目时也可能要分析其他实例交接来的条目
+    if total > 0 or coordination.get_coordinator() is not None:
+        await analyze_and_deliver(list(current_session_pains))
     else:
         print("🤷 未捕获到新痛点")
     
     print("\n✅ 监控循环完成")
 
+async def main():
+    runtime.configure_proxy(YOUR_PORT)
+    print(f"🎯 痛点雷达 v2.0 启动... [时间: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}]")
+    async with cycle.CycleContext() as ctx:
+        await asyncio.wait_for(run(ctx), timeout=ctx.remaining())
+
 if __name__ == "__main__":
     try:
         asyncio.run(main())
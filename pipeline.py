@@ -0,0 +1,209 @@
+"""
+流式处理流水线 - 条目经有界队列在各阶段之间流动
+    数据源 → 解析 → 过滤/打标签 → 查重+入库 → 会话
+每个阶段可配置并发数，阶段之间的队列有上限: 下游处理不过来时上游的 put 会等待 (背压)，
+慢的 Chroma 写入不会让抓取无限堆积，抓取的突发也有缓冲；吞吐只受最慢的阶段限制。
+新增数据源只需写一个生产者: 抓到一批原始数据就 await pipe.feed(...)，返回这批最终产出的条目
+
+阶段函数可以是同步函数或协程函数，返回 None 表示丢弃该条目；
+同步函数默认放到线程池执行 (不阻塞事件循环，workers>1 时可以同时处理多条)，很轻的可以用 inline=True 直接调用；
+expand=True 的阶段返回可迭代对象，每个元素作为一条继续向下游流动
+"""
+
+import os
+import time
+import asyncio
+import inspect
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# ==================== 配置 ====================
+
+# 每个阶段输入队列的容量
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', 64))
+# 入库阶段的并发数: 同时在写线程排队的写操作越多，写线程每批合并得越多
+PIPELINE_STORE_WORKERS = int(os.getenv('PIPELINE_STORE_WORKERS', 16))
+# 按阶段名覆盖并发数，如 "parse=2,store=32"
+PIPELINE_WORKERS = os.getenv('PIPELINE_WORKERS', '')
+
+
+def _parse_workers(spec: str) -> Dict[str, int]:
+    """"parse=2,store=32" → {'parse': 2, 'store': 32}"""
+    result = {}
+    for part in spec.split(','):
+        name, _, value = part.strip().partition('=')
+        if name and value:
+            try:
+                result[name] = max(1, int(value))
+            except ValueError:
+                logger.warning(f"忽略无效的阶段并发配置: {part}")
+    return result
+
+
+_WORKER_OVERRIDES = _parse_workers(PIPELINE_WORKERS)
+
+
+@dataclass
+class Stage:
+    """流水线的一个阶段"""
+    name: str
+    fn: Callable[[Any], Any]
+    workers: int = 1
+    expand: bool = False        # fn 返回可迭代对象，逐个展开到下游
+    inline: bool = False        # 同步 fn 直接在事件循环里调用 (省去线程切换，只适合很轻的函数)
+    
+    @property
+    def offload(self) -> bool:
+        """是否放到线程池执行"""
+        return not self.inline and not inspect.iscoroutinefunction(self.fn)
+
+
+class _Ticket:
+    """一次 feed 的完成计数: 它派生的所有条目都离开流水线 (产出或丢弃) 后完成"""
+    __slots__ = ('pending', 'results', 'future')
+    
+    def __init__(self, future: asyncio.Future):
+        self.pending = 1
+        self.results: List[Any] = []
+        self.future = future
+    
+    def release(self) -> None:
+        self.pending -= 1
+        if self.pending == 0 and not self.future.done():
+            self.future.set_result(self.results)
+
+
+class Pipeline:
+    """
+    由有界队列串起来的多阶段流水线，用法:
+        async with Pipeline([Stage('parse', ...), Stage('store', ..., workers=16)], name='pain') as pipe:
+            stored = await pipe.feed(raw)
+    退出时等已送入的条目全部处理完 (异常或取消退出时直接停止)
+    """
+    
+    def __init__(self, stages: List[Stage], name: str = '', queue_size: int = PIPELINE_QUEUE_SIZE):
+        if not stages:
+            raise ValueError("流水线至少需要一个阶段")
+        self.stages = stages
+        self.name = name
+        self.queue_size = queue_size
+        self._queues: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+        self._stats = {stage.name: {'workers': self._workers(stage), 'in': 0, 'out': 0, 'errors': 0,
+                                    'busy': 0.0, 'backpressure': 0.0, 'max_depth': 0}
+                       for stage in stages}
+    
+    @staticmethod
+    def _workers(stage: Stage) -> int:
+        return _WORKER_OVERRIDES.get(stage.name, max(1, stage.workers))
+    
+    async def __aenter__(self) -> 'Pipeline':
+        self._queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        for index, stage in enumerate(self.stages):
+            for _ in range(self._workers(stage)):
+                self._tasks.append(asyncio.ensure_future(self._work(index)))
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                # 条目只向下游流动，按阶段顺序等待即可保证全部处理完
+                for queue in self._queues:
+                    await queue.join()
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._tasks = []
+        return False
+    
+    async def feed(self, item: Any) -> List[Any]:
+        """
+        送入一条原始数据，第一个阶段的队列满时等待
+        
+        Returns:
+            它在最后一个阶段的全部产出 (被丢弃的不在其中)
+        """
+        if not self._tasks:
+            raise RuntimeError("流水线未启动，请在 async with 中使用")
+        ticket = _Ticket(asyncio.get_running_loop().create_future())
+        await self._put(0, item, ticket)
+        return await ticket.future
+    
+    async def _put(self, index: int, item: Any, ticket: _Ticket) -> None:
+        queue = self._queues[index]
+        stats = self._stats[self.stages[index].name]
+        if queue.full():
+            start = time.perf_counter()
+            await queue.put((item, ticket))
+            stats['backpressure'] += time.perf_counter() - start
+        else:
+            queue.put_nowait((item, ticket))
+        stats['max_depth'] = max(stats['max_depth'], queue.qsize())
+    
+    async def _work(self, index: int) -> None:
+        stage = self.stages[index]
+        queue = self._queues[index]
+        stats = self._stats[stage.name]
+        last = index == len(self.stages) - 1
+        offload = stage.offload
+        while True:
+            item, ticket = await queue.get()
+            try:
+                start = time.perf_counter()
+                try:
+                    if offload:
+                        result = await asyncio.to_thread(stage.fn, item)
+                    else:
+                        result = stage.fn(item)
+                    if inspect.isawaitable(result):
+                        result = await result
+                    if result is None:
+                        outputs = []
+                    elif stage.expand:
+                        outputs = list(result)
+                    else:
+                        outputs = [result]
+                except Exception as e:
+                    stats['errors'] += 1
+                    print(f"  ⚠️ {stage.name} 阶段处理失败: {e}")
+                    outputs = []
+                stats['busy'] += time.perf_counter() - start
+                stats['in'] += 1
+                stats['out'] += len(outputs)
+                
+                if last:
+                    ticket.results.extend(outputs)
+                else:
+                    ticket.pending += len(outputs)
+                    for output in outputs:
+                        await self._put(index + 1, output, ticket)
+                ticket.release()
+            finally:
+                queue.task_done()
+    
+    def stats(self) -> Dict[str, Dict]:
+        """各阶段统计: 并发数、输入/产出条数、失败数、处理耗时、上游因队列满等待的时间、队列最大深度"""
+        return {name: dict(stats) for name, stats in self._stats.items()}
+    
+    def bottleneck(self) -> Optional[str]:
+        """按 处理耗时 / 并发数 估计的最慢阶段"""
+        busiest = max(self._stats.items(), key=lambda kv: kv[1]['busy'] / kv[1]['workers'])
+        return busiest[0] if busiest[1]['busy'] > 0 else None
+    
+    def print_summary(self) -> None:
+        parts = []
+        for name, stats in self._stats.items():
+            workers = f"×{stats['workers']}" if stats['workers'] > 1 else ''
+            parts.append(f"{name}{workers} {stats['in']}→{stats['out']}")
+        line = f"🚰 流水线{f'[{self.name}]' if self.name else ''}: " + ' | '.join(parts)
+        backpressure = sum(stats['backpressure'] for stats in self._stats.values())
+        if backpressure >= 0.01:
+            line += f", 背压等待 {backpressure:.2f} 秒"
+        bottleneck = self.bottleneck()
+        if bottleneck:
+            line += f", 最慢阶段 {bottleneck}"
+        print(line)
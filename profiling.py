@@ -0,0 +1,321 @@
+"""
+性能剖析 - run_monitor.py --profile 使用
+每轮循环在 logs/ 下写一组文件 (文件名前缀 profile-时间戳):
+  full 模式 (开销较大，排查问题时用):
+    .pstats      cProfile 结果，python -m pstats 或 snakeviz 打开
+    .alloc.txt   tracemalloc 内存分配 top-N: 本轮新增 + 相对上一轮结束时的增长 (守护进程内存缓慢上涨时看这里)
+    .trace.json  各阶段耗时区间
+  sample 模式 (可以在生产环境常开):
+    .folded      墙钟采样的折叠调用栈，flamegraph.pl / speedscope 打开
+    .trace.json  各阶段耗时区间
+.trace.json 为 Chrome Trace Event 格式，可直接拖进 ui.perfetto.dev 或 chrome://tracing
+
+阶段区间由各模块调用 span() 记录 (fetch / match / dedup / store / analyze / render / push)，
+未开启剖析时 span() 什么都不做。多进程模式下只记录主进程内的阶段
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import threading
+from pathlib import Path
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# ==================== 配置 ====================
+
+# 默认剖析模式 (full / sample，留空为关闭)，--profile 优先
+PROFILE_MODE = os.getenv('PROFILE_MODE', '')
+PROFILE_DIR = Path(os.getenv('PROFILE_DIR', './logs'))
+# 内存分配报告的条数
+PROFILE_TOP_N = int(os.getenv('PROFILE_TOP_N', 25))
+# 采样间隔 (秒)
+PROFILE_SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL', 0.01))
+# 最多保留最近几轮的剖析文件
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', 48))
+# 每轮最多记录的区间数 (防止异常情况下无限增长)
+MAX_SPANS = 200000
+
+MODES = ('full', 'sample')
+
+
+class SpanRecorder:
+    """收集阶段区间，按线程 / asyncio 任务分轨道"""
+    
+    def __init__(self):
+        self.origin = time.perf_counter_ns()
+        self.events: List[Dict] = []
+        self.tracks: Dict[int, str] = {}
+        self.dropped = 0
+        self._lock = threading.Lock()
+    
+    def track(self) -> int:
+        """当前轨道: 在 asyncio 任务里时每个任务一条，否则每个线程一条"""
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        if task is not None:
+            tid = id(task)
+            if tid not in self.tracks:
+                self.tracks[tid] = f"{threading.current_thread().name}/{task.get_name()}"
+        else:
+            tid = threading.get_ident()
+            if tid not in self.tracks:
+                self.tracks[tid] = threading.current_thread().name
+        return tid
+    
+    def add(self, name: str, tid: int, start_ns: int, end_ns: int, args: Dict) -> None:
+        if len(self.events) >= MAX_SPANS:
+            self.dropped += 1
+            return
+        event = {
+            'name': name, 'cat': 'stage', 'ph': 'X', 'pid': os.getpid(), 'tid': tid,
+            'ts': (start_ns - self.origin) / 1000, 'dur': (end_ns - start_ns) / 1000,
+        }
+        if args:
+            event['args'] = {k: str(v) for k, v in args.items()}
+        self.events.append(event)
+    
+    def take(self) -> Dict:
+        """取出目前为止的区间，生成 Chrome Trace 文档"""
+        with self._lock:
+            events, self.events = self.events, []
+            tracks = dict(self.tracks)
+            dropped, self.dropped = self.dropped, 0
+        used = {e['tid'] for e in events}
+        meta = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': name}}
+            for tid, name in tracks.items() if tid in used
+        ]
+        return {'traceEvents': meta + events, 'displayTimeUnit': 'ms',
+                'otherData': {'dropped_spans': dropped}}
+
+
+class _Span:
+    __slots__ = ('recorder', 'name', 'args', 'tid', 'start')
+    
+    def __init__(self, recorder: SpanRecorder, name: str, args: Dict):
+        self.recorder = recorder
+        self.name = name
+        self.args = args
+    
+    def __enter__(self):
+        self.tid = self.recorder.track()
+        self.start = time.perf_counter_ns()
+        return self
+    
+    def __exit__(self, *exc):
+        self.recorder.add(self.name, self.tid, self.start, time.perf_counter_ns(), self.args)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class StackSampler:
+    """后台线程定时抓取所有线程的调用栈 (墙钟采样)，按折叠栈计数"""
+    
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        counts, self.counts = self.counts, Counter()
+        return counts
+    
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(tid, str(tid)))
+                self.counts[';'.join(reversed(stack))] += 1
+
+
+class CycleProfiler:
+    """按轮次写剖析文件"""
+    
+    def __init__(self, mode: str, out_dir: Path = PROFILE_DIR, top_n: int = PROFILE_TOP_N,
+                 keep: int = PROFILE_KEEP):
+        if mode not in MODES:
+            raise ValueError(f"未知的剖析模式: {mode}")
+        self.mode = mode
+        self.out_dir = Path(out_dir)
+        self.top_n = top_n
+        self.keep = keep
+        self.spans = SpanRecorder()
+        self._previous = None   # 上一轮结束时的内存快照
+        
+        if mode == 'full':
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+    
+    @contextmanager
+    def cycle(self):
+        """剖析一轮循环，结束后写文件"""
+        prefix = self.out_dir / f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+        profiler = sampler = before = None
+        if self.mode == 'full':
+            import cProfile
+            import tracemalloc
+            before = tracemalloc.take_snapshot()
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            sampler = StackSampler()
+            sampler.start()
+        
+        try:
+            with span('cycle'):
+                yield
+        finally:
+            try:
+                self.out_dir.mkdir(parents=True, exist_ok=True)
+                written = []
+                if profiler is not None:
+                    profiler.disable()
+                    # 先拍内存快照，避免把导出 pstats 的分配算进去
+                    written.append(self._write_allocations(f"{prefix}.alloc.txt", before))
+                    profiler.dump_stats(f"{prefix}.pstats")
+                    written.append(f"{prefix}.pstats")
+                if sampler is not None:
+                    written.append(self._write_folded(f"{prefix}.folded", sampler.stop()))
+                with open(f"{prefix}.trace.json", 'w', encoding='utf-8') as f:
+                    json.dump(self.spans.take(), f)
+                written.append(f"{prefix}.trace.json")
+                print(f"🔬 剖析文件: {', '.join(os.path.basename(p) for p in written)} → {self.out_dir}")
+                self._prune()
+            except Exception as e:
+                logger.warning(f"写入剖析文件失败: {str(e)}")
+    
+    def _write_allocations(self, path: str, before) -> str:
+        import tracemalloc
+        
+        after = tracemalloc.take_snapshot()
+        filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+        ]
+        after = after.filter_traces(filters)
+        current, peak = tracemalloc.get_traced_memory()
+        
+        lines = [f"# 当前跟踪内存 {current / 1024 / 1024:.1f} MB, 峰值 {peak / 1024 / 1024:.1f} MB", '']
+        sections = [('本轮新增', before.filter_traces(filters))]
+        if self._previous is not None:
+            sections.append(('相对上一轮结束', self._previous))
+        for title, baseline in sections:
+            stats = after.compare_to(baseline, 'lineno')
+            growth = sum(s.size_diff for s in stats)
+            lines.append(f"## {title}: 净增 {growth / 1024:.1f} KB (top {self.top_n})")
+            for stat in stats[:self.top_n]:
+                lines.append(str(stat))
+            lines.append('')
+        self._previous = after
+        tracemalloc.reset_peak()
+        
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines))
+        return path
+    
+    @staticmethod
+    def _write_folded(path: str, counts: Counter) -> str:
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in counts.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+    
+    def _prune(self) -> None:
+        """只保留最近 keep 轮"""
+        if self.keep <= 0:
+            return
+        prefixes = sorted({p.name.split('.', 1)[0] for p in self.out_dir.glob('profile-*')})
+        for prefix in prefixes[:-self.keep]:
+            for path in self.out_dir.glob(f"{prefix}.*"):
+                path.unlink(missing_ok=True)
+
+
+_profiler: Optional[CycleProfiler] = None
+_spans: Optional[SpanRecorder] = None
+
+
+def configure(mode: Optional[str]) -> Optional[CycleProfiler]:
+    """
+    开启剖析
+    
+    Args:
+        mode: full / sample，空值表示关闭
+    
+    Returns:
+        剖析器，关闭时为 None
+    """
+    global _profiler, _spans
+    _profiler = CycleProfiler(mode) if mode else None
+    _spans = _profiler.spans if _profiler is not None else None
+    if _profiler is not None:
+        print(f"🔬 性能剖析已开启: {mode} 模式，输出到 {_profiler.out_dir}")
+    return _profiler
+
+
+def span(name: str, **args):
+    """
+    记录一个阶段区间，用法: with profiling.span('fetch', host=host): ...
+    未开启剖析时返回空操作
+    """
+    if _spans is None:
+        return _NO_SPAN
+    return _Span(_spans, name, args)
+
+
+def collect_spans() -> SpanRecorder:
+    """只收集阶段区间、不写剖析文件 (基准测试用)，用 take() 取出"""
+    global _spans
+    if _spans is None:
+        _spans = SpanRecorder()
+    return _spans
+
+
+@contextmanager
+def profile_cycle():
+    """剖析一轮循环 (未开启剖析时空操作)"""
+    if _profiler is None:
+        yield
+        return
+    with _profiler.cycle():
+        yield
@@ -0,0 +1,276 @@
+"""
+报告渲染 - 把 LLM 输出的 Markdown 解析成文档树，按 output.formats 并行渲染
+渲染和写盘在后台工作线程/进程中完成，原子写入 reports/ 目录，不阻塞事件循环和下一轮循环
+"""
+
+import io
+import os
+import json
+import logging
+import datetime
+import threading
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import outbox
+import profiling
+
+logger = logging.getLogger(__name__)
+
+# ==================== 配置 ====================
+
+REPORT_DIR = Path(os.getenv('REPORT_OUTPUT_DIR', './reports'))
+# thread: 线程池 (默认) | process: 进程池，docx 这类纯 Python 渲染可绕开 GIL
+REPORT_EXECUTOR = os.getenv('REPORT_EXECUTOR', 'thread')
+DEFAULT_FORMATS = ['docx']
+SUPPORTED_FORMATS = ('json', 'markdown', 'docx')
+
+
+@dataclass
+class Block:
+    """文档树节点"""
+    kind: str           # heading / list_item / paragraph
+    text: str
+    level: int = 0      # 标题级别或列表缩进层级
+
+
+@dataclass
+class ReportDocument:
+    """中间文档: 各格式渲染器共用"""
+    title: str
+    meta: List[Tuple[str, str]]
+    blocks: List[Block]
+    markdown: str
+
+
+@dataclass
+class ReportSpec:
+    """各模块的报告外观"""
+    heading: str        # 文档标题，如 '🎯 市场机会分析报告'
+    basename: str       # 文件名前缀，如 'Market_Opportunities'
+    count_label: str    # 条目数说明，如 '捕获痛点数'
+    push_title: str     # 推送标题前缀，如 '【市场机会】'
+    push_heading: str   # 推送正文标题，如 '🎯 市场机会分析'
+    formats: Optional[List[str]] = field(default=None)
+
+
+class ReportBuilder:
+    """逐行构建文档树，可直接接在流式输出后面"""
+    
+    def __init__(self):
+        self.blocks: List[Block] = []
+    
+    def add_line(self, line: str) -> None:
+        """解析一行 Markdown"""
+        stripped = line.strip()
+        if not stripped:
+            return
+        if stripped.startswith('#'):
+            marks = len(stripped) - len(stripped.lstrip('#'))
+            if 1 <= marks <= 3 and stripped[marks:marks + 1] == ' ':
+                self.blocks.append(Block('heading', stripped[marks + 1:].strip(), marks))
+                return
+        indent = (len(line) - len(line.lstrip(' '))) // 2
+        head = stripped.split(' ', 1)[0]
+        if head in ('-', '*') or (head.endswith('.') and head[:-1].isdigit()):
+            self.blocks.append(Block('list_item', stripped, indent))
+        else:
+            self.blocks.append(Block('paragraph', stripped))
+
+
+def parse_markdown(content: str) -> List[Block]:
+    """一次性解析 Markdown 为文档树"""
+    builder = ReportBuilder()
+    for line in content.split('\n'):
+        builder.add_line(line)
+    return builder.blocks
+
+
+# ==================== 渲染器 ====================
+
+def render_json(doc: ReportDocument) -> bytes:
+    data = {
+        'title': doc.title,
+        'meta': dict(doc.meta),
+        'blocks': [asdict(b) for b in doc.blocks],
+        'markdown': doc.markdown,
+    }
+    return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+def render_markdown(doc: ReportDocument) -> bytes:
+    lines = [f"# {doc.title}", ""]
+    lines.extend(f"- {key}: {value}" for key, value in doc.meta)
+    lines.extend(["", "---", "", doc.markdown.strip(), ""])
+    return "\n".join(lines).encode('utf-8')
+
+
+def render_docx(doc: ReportDocument) -> bytes:
+    from docx import Document
+    
+    document = Document()
+    document.add_heading(doc.title, 0)
+    for key, value in doc.meta:
+        document.add_paragraph(f"{key}: {value}")
+    document.add_paragraph("=" * 50)
+    
+    for block in doc.blocks:
+        if block.kind == 'heading':
+            document.add_heading(block.text, level=block.level)
+        else:
+            document.add_paragraph(block.text)
+    
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+RENDERERS = {
+    'json': (render_json, 'json'),
+    'markdown': (render_markdown, 'md'),
+    'docx': (render_docx, 'docx'),
+}
+
+
+def _render(fmt: str, doc: ReportDocument) -> bytes:
+    return RENDERERS[fmt][0](doc)
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """先写临时文件再 rename，读方不会看到半个文件"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# ==================== 执行器 ====================
+
+_job_pool: Optional[ThreadPoolExecutor] = None
+_pending: List[Future] = []
+_render_pool = None
+_pool_lock = threading.Lock()
+
+
+def _pools():
+    global _job_pool, _render_pool
+    with _pool_lock:
+        if _job_pool is None:
+            _job_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='report')
+            if REPORT_EXECUTOR == 'process':
+                _render_pool = ProcessPoolExecutor(max_workers=len(SUPPORTED_FORMATS))
+            else:
+                _render_pool = ThreadPoolExecutor(max_workers=len(SUPPORTED_FORMATS),
+                                                  thread_name_prefix='render')
+        return _job_pool, _render_pool
+
+
+def configured_formats() -> List[str]:
+    """读取 keywords.yaml 中的 output.formats"""
+    try:
+        from config_loader import ConfigLoader
+        formats = ConfigLoader().load_keywords().output.get('formats') or DEFAULT_FORMATS
+    except Exception as e:
+        logger.warning(f"读取报告格式失败，使用默认格式: {str(e)}")
+        formats = DEFAULT_FORMATS
+    valid = [f for f in formats if f in RENDERERS]
+    for fmt in set(formats) - set(valid):
+        logger.warning(f"不支持的报告格式: {fmt}")
+    return valid or DEFAULT_FORMATS
+
+
+def render_report(doc: ReportDocument, basename: str, formats: Sequence[str],
+                  output_dir: Path = REPORT_DIR) -> Dict[str, Path]:
+    """
+    并行渲染所有格式并原子写入
+    
+    Args:
+        doc: 中间文档
+        basename: 文件名 (不含扩展名)
+        formats: 格式列表
+        output_dir: 输出目录
+    
+    Returns:
+        {格式: 文件路径}，渲染失败的格式不在其中
+    """
+    _, render_pool = _pools()
+    with profiling.span('render', report=basename, formats=','.join(formats)):
+        futures = {fmt: render_pool.submit(_render, fmt, doc) for fmt in formats}
+        
+        written = {}
+        for fmt, future in futures.items():
+            try:
+                path = Path(output_dir) / f"{basename}.{RENDERERS[fmt][1]}"
+                write_atomic(path, future.result())
+                written[fmt] = path
+            except Exception as e:
+                print(f"❌ {fmt} 报告生成失败: {e}")
+    return written
+
+
+def _deliver_job(doc: ReportDocument, spec: ReportSpec, today: str) -> Dict[str, Path]:
+    formats = spec.formats or configured_formats()
+    written = render_report(doc, f"{spec.basename}_{today}", formats)
+    if written:
+        print(f"\n💾 ✅ 报告已生成: {', '.join(str(p) for p in written.values())}")
+    # 推送交给发件箱，由后台线程负责重试与合并
+    outbox.enqueue(f"{spec.push_title}{today}", f"# {spec.push_heading} ({today})\n\n{doc.markdown}")
+    return written
+
+
+def deliver(content: str, spec: ReportSpec, item_count: int,
+            blocks: Optional[List[Block]] = None) -> Optional[Future]:
+    """
+    交付报告: 在后台渲染所有格式、写盘并投递到推送发件箱，立即返回
+    
+    Args:
+        content: LLM 输出的 Markdown
+        spec: 报告外观
+        item_count: 本轮条目数
+        blocks: 流式阶段已解析好的文档树，None 时从 content 解析
+    
+    Returns:
+        后台任务的 Future (结果为 {格式: 路径})，分析失败时返回 None
+    """
+    if content.startswith("❌"):
+        print(f"\n🚫 {content}")
+        return None
+    
+    now = datetime.datetime.now()
+    today = now.strftime("%Y-%m-%d")
+    doc = ReportDocument(
+        title=f"{spec.heading} - {today}",
+        meta=[
+            ("生成时间", now.strftime('%Y-%m-%d %H:%M:%S')),
+            (spec.count_label, str(item_count)),
+        ],
+        blocks=blocks if blocks is not None else parse_markdown(content),
+        markdown=content,
+    )
+    
+    job_pool, _ = _pools()
+    future = job_pool.submit(_deliver_job, doc, spec, today)
+    future.add_done_callback(_log_failure)
+    with _pool_lock:
+        _pending[:] = [f for f in _pending if not f.done()]
+        _pending.append(future)
+    return future
+
+
+def wait_pending(timeout: Optional[float] = None) -> None:
+    """等待已提交的报告任务完成，用于单次运行退出前"""
+    with _pool_lock:
+        pending = list(_pending)
+    if pending:
+        wait(pending, timeout=timeout)
+
+
+def _log_failure(future: Future) -> None:
+    exc = future.exception()
+    if exc is not None:
+        print(f"❌ 报告交付失败: {exc}")
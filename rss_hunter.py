@@ -3,16 +3,27 @@ RSS 数据源模块 - 监控 Reddit、Product Hunt、Hugging Face、Y Combinator
 无需 API Key，完全免费且稳定
 """
 
-import feedparser
+import os
+import time
+import asyncio
+import calendar
 import requests
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import List, Dict, Optional
 import logging
-import hashlib
 from urllib.parse import quote
 
+import models
+import fast_feed
+import html_extractor
+from models import Item
+
 logger = logging.getLogger(__name__)
 
+HF_PAPERS_URL = os.getenv('HF_PAPERS_URL') or 'https://huggingface.co/papers'
+# 设置后所有 RSS 源改从 <RSS_BASE_URL>/<源键名> 获取 (离线基准测试的替身服务)
+RSS_BASE_URL = os.getenv('RSS_BASE_URL', '')
+
 
 class RSSHunter:
     """RSS 数据源监控器"""
@@ -48,7 +59,7 @@ class RSSHunter:
             'url': 'https://huggingface.co/papers/daily',
             'name': 'Hugging Face - Daily Papers',
             'category': 'research',
-            'type': 'html'  # 特殊处理
+            'type': 'html'  # 网页源，按 html_extractor 的抓取配置提取
         },
         'ycombinator': {
             'url': 'https://www.ycombinator.com/rss',
@@ -77,7 +88,7 @@ class RSSHunter:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
     
-    def fetch_rss_feed(self, source_key: str) -> List[Dict]:
+    def fetch_rss_feed(self, source_key: str) -> List[Item]:
         """
         获取 RSS 源数据
         
@@ -87,28 +98,19 @@ class RSSHunter:
         Returns:
             文章列表
         """
-        if source_key not in self.RSS_SOURCES:
+        sources = self.sources()
+        if source_key not in sources:
             logger.warning(f"Unknown RSS source: {source_key}")
             return []
         
-        source = self.RSS_SOURCES[source_key]
+        source = sources[source_key]
         articles = []
         
         try:
-            # 特殊处理 Hugging Face
             if source.get('type') == 'html':
-                articles = self._fetch_huggingface_papers()
+                articles = self._fetch_page(source, source_key)
             else:
-                # 标准 RSS 处理
-                feed = feedparser.parse(source['url'])
-                
-                if feed.bozo:
-                    logger.warning(f"RSS 解析警告 {source_key}: {feed.bozo_exception}")
-                
-                for entry in feed.entries[:50]:  # 限制前50条
-                    article = self._parse_rss_entry(entry, source)
-                    if article:
-                        articles.append(article)
+                articles = self._parse_feed(self.feed_url(source_key), source, source_key)
             
             logger.info(f"✅ 获取 {source['name']}: {len(articles)} 条")
             return articles
@@ -117,7 +119,143 @@ class RSSHunter:
             logger.error(f"❌ 获取 RSS 源失败 {source_key}: {str(e)}")
             return []
     
-    def _parse_rss_entry(self, entry, source: Dict) -> Optional[Dict]:
+    async def fetch_rss_feed_async(self, ctx, source_key: str) -> List[Item]:
+        """
+        在事件循环中获取 RSS 源: 下载经由 CycleContext，解析放到工作线程
+        
+        Args:
+            ctx: cycle.CycleContext
+            source_key: RSS 源键名
+        
+        Returns:
+            文章列表
+        """
+        body = await self.download_feed_async(ctx, source_key)
+        if body is None:
+            return []
+        return await asyncio.to_thread(self.parse_feed_body, source_key, body)
+    
+    async def download_feed_async(self, ctx, source_key: str) -> Optional[str]:
+        """
+        只下载 RSS 源原文，不解析 (多进程模式下解析交给解析进程)
+        
+        Args:
+            ctx: cycle.CycleContext
+            source_key: RSS 源键名
+        
+        Returns:
+            原文，失败时为 None
+        """
+        if source_key not in self.sources():
+            logger.warning(f"Unknown RSS source: {source_key}")
+            return None
+        
+        url = self.feed_url(source_key)
+        headers = {'User-Agent': self.session.headers['User-Agent']}
+        try:
+            return await ctx.get_text(url, headers=headers, timeout=self.timeout)
+        except Exception as e:
+            logger.error(f"❌ 获取 RSS 源失败 {source_key}: {str(e)}")
+            ctx.fail_unit(f'rss:{source_key}')
+            return None
+    
+    def parse_feed_body(self, source_key: str, body: str) -> List[Item]:
+        """
+        解析已下载的 RSS 源原文
+        
+        Args:
+            source_key: RSS 源键名
+            body: download_feed_async 返回的原文
+        
+        Returns:
+            文章列表
+        """
+        source = self.sources()[source_key]
+        try:
+            if source.get('type') == 'html':
+                articles = self._parse_page(body, source, source_key)
+            else:
+                articles = self._parse_feed(body, source, source_key)
+            
+            logger.info(f"✅ 获取 {source['name']}: {len(articles)} 条")
+            return articles
+        
+        except Exception as e:
+            logger.error(f"❌ 解析 RSS 源失败 {source_key}: {str(e)}")
+            return []
+    
+    @classmethod
+    def sources(cls) -> Dict[str, Dict]:
+        """内置的 RSS 源，加上 keywords.yaml scrapers 段中声明了 url / name / category 的网页源"""
+        sources = dict(cls.RSS_SOURCES)
+        for key, config in html_extractor.configs().items():
+            if key not in sources and all(config.get(field) for field in ('url', 'name', 'category')):
+                sources[key] = {'url': config['url'], 'name': config['name'],
+                                'category': config['category'], 'type': 'html'}
+        return sources
+    
+    @classmethod
+    def feed_url(cls, source_key: str) -> str:
+        """RSS 源地址 (RSS_BASE_URL 优先，Hugging Face Papers 用 HF_PAPERS_URL)"""
+        if source_key == 'huggingface_papers':
+            return HF_PAPERS_URL
+        if RSS_BASE_URL:
+            return f"{RSS_BASE_URL.rstrip('/')}/{source_key}"
+        return cls.sources()[source_key]['url']
+    
+    @classmethod
+    def sources_by_category(cls, *categories: str) -> List[str]:
+        """按分类筛选 RSS 源键名"""
+        return [key for key, source in cls.sources().items() if source.get('category') in categories]
+    
+    def _parse_feed(self, url_or_content: str, source: Dict, source_key: str) -> List[Item]:
+        """
+        解析 RSS/Atom (地址或已下载的内容)，已知格式用 fast_feed，其余回退到 feedparser
+        
+        Args:
+            url_or_content: feed 地址或 XML 文本
+            source: 源配置
+            source_key: RSS 源键名
+        
+        Returns:
+            文章列表
+        """
+        if url_or_content.startswith(('http://', 'https://')):
+            response = self.session.get(url_or_content, timeout=self.timeout)
+            response.raise_for_status()
+            url_or_content = response.text
+        
+        # 已知格式 (RSS 2.0 / Atom) 走 lxml 流式解析，取够条数即停
+        entries = fast_feed.parse(url_or_content, fast_feed.FEED_ENTRY_LIMIT)
+        if entries is not None:
+            return [
+                models.article(
+                    source=source['name'],
+                    title=entry.title,
+                    summary=entry.summary,
+                    link=entry.link,
+                    group=source.get('category', 'other'),
+                    published=entry.published
+                )
+                for entry in entries
+            ]
+        
+        # feedparser 较重，用到时再导入
+        import feedparser
+        
+        feed = feedparser.parse(url_or_content)
+        
+        if feed.bozo:
+            logger.warning(f"RSS 解析警告 {source_key}: {feed.bozo_exception}")
+        
+        articles = []
+        for entry in feed.entries[:fast_feed.FEED_ENTRY_LIMIT]:
+            article = self._parse_rss_entry(entry, source)
+            if article:
+                articles.append(article)
+        return articles
+    
+    def _parse_rss_entry(self, entry, source: Dict) -> Optional[Item]:
         """
         解析 RSS 条目
         
@@ -126,100 +264,75 @@ class RSSHunter:
             source: 源配置
             
         Returns:
-            解析后的文章字典
+            文章条目
         """
         try:
-            title = entry.get('title', '')
-            summary = entry.get('summary', '')
-            link = entry.get('link', '')
-            published = entry.get('published', '')
-            
-            # 提取发布时间
+            # 发布时间 (feedparser 给出 UTC 的 struct_time)，缺失时取当前时间
             try:
-                pub_time = datetime(*entry.published_parsed[:6])
-            except:
-                pub_time = datetime.now()
-            
-            # 生成内容指纹
-            content_hash = hashlib.md5(
-                f"{title}{summary}".encode()
-            ).hexdigest()
+                published = calendar.timegm(entry.published_parsed)
+            except Exception:
+                published = None
             
-            return {
-                'title': title,
-                'summary': summary[:500],  # 限制长度
-                'link': link,
-                'source': source['name'],
-                'source_key': source.get('category', 'other'),
-                'published_at': pub_time.isoformat(),
-                'content_hash': content_hash,
-                'platform': 'RSS',
-                'type': 'article'
-            }
+            return models.article(
+                source=source['name'],
+                title=entry.get('title', ''),
+                summary=entry.get('summary', ''),
+                link=entry.get('link', ''),
+                group=source.get('category', 'other'),
+                published=published
+            )
         except Exception as e:
             logger.warning(f"解析 RSS 条目失败: {str(e)}")
             return None
     
-    def _fetch_huggingface_papers(self) -> List[Dict]:
+    def _fetch_page(self, source: Dict, source_key: str) -> List[Item]:
         """
-        获取 Hugging Face Daily Papers
+        获取网页源 (Hugging Face Daily Papers 等)
         
         Returns:
-            论文列表
+            文章列表
         """
-        articles = []
         try:
-            url = 'https://huggingface.co/papers'
-            response = self.session.get(url, timeout=self.timeout)
+            response = self.session.get(self.feed_url(source_key), timeout=self.timeout)
             response.raise_for_status()
-            
-            # 简单的 HTML 解析 (如果需要更复杂的解析，可以使用 BeautifulSoup)
-            from bs4 import BeautifulSoup
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # 查找论文条目
-            papers = soup.find_all('article', limit=50)
-            
-            for paper in papers:
-                try:
-                    title_elem = paper.find('h3')
-                    if not title_elem:
-                        continue
-                    
-                    title = title_elem.get_text(strip=True)
-                    link = paper.find('a')['href'] if paper.find('a') else ''
-                    
-                    # 获取摘要
-                    summary_elem = paper.find('p')
-                    summary = summary_elem.get_text(strip=True) if summary_elem else ''
-                    
-                    content_hash = hashlib.md5(
-                        f"{title}{summary}".encode()
-                    ).hexdigest()
-                    
-                    articles.append({
-                        'title': title,
-                        'summary': summary[:500],
-                        'link': f"https://huggingface.co{link}" if link else '',
-                        'source': 'Hugging Face - Daily Papers',
-                        'source_key': 'research',
-                        'published_at': datetime.now().isoformat(),
-                        'content_hash': content_hash,
-                        'platform': 'RSS',
-                        'type': 'paper'
-                    })
-                except Exception as e:
-                    logger.debug(f"解析论文失败: {str(e)}")
-                    continue
-            
-            logger.info(f"✅ 获取 Hugging Face Papers: {len(articles)} 篇")
-            return articles
+            return self._parse_page(response.text, source, source_key)
             
         except Exception as e:
-            logger.error(f"❌ 获取 Hugging Face Papers 失败: {str(e)}")
+            logger.error(f"❌ 获取 {source['name']} 失败: {str(e)}")
             return []
     
-    def fetch_all_sources(self) -> Dict[str, List[Dict]]:
+    def _parse_page(self, html: str, source: Dict, source_key: str) -> List[Item]:
+        """
+        按抓取配置解析网页源
+        
+        Args:
+            html: 页面 HTML
+            source: 源配置
+            source_key: 源键名 (即 scrapers 中的配置名)
+        
+        Returns:
+            文章列表
+        """
+        rule = html_extractor.scraper(source_key)
+        if rule is None:
+            logger.warning(f"网页源没有抓取配置: {source_key}")
+            return []
+        
+        articles = [
+            models.article(
+                source=source['name'],
+                title=row['title'],
+                summary=row.get('summary', ''),
+                link=row.get('link', ''),
+                category=rule.article_type,
+                group=source.get('category', 'other')
+            )
+            for row in html_extractor.extract(html, rule)
+        ]
+        logger.info(f"✅ 获取 {source['name']}: {len(articles)} 条")
+        return articles
+    
+    def fetch_all_sources(self) -> Dict[str, List[Item]]:
         """
         获取所有 RSS 源数据
         
@@ -228,13 +341,13 @@ class RSSHunter:
         """
         all_articles = {}
         
-        for source_key in self.RSS_SOURCES.keys():
+        for source_key in self.sources():
             articles = self.fetch_rss_feed(source_key)
             all_articles[source_key] = articles
         
         return all_articles
     
-    def filter_by_keywords(self, articles: List[Dict], keywords: List[str]) -> List[Dict]:
+    def filter_by_keywords(self, articles: List[Item], keywords: List[str]) -> List[Item]:
         """
         按关键词过滤文章
         
@@ -249,8 +362,8 @@ class RSSHunter:
         keywords_lower = [k.lower() for k in keywords]
         
         for article in articles:
-            title_lower = article['title'].lower()
-            summary_lower = article['summary'].lower()
+            title_lower = article.title.lower()
+            summary_lower = article.content.lower()
             
             # 检查是否包含任何关键词
             for keyword in keywords_lower:
@@ -260,7 +373,7 @@ class RSSHunter:
         
         return filtered
     
-    def get_recent_articles(self, hours: int = 24) -> List[Dict]:
+    def get_recent_articles(self, hours: int = 24) -> List[Item]:
         """
         获取最近 N 小时的文章
         
@@ -270,28 +383,22 @@ class RSSHunter:
         Returns:
             最近的文章列表
         """
-        cutoff_time = datetime.now() - timedelta(hours=hours)
+        cutoff_time = time.time() - hours * 3600
         all_articles = self.fetch_all_sources()
         
-        recent = []
-        for source_articles in all_articles.values():
-            for article in source_articles:
-                try:
-                    pub_time = datetime.fromisoformat(article['published_at'])
-                    if pub_time > cutoff_time:
-                        recent.append(article)
-                except:
-                    recent.append(article)  # 如果无法解析时间，默认包含
+        recent = [
+            article
+            for source_articles in all_articles.values()
+            for article in source_articles
+            if article.published > cutoff_time
+        ]
         
         # 按发布时间排序
-        recent.sort(
-            key=lambda x: x.get('published_at', ''),
-            reverse=True
-        )
+        recent.sort(key=lambda x: x.published, reverse=True)
         
         return recent
     
-    def analyze_trends(self, articles: List[Dict]) -> Dict:
+    def analyze_trends(self, articles: List[Item]) -> Dict:
         """
         分析趋势
         
@@ -310,10 +417,10 @@ class RSSHunter:
         
         # 统计来源
         for article in articles:
-            source = article.get('source', 'Unknown')
+            source = article.source or 'Unknown'
             trends['sources'][source] = trends['sources'].get(source, 0) + 1
             
-            category = article.get('source_key', 'other')
+            category = article.group or 'other'
             trends['categories'][category] = trends['categories'].get(category, 0) + 1
         
         return trends
@@ -387,9 +494,9 @@ def main():
     # 显示样本
     for source_key, articles in all_articles.items():
         if articles:
-            print(f"\n📰 {RSSHunter.RSS_SOURCES[source_key]['name']} (前3条):")
+            print(f"\n📰 {RSSHunter.sources()[source_key]['name']} (前3条):")
             for article in articles[:3]:
-                print(f"  - {article['title'][:60]}...")
+                print(f"  - {article.title[:60]}...")
     
     # 获取最近24小时的文章
     print("\n\n⏰ 最近24小时的文章:")
@@ -13,18 +13,29 @@ import subprocess
 from pathlib import Path
 from datetime import datetime
 
-# 导入监控模块
+# 导入公共模块（监控模块按运行模式在用到时才导入）
 try:
-    import pain_radar_v2
-    import opportunity_hunter
+    import runtime
+    import cycle
+    import llm_client
+    import daily_summary
+    import report_renderer
+    import outbox
+    import store
+    import coordination
+    import metrics
+    import profiling
+    import cassette
+    import checkpoint
 except ImportError:
     print("❌ 无法导入监控模块，请确保所有文件在同一目录")
     sys.exit(1)
 
 class MarketMonitor:
-    def __init__(self):
+    def __init__(self, workers: int = 0):
         self.start_time = datetime.now()
         self.results = {}
+        self.workers = workers  # >0 时启用多进程模式，值为解析进程数
     
     def print_banner(self):
         """打印欢迎横幅"""
@@ -46,24 +57,35 @@ class MarketMonitor:
         print("\n" + "="*60)
         print("📡 启动痛点雷达 (Pain Radar)")
         print("="*60)
-        try:
-            await pain_radar_v2.main()
-            self.results['pain_radar'] = 'success'
-        except Exception as e:
-            print(f"❌ 痛点雷达失败: {e}")
-            self.results['pain_radar'] = 'failed'
+        self.results.update(await self.run_cycle(pain=True, opportunity=False))
     
-    def run_opportunity_hunter(self):
+    async def run_opportunity_hunter(self):
         """运行机会猎手"""
         print("\n" + "="*60)
         print("🔍 启动机会猎手 (Opportunity Hunter)")
         print("="*60)
+        self.results.update(await self.run_cycle(pain=False, opportunity=True))
+    
+    async def run_cycle(self, pain: bool, opportunity: bool):
+        """单进程时所有数据源共用一个事件循环，多进程时交给 workers 进程池"""
+        start = datetime.now()
+        # 上一轮中途退出时从断点继续
+        checkpoint.begin()
         try:
-            opportunity_hunter.main()
-            self.results['opportunity_hunter'] = 'success'
-        except Exception as e:
-            print(f"❌ 机会猎手失败: {e}")
-            self.results['opportunity_hunter'] = 'failed'
+            if self.workers > 0:
+                import workers
+                results = await workers.run_cycle(self.workers, pain=pain, opportunity=opportunity)
+            else:
+                results = await cycle.run_cycle(pain=pain, opportunity=opportunity)
+        except Exception:
+            failed = {name: 'failed' for name, on in (('pain_radar', pain), ('opportunity_hunter', opportunity)) if on}
+            metrics.observe_cycle((datetime.now() - start).total_seconds(), failed)
+            # 进程还在，不算中断: 下一轮重新抓取，只带入未交付的条目
+            checkpoint.finish(failed)
+            raise
+        metrics.observe_cycle((datetime.now() - start).total_seconds(), results)
+        checkpoint.finish(results)
+        return results
     
     def print_summary(self):
         """打印总结"""
@@ -74,20 +96,39 @@ class MarketMonitor:
         print("="*60)
         print(f"⏱️  耗时: {elapsed:.1f} 秒")
         print(f"📈 结果: {self.results}")
+        
+        cache_stats = llm_client.cache_stats()
+        if cache_stats:
+            print(f"⚡ LLM 缓存: 命中 {cache_stats['hits']} / 未命中 {cache_stats['misses']} "
+                  f"(命中率 {cache_stats['hit_rate']:.0%}, 节省 {cache_stats['latency_saved']:.1f} 秒)")
+        
+        store_stats = store.stats()
+        if store_stats:
+            print(f"🗄️ 向量库写入: 新增 {store_stats['inserted']} / 重复 {store_stats['skipped']}, "
+                  f"{store_stats['batches']} 批 (平均 {store_stats['avg_batch']} 条/批)")
+        
+        push_stats = outbox.stats()
+        if push_stats:
+            print(f"📨 推送: 成功 {push_stats['sent']} / 失败 {push_stats['failures']} / 放弃 {push_stats['dead']}, "
+                  f"待发送 {push_stats['pending']}, 投递延迟 p50 {push_stats['latency_p50']:.1f} 秒")
         print("="*60)
     
+    def finish_delivery(self, timeout: float = 60):
+        """单次运行退出前等待报告写盘，并把发件箱中的推送发出去"""
+        report_renderer.wait_pending(timeout)
+        if not outbox.flush(timeout):
+            print("⚠️ 推送未在时限内完成，剩余消息将在下次运行时发送")
+    
     async def run_all(self):
         """运行所有模块"""
         self.print_banner()
         
+        self.start_time = datetime.now()
         print(f"⏰ 启动时间: {self.start_time.strftime('%Y-%m-%d %H:%M:%S')}")
         print("🚀 开始监控循环...\n")
         
-        # 并行运行
-        await asyncio.gather(
-            self.run_pain_radar(),
-            asyncio.to_thread(self.run_opportunity_hunter)
-        )
+        # 所有数据源在同一个事件循环里并发运行，HN 等共享数据只抓一次
+        self.results = await self.run_cycle(pain=True, opportunity=True)
         
         self.print_summary()
 
@@ -101,6 +142,15 @@ def main():
   python run_monitor.py --pain         # 仅运行痛点雷达
   python run_monitor.py --opportunity  # 仅运行机会猎手
   python run_monitor.py --daemon       # 后台运行
+  python run_monitor.py --daemon --incremental  # 后台运行，每轮增量更新今日摘要
+  python run_monitor.py --all --workers 4       # 多进程模式，4 个解析进程
+  python run_monitor.py --daemon --coordinate   # 多实例部署，按共享卷上的租约分片抓取
+  python run_monitor.py --daemon --metrics-port 9100  # 指标与健康检查改用 9100 端口
+  python run_monitor.py --all --profile         # 剖析本轮: cProfile + 内存分配 + 阶段耗时，写入 logs/
+  python run_monitor.py --daemon --profile sample  # 低开销采样剖析，可在生产环境常开
+  python run_monitor.py --all --record          # 把本轮所有出站请求录进 logs/cassette-*.jsonl.gz
+  python run_monitor.py --all --replay logs/cassette-20250101-120000.jsonl.gz --replay-speed 10 --profile
+                                                # 离线回放录到的一轮 (快 10 倍)，不联网、不推送
         """
     )
     
@@ -109,29 +159,71 @@ def main():
     parser.add_argument('--opportunity', action='store_true', help='仅运行机会猎手')
     parser.add_argument('--daemon', action='store_true', help='后台守护进程')
     parser.add_argument('--interval', type=int, default=3600, help='循环间隔(秒)')
+    parser.add_argument('--incremental', action='store_true', help='增量分析，合并进今日摘要')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('MONITOR_WORKERS', 0)),
+                        help='多进程模式的解析进程数 (0 为单进程)')
+    parser.add_argument('--coordinate', action='store_true', help='多实例协调，数据源在存活实例间分片')
+    parser.add_argument('--metrics-port', type=int, default=metrics.METRICS_PORT,
+                        help='守护进程模式下 /metrics 与 /healthz 的端口')
+    parser.add_argument('--profile', nargs='?', const='full', default=profiling.PROFILE_MODE or None,
+                        choices=profiling.MODES, help='每轮写剖析文件到 logs/ (full 为默认，sample 为低开销采样)')
+    tape = parser.add_mutually_exclusive_group()
+    tape.add_argument('--record', nargs='?', const=cassette.CASSETTE_PATH, default=None, metavar='PATH',
+                      help='录制每轮的出站请求 (路径中的 {ts} 替换为时间)')
+    tape.add_argument('--replay', default=None, metavar='PATH', help='回放录制的卷带，代替真实数据源')
+    parser.add_argument('--replay-speed', type=float, default=cassette.REPLAY_SPEED,
+                        help='回放速度倍数 (0 为不等待)')
     
     args = parser.parse_args()
     
-    monitor = MarketMonitor()
+    if args.incremental:
+        daily_summary.INCREMENTAL_ENABLED = True
+    
+    if args.coordinate:
+        coordination.COORDINATION_ENABLED = True
+    
+    runtime.configure_proxy()
+    profiling.configure(args.profile)
+    tape_mode = 'record' if args.record else 'replay' if args.replay else cassette.CASSETTE_MODE
+    cassette.configure(tape_mode, args.record or args.replay, args.replay_speed)
+    if tape_mode == 'replay':
+        # 回放的是已经推送过的内容，不再推送
+        outbox.PUSHPLUS_TOKEN = ''
+    # 认领周期与循环间隔一致: 每个数据源在每个间隔内只在集群里跑一次
+    coordination.get_coordinator(interval=args.interval)
+    monitor = MarketMonitor(workers=args.workers)
     
     # 如果没有指定参数，默认运行所有
     if not any([args.all, args.pain, args.opportunity, args.daemon]):
         args.all = True
     
     try:
+        # 单次运行的剖析包含报告渲染与推送
         if args.all:
-            asyncio.run(monitor.run_all())
+            with profiling.profile_cycle():
+                asyncio.run(monitor.run_all())
+                monitor.finish_delivery()
         elif args.pain:
-            asyncio.run(monitor.run_pain_radar())
+            with profiling.profile_cycle():
+                asyncio.run(monitor.run_pain_radar())
+                monitor.finish_delivery()
         elif args.opportunity:
-            monitor.run_opportunity_hunter()
+            with profiling.profile_cycle():
+                asyncio.run(monitor.run_opportunity_hunter())
+                monitor.finish_delivery()
         elif args.daemon:
             print("🌙 进入守护进程模式...")
             print(f"⏰ 循环间隔: {args.interval} 秒")
+            # 超过两个间隔加一轮时限仍没有成功完成的循环即判定不健康
+            metrics.start_server(args.metrics_port, max_age=2 * args.interval + cycle.CYCLE_DEADLINE)
+            # 发件箱常驻，上次遗留的推送也会继续发送
+            outbox.get_outbox()
             import time
             while True:
                 try:
-                    asyncio.run(monitor.run_all())
+                    # 后台渲染和推送的区间会落在下一轮的剖析文件里
+                    with profiling.profile_cycle():
+                        asyncio.run(monitor.run_all())
                     print(f"\n⏰ 下次运行时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
                     time.sleep(args.interval)
                 except KeyboardInterrupt:
@@ -0,0 +1,74 @@
+"""
+运行时上下文 - 代理设置与 Gemini 客户端的惰性工厂 (Chroma 由 store 模块统一管理)
+导入本模块没有任何副作用: 不改环境变量、不建连接、不导入重量级依赖，
+各客户端在第一次使用时创建，之后进程内复用
+"""
+
+import os
+import logging
+import threading
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# ==================== 配置 ====================
+
+GEMINI_KEY = os.getenv('GEMINI_API_KEY', '填入自己的API-key')
+PROXY_PORT = int(os.getenv('PROXY_PORT', 19828))  # 梯子端口，如果不需要代理设为0
+
+_lock = threading.RLock()
+_proxy_url: Optional[str] = None
+_proxy_configured = False
+_gemini_clients: Dict[str, object] = {}
+
+
+def configure_proxy(port: int = PROXY_PORT) -> Optional[str]:
+    """
+    为整个进程设置 HTTP 代理环境变量，只在第一次调用时生效
+    
+    Args:
+        port: 本地代理端口，0 表示直连
+    
+    Returns:
+        代理地址，直连时为 None
+    """
+    global _proxy_url, _proxy_configured
+    with _lock:
+        if _proxy_configured:
+            return _proxy_url
+        _proxy_configured = True
+        if port > 0:
+            _proxy_url = f'http://127.0.0.1:{port}'
+            for var in ('http_proxy', 'https_proxy', 'HTTP_PROXY', 'HTTPS_PROXY'):
+                os.environ[var] = _proxy_url
+            print(f"📡 代理已启用: {_proxy_url}")
+        else:
+            print("📡 代理已禁用（直连模式）")
+        return _proxy_url
+
+
+def proxy_url() -> Optional[str]:
+    """当前生效的代理地址"""
+    return _proxy_url
+
+
+def get_gemini_client(api_key: str = GEMINI_KEY):
+    """按 API key 复用的 Gemini 客户端 (首次调用时才导入 google-genai)"""
+    with _lock:
+        client = _gemini_clients.get(api_key)
+        if client is None:
+            import llm_client
+            
+            configure_proxy()
+            client = llm_client.create_client(api_key)
+            _gemini_clients[api_key] = client
+        return client
+
+
+def reset() -> None:
+    """丢弃已创建的客户端，下次使用时重新创建 (测试和基准用)"""
+    global _proxy_configured, _proxy_url
+    with _lock:
+        _gemini_clients.clear()
+        _proxy_configured = False
+        _proxy_url = None
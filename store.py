@@ -0,0 +1,293 @@
+"""
+向量库服务 - 进程内唯一的 Chroma 客户端
+所有写操作经由单个写线程排队执行 (同批次的写合并成一次调用)，读操作直接并发执行，
+避免多个模块同时写 my_market_brain 时出现 "database is locked"
+"""
+
+import os
+import time
+import queue
+import atexit
+import asyncio
+import logging
+import threading
+from pathlib import Path
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import metrics
+import profiling
+
+logger = logging.getLogger(__name__)
+
+# ==================== 配置 ====================
+
+DATA_DIR = Path('./my_market_brain')
+# 写线程每批最多合并的写操作数
+BATCH_SIZE = int(os.getenv('STORE_BATCH_SIZE', 256))
+# 收到第一个写操作后再等待多久凑批 (秒)，0 表示只合并已在排队的写操作
+BATCH_WINDOW = float(os.getenv('STORE_BATCH_WINDOW', 0))
+
+
+@dataclass
+class WriteOp:
+    """排队中的写操作"""
+    collection: str
+    kind: str                   # add_if_absent / upsert / update
+    ids: List[str]
+    documents: Optional[List[str]] = None
+    metadatas: Optional[List[Dict]] = None
+    embeddings: Optional[List[List[float]]] = None   # 已在别处算好的向量，None 时由 Chroma 计算
+    future: Future = field(default_factory=Future)
+
+
+class CollectionHandle:
+    """集合句柄: 读直通 Chroma，写交给写线程"""
+    
+    def __init__(self, store: 'Store', name: str, collection):
+        self._store = store
+        self.name = name
+        self.raw = collection
+    
+    # ---------- 读 ----------
+    
+    def get(self, **kwargs):
+        return self.raw.get(**kwargs)
+    
+    def query(self, **kwargs):
+        return self.raw.query(**kwargs)
+    
+    def count(self) -> int:
+        return self.raw.count()
+    
+    # ---------- 写 ----------
+    
+    def submit_add_if_absent(self, doc_id: str, document: str, metadata: Dict,
+                             embedding: Optional[List[float]] = None) -> Future:
+        """id 不存在时写入，Future 结果为是否写入"""
+        embeddings = [list(embedding)] if embedding is not None else None
+        return self._store.submit(WriteOp(self.name, 'add_if_absent', [doc_id], [document], [metadata], embeddings))
+    
+    def add_if_absent(self, doc_id: str, document: str, metadata: Dict) -> bool:
+        """id 不存在时写入 (阻塞等待写线程)，返回是否写入"""
+        return self.submit_add_if_absent(doc_id, document, metadata).result()
+    
+    async def add_if_absent_async(self, doc_id: str, document: str, metadata: Dict) -> bool:
+        return await asyncio.wrap_future(self.submit_add_if_absent(doc_id, document, metadata))
+    
+    def upsert(self, ids: List[str], documents: List[str], metadatas: List[Dict]) -> None:
+        self._store.submit(WriteOp(self.name, 'upsert', list(ids), list(documents), list(metadatas))).result()
+    
+    def update(self, ids: List[str], metadatas: List[Dict]) -> None:
+        self._store.submit(WriteOp(self.name, 'update', list(ids), metadatas=list(metadatas))).result()
+
+
+class Store:
+    """进程内共享的向量库服务"""
+    
+    def __init__(self, path: Path = DATA_DIR, batch_size: int = BATCH_SIZE,
+                 batch_window: float = BATCH_WINDOW):
+        import chromadb
+        
+        Path(path).mkdir(parents=True, exist_ok=True)
+        self.client = chromadb.PersistentClient(path=str(path))
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        
+        self._handles: Dict[str, CollectionHandle] = {}
+        self._handles_lock = threading.Lock()
+        self._queue: 'queue.Queue[Optional[WriteOp]]' = queue.Queue()
+        self._stats = {'ops': 0, 'batches': 0, 'inserted': 0, 'skipped': 0, 'write_seconds': 0.0}
+        self._writer = threading.Thread(target=self._run, name='store-writer', daemon=True)
+        self._writer.start()
+    
+    def collection(self, name: str) -> CollectionHandle:
+        """获取集合句柄 (不存在时创建)"""
+        with self._handles_lock:
+            handle = self._handles.get(name)
+            if handle is None:
+                handle = CollectionHandle(self, name, self.client.get_or_create_collection(name=name))
+                self._handles[name] = handle
+            return handle
+    
+    def submit(self, op: WriteOp) -> Future:
+        if threading.current_thread() is self._writer:
+            raise RuntimeError("不能在写线程内等待写操作")
+        self._queue.put(op)
+        return op.future
+    
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """等待已排队的写操作全部完成"""
+        barrier = WriteOp('', 'barrier', [])
+        self._queue.put(barrier)
+        barrier.future.result(timeout)
+    
+    def close(self) -> None:
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout=30)
+    
+    def stats(self) -> Dict:
+        stats = dict(self._stats)
+        stats['avg_batch'] = round(stats['ops'] / stats['batches'], 1) if stats['batches'] else 0.0
+        return stats
+    
+    # ---------- 写线程 ----------
+    
+    def _run(self) -> None:
+        while True:
+            op = self._queue.get()
+            if op is None:
+                return
+            batch = [op]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.batch_size:
+                try:
+                    remaining = deadline - time.monotonic()
+                    nxt = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    self._apply(batch)
+                    return
+                batch.append(nxt)
+            self._apply(batch)
+    
+    def _apply(self, batch: List[WriteOp]) -> None:
+        """按 (集合, 操作类型) 分组，每组一次 Chroma 调用"""
+        start = time.perf_counter()
+        for (name, kind), ops in _group_ops(batch):
+            group_start = time.perf_counter()
+            try:
+                collection = self.collection(name).raw
+                if kind == 'add_if_absent':
+                    self._apply_add_if_absent(collection, ops)
+                elif kind == 'upsert':
+                    rows = _last_write_wins(ops, with_documents=True)
+                    with profiling.span('store', collection=name, ops=len(rows)):
+                        collection.upsert(
+                            ids=list(rows),
+                            documents=[doc for doc, _ in rows.values()],
+                            metadatas=[meta for _, meta in rows.values()],
+                        )
+                    for op in ops:
+                        op.future.set_result(None)
+                elif kind == 'update':
+                    rows = _last_write_wins(ops, with_documents=False)
+                    with profiling.span('store', collection=name, ops=len(rows)):
+                        collection.update(ids=list(rows), metadatas=[meta for _, meta in rows.values()])
+                    for op in ops:
+                        op.future.set_result(None)
+            except Exception as e:
+                logger.error(f"写入 {name} 失败: {str(e)}")
+                for op in ops:
+                    if not op.future.done():
+                        op.future.set_exception(e)
+            metrics.observe_store_write(kind, time.perf_counter() - group_start, len(ops))
+        
+        self._stats['ops'] += len(batch)
+        self._stats['batches'] += 1
+        self._stats['write_seconds'] += time.perf_counter() - start
+        # 屏障放在最后完成，保证它之前的写都已落盘
+        for op in batch:
+            if op.kind == 'barrier':
+                op.future.set_result(None)
+    
+    def _apply_add_if_absent(self, collection, ops: List[WriteOp]) -> None:
+        ids = list(dict.fromkeys(op.ids[0] for op in ops))
+        with profiling.span('dedup', collection=collection.name, ids=len(ids)):
+            existing = set(collection.get(ids=ids, include=[])['ids'])
+        
+        fresh: Dict[str, WriteOp] = {}
+        for op in ops:
+            doc_id = op.ids[0]
+            if doc_id in existing or doc_id in fresh:
+                continue
+            fresh[doc_id] = op
+        
+        # Chroma 要求同一次调用的向量要么全给要么全不给
+        with_vectors = [op for op in fresh.values() if op.embeddings]
+        without_vectors = [op for op in fresh.values() if not op.embeddings]
+        with profiling.span('store', collection=collection.name, ops=len(fresh)):
+            if with_vectors:
+                collection.upsert(
+                    ids=[op.ids[0] for op in with_vectors],
+                    documents=[op.documents[0] for op in with_vectors],
+                    metadatas=[op.metadatas[0] for op in with_vectors],
+                    embeddings=[op.embeddings[0] for op in with_vectors],
+                )
+            if without_vectors:
+                collection.upsert(
+                    ids=[op.ids[0] for op in without_vectors],
+                    documents=[op.documents[0] for op in without_vectors],
+                    metadatas=[op.metadatas[0] for op in without_vectors],
+                )
+        for op in ops:
+            inserted = fresh.get(op.ids[0]) is op
+            op.future.set_result(inserted)
+        self._stats['inserted'] += len(fresh)
+        self._stats['skipped'] += len(ops) - len(fresh)
+
+
+def _group_ops(batch: List[WriteOp]) -> List[Tuple[Tuple[str, str], List[WriteOp]]]:
+    """
+    把一批写操作按 (集合, 操作类型) 分组，返回按执行顺序排列的分组
+    同一 id 先后被不同类型的操作写入时 (如 update → upsert → update)，从冲突处另起一段，
+    段与段按入队顺序执行，段内各组的 id 互不重叠，组间顺序不影响结果
+    """
+    groups: List[Tuple[Tuple[str, str], List[WriteOp]]] = []
+    current: Dict[Tuple[str, str], List[WriteOp]] = {}
+    kinds: Dict[Tuple[str, str], str] = {}      # (集合, id) → 本段中写它的操作类型
+    for op in batch:
+        if op.kind == 'barrier':
+            continue
+        keys = [(op.collection, doc_id) for doc_id in op.ids]
+        if any(kinds.get(key, op.kind) != op.kind for key in keys):
+            groups.extend(current.items())
+            current, kinds = {}, {}
+        current.setdefault((op.collection, op.kind), []).append(op)
+        for key in keys:
+            kinds[key] = op.kind
+    groups.extend(current.items())
+    return groups
+
+
+def _last_write_wins(ops: List[WriteOp], with_documents: bool) -> Dict[str, tuple]:
+    """同一批内重复的 id 只保留最后一次写 (Chroma 不接受重复 id)"""
+    rows: Dict[str, tuple] = {}
+    for op in ops:
+        documents = op.documents if with_documents else [None] * len(op.ids)
+        for doc_id, document, metadata in zip(op.ids, documents, op.metadatas):
+            rows.pop(doc_id, None)
+            rows[doc_id] = (document, metadata)
+    return rows
+
+
+_store: Optional[Store] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> Store:
+    """进程内唯一的向量库服务，首次调用时创建"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = Store()
+            atexit.register(_store.close)
+        return _store
+
+
+def get_collection(name: str) -> CollectionHandle:
+    return get_store().collection(name)
+
+
+def embedding_function():
+    """集合使用的向量函数 (Chroma 默认模型)，供其他进程预先计算向量"""
+    from chromadb.utils import embedding_functions
+    return embedding_functions.DefaultEmbeddingFunction()
+
+
+def stats() -> Optional[Dict]:
+    """写入统计，本进程未使用向量库时返回 None"""
+    return _store.stats() if _store else None
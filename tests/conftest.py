@@ -0,0 +1,10 @@
+"""
+单元测试 - 只覆盖不依赖网络和 Gemini 的纯逻辑
+在仓库根目录运行: python -m pytest -q tests
+"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
@@ -0,0 +1,51 @@
+"""map-reduce 分析: 同步与异步版本按同一计划调用 LLM"""
+
+import asyncio
+
+import analysis_pipeline
+from analysis_pipeline import analyze, analyze_async
+
+TEMPLATE = "分析以下数据:\n{raw_data}"
+
+
+def _fake_llm(monkeypatch):
+    calls = []
+    
+    def generate_text(client, prompt, *, template_version, cache_input):
+        calls.append((template_version, cache_input))
+        if template_version.endswith('-map'):
+            return f"[候选] | {len(cache_input.splitlines())} | test | {cache_input[:10]}"
+        return f"报告 ({template_version})"
+    
+    async def generate_text_async(client, prompt, *, template_version, cache_input, on_text=None):
+        return generate_text(client, prompt, template_version=template_version, cache_input=cache_input)
+    
+    monkeypatch.setattr(analysis_pipeline.llm_client, 'generate_text', generate_text)
+    monkeypatch.setattr(analysis_pipeline.llm_client, 'generate_text_async', generate_text_async)
+    return calls
+
+
+def test_small_input_is_a_single_call(monkeypatch):
+    calls = _fake_llm(monkeypatch)
+    assert analyze(None, "a\nb", TEMPLATE, 'v1') == "报告 (v1)"
+    assert calls == [('v1', "a\nb")]
+
+
+def test_sync_and_async_make_the_same_calls(monkeypatch):
+    raw = "\n".join(f"条目 {i} " + 'x' * 80 for i in range(40))
+    calls = _fake_llm(monkeypatch)
+    sync_result = analyze(None, raw, TEMPLATE, 'v1', budget=200, concurrency=3)
+    sync_calls = sorted(calls)
+    calls.clear()
+    async_result = asyncio.run(analyze_async(None, raw, TEMPLATE, 'v1', budget=200, concurrency=3))
+    
+    assert sync_result == async_result == "报告 (v1-reduce)"
+    assert sorted(calls) == sync_calls
+    versions = [version for version, _ in sync_calls]
+    assert versions.count('v1-reduce') == 1 and versions.count('v1-map') > 1
+
+
+def test_all_chunks_failing_returns_none(monkeypatch):
+    monkeypatch.setattr(analysis_pipeline.llm_client, 'generate_text', lambda *a, **k: None)
+    raw = "\n".join('y' * 100 for _ in range(20))
+    assert analyze(None, raw, TEMPLATE, 'v1', budget=100) is None
@@ -0,0 +1,142 @@
+"""循环检查点: 中断续跑、未交付条目带入下一轮"""
+
+import os
+import sqlite3
+
+import models
+from checkpoint import CycleCheckpoint
+
+
+def _status(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("SELECT id, status, resumes, carried FROM cycles ORDER BY id").fetchall()
+
+
+def _pains(*texts):
+    return [models.pain('Reddit', 'r/test', text, ['Cursor'], ['slow']) for text in texts]
+
+
+def test_resume_interrupted_cycle(tmp_path):
+    db_path = tmp_path / 'checkpoint.db'
+    first = CycleCheckpoint(db_path)
+    for item in _pains('a', 'b'):
+        first.record_item('pain', item)
+    first.mark_producer('pain', 'Reddit', 2)
+    first.mark_stage('pain', 'fetched')
+    # 进程在这里退出 (没有 finish)，下一个进程续跑同一轮
+    second = CycleCheckpoint(db_path)
+    assert second.resumed and second.cycle_id == first.cycle_id
+    assert [item.content for item in second.items('pain')] == ['a', 'b']
+    assert second.producer_count('pain', 'Reddit') == 2
+    assert second.stage('pain', 'fetched') == ''
+
+
+def test_running_cycle_of_live_process_is_not_resumed(tmp_path):
+    db_path = tmp_path / 'checkpoint.db'
+    first = CycleCheckpoint(db_path)
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("UPDATE cycles SET pid = ? WHERE id = ?", (os.getppid(), first.cycle_id))
+    second = CycleCheckpoint(db_path)
+    assert not second.resumed and second.cycle_id != first.cycle_id
+    assert dict((row[0], row[1]) for row in _status(db_path))[first.cycle_id] == 'running'
+
+
+def test_resume_limit(tmp_path):
+    db_path = tmp_path / 'checkpoint.db'
+    first = CycleCheckpoint(db_path, max_resumes=1)
+    assert CycleCheckpoint(db_path, max_resumes=1).resumed
+    third = CycleCheckpoint(db_path, max_resumes=1)
+    assert not third.resumed
+    assert _status(db_path)[0][:2] == (first.cycle_id, 'abandoned')
+
+
+def test_completed_cycle_is_done(tmp_path):
+    db_path = tmp_path / 'checkpoint.db'
+    first = CycleCheckpoint(db_path)
+    first.record_item('pain', _pains('a')[0])
+    first.mark_stage('pain', 'delivered')
+    first.finish({'pain_radar': 'success'})
+    assert first.done
+    second = CycleCheckpoint(db_path)
+    assert not second.resumed and second.items('pain') == []
+    assert _status(db_path)[0][1] == 'done'
+
+
+def test_undelivered_items_are_carried_into_next_cycle(tmp_path):
+    db_path = tmp_path / 'checkpoint.db'
+    first = CycleCheckpoint(db_path)
+    for item in _pains('a', 'b'):
+        first.record_item('pain', item)
+    first.record_item('opportunity', models.opportunity('GitHub', 'repo', 'desc', 'https://x'))
+    first.mark_stage('pain', 'fetched')
+    first.mark_stage('opportunity', 'fetched')
+    first.mark_stage('opportunity', 'delivered')
+    # 分析失败: 所有模块 "成功" 但痛点报告未交付
+    first.finish({'pain_radar': 'success', 'opportunity_hunter': 'success'})
+    assert not first.done
+    assert _status(db_path)[0][1] == 'pending'
+    
+    second = CycleCheckpoint(db_path)
+    assert not second.resumed and second.cycle_id != first.cycle_id
+    # 重新抓取，只带入未交付模块的条目
+    assert second.stage('pain', 'fetched') is None
+    second.record_item('pain', _pains('c')[0])
+    assert [item.content for item in second.items('pain')] == ['a', 'b', 'c']
+    assert second.items('opportunity') == []
+    assert _status(db_path) == [(first.cycle_id, 'carried', 0, 0), (second.cycle_id, 'running', 0, 1)]
+
+
+def test_carry_limit(tmp_path):
+    db_path = tmp_path / 'checkpoint.db'
+    for _ in range(3):
+        cycle = CycleCheckpoint(db_path, max_resumes=2)
+        cycle.record_item('pain', _pains(f'x{cycle.cycle_id}')[0])
+        cycle.finish({'pain_radar': 'timeout'})
+    last = CycleCheckpoint(db_path, max_resumes=2)
+    # 第 3 轮已是连续第 2 次带入，不再继续带入
+    assert last.items('pain') == []
+    assert _status(db_path)[2][1] == 'abandoned'
+
+
+def test_items_are_batched_and_keep_order(tmp_path, monkeypatch):
+    import checkpoint
+    
+    monkeypatch.setattr(checkpoint, 'CHECKPOINT_FLUSH_ITEMS', 1000)
+    monkeypatch.setattr(checkpoint, 'CHECKPOINT_FLUSH_INTERVAL', 3600)
+    db_path = tmp_path / 'checkpoint.db'
+    first = CycleCheckpoint(db_path)
+    for item in _pains('a', 'b', 'a'):
+        first.record_item('pain', item)
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0
+    # 数据源完成时先写入它的条目
+    first.mark_producer('pain', 'Reddit', 2)
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 2
+    first.record_item('pain', _pains('c')[0])
+    assert [item.content for item in first.items('pain')] == ['a', 'b', 'c']
+    
+    second = CycleCheckpoint(db_path)
+    second.record_item('pain', _pains('d')[0])
+    assert [item.content for item in second.items('pain')] == ['a', 'b', 'c', 'd']
+
+
+def test_connection_closed_when_done_or_replaced(tmp_path, monkeypatch):
+    import checkpoint
+    
+    db_path = tmp_path / 'checkpoint.db'
+    done = CycleCheckpoint(db_path)
+    done.finish({'pain_radar': 'success'})
+    assert done.done and done._conn is None
+    # 迟到的交付回调不报错
+    done.mark_stage('pain', 'delivered')
+    
+    monkeypatch.setattr(checkpoint, 'CycleCheckpoint', lambda: CycleCheckpoint(db_path))
+    monkeypatch.setattr(checkpoint, '_active', None)
+    first = checkpoint.begin()
+    first.record_item('pain', _pains('a')[0])
+    checkpoint.finish({'pain_radar': 'failed'})
+    assert first._conn is not None
+    second = checkpoint.begin()
+    assert first._conn is None and second is not first
+    assert [item.content for item in second.items('pain')] == ['a']
@@ -0,0 +1,39 @@
+"""按 token 预算切块"""
+
+from analysis_pipeline import chunk_lines, estimate_tokens, truncate_tokens
+
+
+def test_estimate_tokens():
+    assert estimate_tokens('') == 1
+    assert estimate_tokens('abcd' * 10) == 11
+    assert estimate_tokens('模型太慢') == 5
+    assert estimate_tokens('ab模型') == 3
+
+
+def test_greedy_chunks_keep_order_and_budget():
+    lines = [f"line {i} " + 'x' * 30 for i in range(20)]
+    chunks = chunk_lines(lines, 40)
+    assert [line for chunk in chunks for line in chunk] == lines
+    assert len(chunks) > 1
+    assert all(sum(estimate_tokens(line) for line in chunk) <= 40 for chunk in chunks)
+
+
+def test_long_line_truncated_to_budget():
+    lines = ['short', '痛点' * 100, 'a' * 1000, 'tail']
+    chunks = chunk_lines(lines, 50)
+    flat = [line for chunk in chunks for line in chunk]
+    assert flat[0] == 'short' and flat[-1] == 'tail'
+    assert all(estimate_tokens(line) <= 50 for line in flat)
+    # 截断后的行是原行的前缀，且是不超过预算的最长前缀
+    assert ('痛点' * 100).startswith(flat[1]) and estimate_tokens(flat[1]) == 50
+    assert flat[2] == 'a' * 199
+
+
+def test_truncate_tokens():
+    assert truncate_tokens('abc', 10) == 'abc'
+    assert truncate_tokens('模型' * 10, 3) == '模型'
+    assert truncate_tokens('', 1) == ''
+
+
+def test_empty():
+    assert chunk_lines([], 100) == []
@@ -0,0 +1,153 @@
+"""多实例协调: 一致性哈希分配、单元认领与完成标记"""
+
+import sqlite3
+import asyncio
+
+import pytest
+
+import cycle
+from coordination import Coordinator, rendezvous_owner
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return tmp_path / 'coordination.db'
+
+
+def _status(db_path, unit):
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute("SELECT interval_start, member_id, status FROM claims WHERE unit = ?", (unit,)).fetchall()
+    return rows
+
+
+def test_rendezvous_owner_is_stable_and_minimal():
+    units = [f'rss:{i}' for i in range(200)]
+    before = {unit: rendezvous_owner(unit, ['a', 'b', 'c']) for unit in units}
+    assert set(before.values()) == {'a', 'b', 'c'}
+    # 成员顺序不影响结果
+    assert all(rendezvous_owner(unit, ['c', 'a', 'b']) == owner for unit, owner in before.items())
+    # 去掉一个成员时只有它的单元移动
+    after = {unit: rendezvous_owner(unit, ['a', 'c']) for unit in units}
+    moved = [unit for unit in units if before[unit] != after[unit]]
+    assert moved and all(before[unit] == 'b' for unit in moved)
+    assert rendezvous_owner('hn', []) is None
+
+
+def test_claim_once_per_interval(db_path):
+    first = Coordinator(db_path, member_id='a', interval=3600)
+    second = Coordinator(db_path, member_id='b', interval=3600)
+    first.join()
+    second.join()
+    try:
+        assert first.claim('hn')
+        assert not second.claim('hn')      # 认领者存活
+        assert first.claim('hn')           # 自己重启后可继续未完成的单元
+        first.complete(['hn'])
+        assert not first.claim('hn')       # 本周期已完成
+        assert _status(db_path, 'hn')[0][2] == 'done'
+    finally:
+        first.leave()
+        second.leave()
+
+
+def test_claim_taken_over_from_dead_member(db_path):
+    dead = Coordinator(db_path, member_id='dead', interval=3600)
+    alive = Coordinator(db_path, member_id='alive', interval=3600, member_ttl=60)
+    assert dead.claim('trends')          # 从未心跳: 视为失联
+    assert alive.claim('trends')
+    assert _status(db_path, 'trends')[0][1] == 'alive'
+
+
+def test_complete_uses_claim_interval(db_path, monkeypatch):
+    coordinator = Coordinator(db_path, member_id='a', interval=3600)
+    assert coordinator.claim('hn')
+    claimed = coordinator.interval_start()
+    # 完成时已进入下一个周期
+    monkeypatch.setattr(coordinator, 'interval_start', lambda now=None: claimed + 3600)
+    coordinator.complete(['hn', 'never-claimed'])
+    assert _status(db_path, 'hn') == [(claimed, 'a', 'done')]
+    assert _status(db_path, 'never-claimed') == []
+
+
+def test_acquire_only_owned_units(db_path):
+    coordinator = Coordinator(db_path, member_id='a', interval=3600)
+    members = ['a', 'b']
+    for unit in (f'github:{i}' for i in range(20)):
+        assert coordinator.acquire(unit, members) == (rendezvous_owner(unit, members) == 'a')
+
+
+def test_cycle_completes_only_succeeded_units(db_path):
+    pytest.importorskip('aiohttp')
+    coordinator = Coordinator(db_path, member_id='a', interval=3600)
+    
+    async def run():
+        async with cycle.CycleContext(coordinator=coordinator) as ctx:
+            async def ok():
+                # gather 出的子任务里认领的单元也归在该数据源名下
+                await asyncio.gather(ctx.acquire('rss:a'), ctx.acquire('rss:b'))
+                return 2
+            
+            async def broken():
+                await ctx.acquire('github:x')
+                raise RuntimeError('boom')
+            
+            async def swallowed():
+                await ctx.acquire('twitter')
+                ctx.fail_unit('twitter')
+                return 0
+            
+            counts = await ctx.run_producers({'ok': ok(), 'broken': broken(), 'swallowed': swallowed()})
+            assert counts == {'ok': 2, 'broken': 0, 'swallowed': 0}
+    
+    asyncio.run(run())
+    assert _status(db_path, 'rss:a')[0][2] == 'done'
+    assert _status(db_path, 'rss:b')[0][2] == 'done'
+    assert _status(db_path, 'github:x')[0][2] == 'running'
+    assert _status(db_path, 'twitter')[0][2] == 'running'
+
+
+def test_only_lease_holder_analyzes_handed_off_items(db_path, monkeypatch):
+    import models
+    import coordination
+    
+    leader = Coordinator(db_path, member_id='leader', interval=3600)
+    follower = Coordinator(db_path, member_id='follower', interval=3600)
+    shared = models.pain('Reddit', 'u', 'cursor crash', ('Cursor',))
+    own = models.pain('HackerNews', 'v', 'claude rate limit', ('Claude',))
+    other = models.pain('Twitter', 'w', 'sora flicker', ('Sora',))
+    
+    monkeypatch.setattr(coordination, 'get_coordinator', lambda: leader)
+    assert coordination.exchange_items('pain', [own]) == []
+    monkeypatch.setattr(coordination, 'get_coordinator', lambda: follower)
+    assert coordination.exchange_items('pain', [other, shared]) is None
+    
+    monkeypatch.setattr(coordination, 'get_coordinator', lambda: leader)
+    received = coordination.exchange_items('pain', [own, shared])
+    assert [item.id for item in received] == [other.id]
+    assert received[0].content == 'sora flicker'
+    # 交接的条目只会被取走一次
+    assert coordination.exchange_items('pain', []) == []
+    assert leader.take_handoff('opportunity') == []
+
+
+def test_connections_are_closed(db_path, monkeypatch):
+    import coordination
+    
+    opened = []
+    connect = sqlite3.connect
+    
+    def tracking_connect(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        opened.append(conn)
+        return conn
+    
+    monkeypatch.setattr(coordination.sqlite3, 'connect', tracking_connect)
+    coordinator = Coordinator(db_path, member_id='a', interval=3600)
+    coordinator.claim('hn')
+    coordinator.complete(['hn'])
+    coordinator.hold_lease('outbox')
+    coordinator.members()
+    assert opened
+    for conn in opened:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
@@ -0,0 +1,114 @@
+"""快速 feed 解析: Atom / RSS 2.0 解析，RDF 等未知格式回退"""
+
+import calendar
+
+import pytest
+
+pytest.importorskip('lxml')
+
+import fast_feed
+
+ATOM = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <title>LocalLLaMA</title>
+  <entry>
+    <title>Cursor is slow again</title>
+    <link rel="self" href="https://www.reddit.com/self/1" />
+    <link href="https://www.reddit.com/r/LocalLLaMA/comments/1/" />
+    <content type="html">&lt;p&gt;indexing &amp;amp; completion&lt;/p&gt;</content>
+    <updated>2025-06-10T05:00:00+00:00</updated>
+    <published>2025-06-10T04:00:00+00:00</published>
+  </entry>
+  <entry>
+    <title>Second</title>
+    <link rel="alternate" href="https://example.com/2" />
+    <summary>short summary</summary>
+    <content>long content</content>
+    <updated>2025-06-11T04:00:00</updated>
+  </entry>
+</feed>
+"""
+
+RSS2 = """<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0" xmlns:dc="http://purl.org/dc/elements/1.1/"
+     xmlns:content="http://purl.org/rss/1.0/modules/content/">
+  <channel>
+    <title>Y Combinator</title>
+    <item>
+      <title>Launch: agents for ops</title>
+      <link>https://www.ycombinator.com/launches/1</link>
+      <description>&lt;p&gt;We help teams&lt;/p&gt;</description>
+      <pubDate>Tue, 10 Jun 2025 04:00:00 +0000</pubDate>
+    </item>
+    <item>
+      <title>Blog post</title>
+      <link>https://example.com/post</link>
+      <content:encoded>full text</content:encoded>
+      <dc:date>2025-06-10T04:00:00Z</dc:date>
+    </item>
+    <item>
+      <title>No date</title>
+      <link>https://example.com/none</link>
+      <pubDate>not a date</pubDate>
+    </item>
+  </channel>
+</rss>
+"""
+
+RDF = """<?xml version="1.0" encoding="UTF-8"?>
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" xmlns="http://purl.org/rss/1.0/">
+  <channel rdf:about="https://example.com/"><title>Old feed</title></channel>
+  <item rdf:about="https://example.com/1">
+    <title>RSS 1.0 item</title>
+    <link>https://example.com/1</link>
+  </item>
+</rdf:RDF>
+"""
+
+JUNE_10 = calendar.timegm((2025, 6, 10, 4, 0, 0))
+
+
+def test_atom():
+    entries = fast_feed.parse(ATOM)
+    assert [e.title for e in entries] == ['Cursor is slow again', 'Second']
+    first, second = entries
+    # rel 缺省为 alternate，rel="self" 的链接跳过
+    assert first.link == 'https://www.reddit.com/r/LocalLLaMA/comments/1/'
+    assert first.summary == '<p>indexing &amp; completion</p>'
+    assert first.published == JUNE_10
+    # summary 优先于 content，没有 published 时取 updated (无时区按 UTC)
+    assert second.summary == 'short summary'
+    assert second.published == JUNE_10 + 86400
+
+
+def test_rss2():
+    entries = fast_feed.parse(RSS2.encode('utf-8'))
+    assert [e.link for e in entries] == ['https://www.ycombinator.com/launches/1', 'https://example.com/post',
+                                         'https://example.com/none']
+    assert entries[0].summary == '<p>We help teams</p>'
+    assert entries[0].published == JUNE_10
+    # 没有 description 时用 content:encoded，没有 pubDate 时用 dc:date
+    assert entries[1].summary == 'full text'
+    assert entries[1].published == JUNE_10
+    assert entries[2].published is None
+
+
+def test_limit():
+    assert [e.title for e in fast_feed.parse(RSS2, limit=1)] == ['Launch: agents for ops']
+
+
+def test_unknown_formats_fall_back():
+    assert fast_feed.parse(RDF) is None
+    assert fast_feed.parse(RSS2.replace('version="2.0"', 'version="0.91"')) is None
+    assert fast_feed.parse('<rss version="2.0"><channel><item><title>x</title></channel></rss>') is None
+    assert fast_feed.parse('<html><body>not a feed</body></html>') is None
+
+
+def test_empty_known_feed():
+    assert fast_feed.parse('<rss version="2.0"><channel><title>empty</title></channel></rss>') == []
+    assert fast_feed.parse('<feed xmlns="http://www.w3.org/2005/Atom"><title>empty</title></feed>') == []
+
+
+def test_disabled(monkeypatch):
+    monkeypatch.setattr(fast_feed, 'FAST_FEED_ENABLED', False)
+    assert fast_feed.parse(ATOM) is None
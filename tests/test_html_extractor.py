@@ -0,0 +1,84 @@
+"""网页条目提取: 抓取配置解析与各解析后端的一致性"""
+
+import importlib
+
+import pytest
+
+import html_extractor
+from html_extractor import BACKENDS, Scraper
+
+PAGE = """<html><body>
+<main>
+  <article>
+    <h3> Agents that plan </h3>
+    <a href="/papers/2506.00001">paper</a>
+    <p>We study <b>planning</b> agents.</p>
+  </article>
+  <article>
+    <a href="https://arxiv.org/abs/2506.00002">no title, skipped</a>
+  </article>
+  <article>
+    <h3>Small models</h3>
+    <a href="/papers/2506.00003">paper</a>
+  </article>
+  <article><h3>Third</h3></article>
+</main>
+</body></html>"""
+
+RULE = {
+    'item': 'article',
+    'fields': {'title': 'h3', 'link': 'a@href', 'summary': 'p'},
+    'required': ['title'],
+    'base_url': 'https://huggingface.co',
+}
+
+
+def _available(name):
+    try:
+        for module in BACKENDS[name][0]:
+            importlib.import_module(module)
+    except ImportError:
+        return False
+    return True
+
+
+@pytest.fixture(params=list(BACKENDS))
+def backend(request, monkeypatch):
+    if not _available(request.param):
+        pytest.skip(f"{request.param} 未安装")
+    monkeypatch.setattr(html_extractor, 'backend', lambda: request.param)
+    return request.param
+
+
+def test_from_config():
+    rule = Scraper.from_config(RULE)
+    assert rule.fields == (('title', 'h3', None), ('link', 'a', 'href'), ('summary', 'p', None))
+    assert rule.required == ('title',)
+    assert rule.limit == 50 and rule.article_type == 'article'
+    with pytest.raises(ValueError):
+        Scraper.from_config({'item': 'article'})
+    with pytest.raises(ValueError):
+        Scraper.from_config({'fields': {'title': 'h3'}})
+
+
+def test_extract(backend):
+    items = html_extractor.extract(PAGE, Scraper.from_config(RULE))
+    assert [item['title'] for item in items] == ['Agents that plan', 'Small models', 'Third']
+    assert items[0]['link'] == 'https://huggingface.co/papers/2506.00001'
+    assert 'planning' in items[0]['summary']
+    assert 'summary' not in items[1]
+    assert 'link' not in items[2]
+
+
+def test_extract_limit_and_absolute_links(backend):
+    rule = Scraper.from_config(dict(RULE, required=['link'], limit=2))
+    items = html_extractor.extract(PAGE, rule)
+    # limit 按条目节点计，缺少必需字段的再被跳过
+    assert [item['link'] for item in items] == ['https://huggingface.co/papers/2506.00001',
+                                                'https://arxiv.org/abs/2506.00002']
+
+
+def test_builtin_scraper():
+    rule = html_extractor.scraper('huggingface_papers')
+    assert rule is not None and rule.article_type == 'paper'
+    assert html_extractor.scraper('no-such-source') is None
@@ -0,0 +1,15 @@
+"""LLM 缓存键: 输入归一化"""
+
+from llm_cache import make_key, normalize_input
+
+
+def test_normalize_ignores_order_blank_lines_and_whitespace():
+    assert normalize_input("b  line\n\n  a line \n") == "a line\nb line"
+    assert make_key('m', 'v1', "x\ny") == make_key('m', 'v1', "y\n\n x ")
+
+
+def test_repeated_lines_change_the_key():
+    once = "【Reddit】cursor crash\n【HN】claude rate limit"
+    twice = once + "\n【Reddit】cursor crash"
+    assert normalize_input(twice).count('cursor crash') == 2
+    assert make_key('m', 'v1', once) != make_key('m', 'v1', twice)
@@ -0,0 +1,106 @@
+"""流式处理流水线: 顺序、丢弃、展开、背压与同步阶段的并发"""
+
+import time
+import asyncio
+
+import pytest
+
+from pipeline import Pipeline, Stage, _parse_workers
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_single_worker_keeps_order_and_drops_none():
+    async def main():
+        session = []
+        stages = [
+            Stage('parse', lambda batch: batch, expand=True),
+            Stage('filter', lambda n: n if n % 3 else None, inline=True),
+            Stage('session', lambda n: session.append(n) or n, inline=True),
+        ]
+        async with Pipeline(stages) as pipe:
+            first = await pipe.feed(list(range(10)))
+            second = await pipe.feed([10, 11, 12])
+        return first, second, session, pipe.stats()
+    
+    first, second, session, stats = run(main())
+    assert first == [1, 2, 4, 5, 7, 8]
+    assert second == [10, 11]
+    assert session == [1, 2, 4, 5, 7, 8, 10, 11]
+    assert stats['filter']['in'] == 13 and stats['filter']['out'] == 8
+
+
+def test_failed_item_is_dropped_and_counted():
+    def parse(n):
+        if n == 2:
+            raise ValueError('bad')
+        return n
+    
+    async def main():
+        async with Pipeline([Stage('parse', parse)]) as pipe:
+            results = await asyncio.gather(*(pipe.feed(n) for n in range(4)))
+        return results, pipe.stats()
+    
+    results, stats = run(main())
+    assert results == [[0], [1], [], [3]]
+    assert stats['parse']['errors'] == 1
+
+
+def test_backpressure_bounds_queue():
+    async def slow(n):
+        await asyncio.sleep(0.01)
+        return n
+    
+    async def main():
+        async with Pipeline([Stage('fast', lambda n: n, inline=True), Stage('slow', slow)],
+                            queue_size=2) as pipe:
+            results = await asyncio.gather(*(pipe.feed(n) for n in range(20)))
+        return results, pipe.stats()
+    
+    results, stats = run(main())
+    assert sorted(sum(results, [])) == list(range(20))
+    assert stats['slow']['max_depth'] <= 2
+    assert stats['slow']['backpressure'] > 0
+
+
+def test_sync_stage_runs_off_the_loop():
+    def blocking(n):
+        time.sleep(0.2)
+        return n
+    
+    async def main():
+        ticks = 0
+        
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+        
+        task = asyncio.ensure_future(ticker())
+        start = time.perf_counter()
+        async with Pipeline([Stage('parse', blocking, workers=4)]) as pipe:
+            results = await asyncio.gather(*(pipe.feed(n) for n in range(4)))
+        elapsed = time.perf_counter() - start
+        task.cancel()
+        return results, elapsed, ticks
+    
+    results, elapsed, ticks = run(main())
+    assert results == [[0], [1], [2], [3]]
+    # 4 个工作者同时处理，事件循环在此期间没有被阻塞
+    assert elapsed < 0.6
+    assert ticks >= 5
+
+
+def test_feed_requires_context():
+    pipe = Pipeline([Stage('parse', lambda n: n)])
+    with pytest.raises(RuntimeError):
+        run(pipe.feed(1))
+    with pytest.raises(ValueError):
+        Pipeline([])
+
+
+def test_parse_workers():
+    assert _parse_workers('parse=2, store=32,bad=x,=3') == {'parse': 2, 'store': 32}
@@ -0,0 +1,46 @@
+"""痛点打标签: 单次扫描得到产品与痛点词"""
+
+import pytest
+
+pain_radar_v2 = pytest.importorskip('pain_radar_v2')
+tag_item = pain_radar_v2.tag_item
+
+
+def test_mentioned_product_wins():
+    products, keywords = tag_item("Cursor is SLOW and will crash on large repos")
+    assert products == ['Cursor']
+    assert keywords == ['slow', 'crash']
+
+
+def test_products_follow_config_order():
+    products, _ = tag_item("switched from cursor to claude and chatgpt, all buggy")
+    assert products == ['ChatGPT', 'Claude', 'Cursor']
+
+
+def test_keyword_products_when_no_product_mentioned():
+    assert tag_item("hit the rate limit again") == (['Claude'], ['rate limit'])
+    products, keywords = tag_item("so slow today")
+    assert products == ['ChatGPT', 'DeepSeek', 'Cursor']
+    assert keywords == ['slow']
+
+
+def test_keywords_deduplicated_longest_first():
+    products, keywords = tag_item("Error, error... it doesn't work. ERROR")
+    assert keywords == ['error', "doesn't work"]
+    assert products == ['ChatGPT', 'DeepSeek', 'Cursor']
+
+
+def test_extra_products_merge():
+    assert tag_item("constant flicker", extra_products=('Sora',)) == (['Sora'], ['flicker'])
+    products, _ = tag_item("Claude keeps failing", extra_products=('Midjourney',))
+    assert products == ['Claude', 'Midjourney']
+
+
+def test_nothing_matched():
+    assert tag_item("a pleasant day") == ([], [])
+
+
+def test_only_whole_words_match():
+    # 产品名和痛点词出现在更长的词里时不算
+    assert tag_item("a precursor of the sorana project, slowly fixed") == ([], [])
+    assert tag_item("Cursor crashes, the errors pile up") == (['Cursor'], [])
@@ -0,0 +1,635 @@
+"""
+多进程工作模式 - 抓取、解析/向量化、入库分属不同进程，经本地队列连接
+主进程只做调度: 每个任务编号后记在所在进程名下，收到确认才移除；
+进程崩溃时重启它并重发名下未确认的任务，已排队的条目不会丢失 (入库按 id 查重，重发是安全的)
+
+    抓取进程 (1, asyncio) → 解析进程 (N, feedparser/bs4/打标签/向量化) → 入库进程 (1, 唯一的 Chroma 写者)
+"""
+
+import os
+import time
+import queue
+import signal
+import asyncio
+import logging
+import threading
+import multiprocessing
+from collections import Counter
+from multiprocessing.connection import wait as wait_ready
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# ==================== 配置 ====================
+
+# 单个进程的最大重启次数，超过后放弃该进程
+WORKER_MAX_RESTARTS = int(os.getenv('WORKER_MAX_RESTARTS', 5))
+# 同一任务最多被重发几次 (反复让进程崩溃的任务会被丢弃)
+WORKER_JOB_ATTEMPTS = int(os.getenv('WORKER_JOB_ATTEMPTS', 3))
+# 入库进程一次合并的任务数
+STORE_DRAIN = 32
+
+NEXT_STAGE = {'fetch': 'parse', 'parse': 'store', 'store': None}
+
+
+@dataclass
+class Job:
+    """调度单元"""
+    id: int
+    stage: str          # fetch / parse / store
+    payload: Tuple
+    attempts: int = 0
+
+
+@dataclass
+class _Slot:
+    """一个工作进程及其未确认的任务"""
+    name: str
+    role: str
+    process: Any = None
+    conn: Any = None
+    inbox: Any = None
+    pending: Dict[int, Job] = field(default_factory=dict)
+    restarts: int = 0
+    dead: bool = False
+
+
+# ==================== 各阶段处理 ====================
+
+def fetch_units(pain: bool = True, opportunity: bool = True) -> List[Tuple]:
+    """
+    一轮要抓取的全部单元
+    
+    Args:
+        pain: 是否包含痛点雷达的数据源
+        opportunity: 是否包含机会猎手的数据源
+    
+    Returns:
+        抓取任务载荷列表
+    """
+    from rss_hunter import RSSHunter
+    
+    units = []
+    targets = tuple(t for t, on in (('pain', pain), ('opportunity', opportunity)) if on)
+    limits = []
+    if pain:
+        import pain_radar_v2
+        limits.append(pain_radar_v2.HN_TOP_LIMIT)
+        units.append(('twitter',))
+        units.extend(('rss', key, 'pain') for key in RSSHunter.sources_by_category('community'))
+    if opportunity:
+        import opportunity_hunter
+        limits.append(opportunity_hunter.HN_TOP_LIMIT)
+        units.extend(('github', kw) for kw in opportunity_hunter.GITHUB_KEYWORDS[:5])
+        units.extend(('rss', key, 'opportunity')
+                     for key in RSSHunter.sources_by_category('research', 'startup', 'product'))
+        units.append(('trends',))
+    if targets:
+        # HN 只抓一次，两个模块各取所需
+        units.insert(0, ('hn', max(limits), targets))
+    return units
+
+
+def unit_name(payload: Tuple) -> str:
+    """抓取任务对应的协调单元名，与单进程模式下 ctx.acquire 使用的名字一致"""
+    kind = payload[0]
+    if kind == 'rss':
+        return f'rss:{payload[1]}'
+    if kind == 'github':
+        return f'github:{payload[1]}'
+    return kind
+
+
+async def _fetch(ctx, payload: Tuple) -> List[Tuple]:
+    """抓取一个单元，返回解析任务载荷"""
+    kind = payload[0]
+    if kind == 'hn':
+        import cycle
+        _, limit, targets = payload
+        return [('hn', await cycle.fetch_hn_stories(ctx, limit), targets)]
+    if kind == 'twitter':
+        import pain_radar_v2
+        return [('twitter', await ctx.call('twitter', pain_radar_v2.search_tweets))]
+    if kind == 'github':
+        import opportunity_hunter
+        return [('github', await opportunity_hunter.search_github(ctx, payload[1]))]
+    if kind == 'rss':
+        from rss_hunter import RSSHunter
+        _, key, target = payload
+        body = await RSSHunter().download_feed_async(ctx, key)
+        return [('rss', key, body, target)] if body is not None else []
+    if kind == 'trends':
+        import opportunity_hunter
+        return [('trends', await ctx.call('trends', lambda: asyncio.to_thread(opportunity_hunter.fetch_trends)))]
+    raise ValueError(f"未知的抓取单元: {kind}")
+
+
+class _ParseHandler:
+    """解析进程: 原文 → 条目 → 入库记录 (含向量)"""
+    
+    def __init__(self):
+        import store
+        from rss_hunter import RSSHunter
+        
+        self.rss = RSSHunter()
+        try:
+            self.embed = store.embedding_function()
+        except Exception as e:
+            logger.warning(f"向量模型不可用，改由入库时计算: {str(e)}")
+            self.embed = None
+    
+    def handle(self, payload: Tuple) -> List[Tuple]:
+        import pain_radar_v2 as pain
+        import opportunity_hunter as opp
+        
+        kind = payload[0]
+        pains, opps = [], []
+        if kind == 'hn':
+            _, stories, targets = payload
+            if 'pain' in targets:
+                pains = pain.hn_pains(stories)
+            if 'opportunity' in targets:
+                opps = opp.hn_opportunities(stories)
+        elif kind == 'twitter':
+            pains = pain.twitter_pains(payload[1])
+        elif kind == 'github':
+            opps = opp.github_opportunities(payload[1])
+        elif kind == 'rss':
+            _, key, body, target = payload
+            articles = self.rss.parse_feed_body(key, body)
+            if target == 'pain':
+                pains = pain.reddit_pains(articles)
+            else:
+                opps = opp.rss_opportunities(articles)
+        elif kind == 'trends':
+            opps = opp.trend_opportunities(payload[1])
+        else:
+            raise ValueError(f"未知的解析任务: {kind}")
+        
+        records = []
+        for item in pains:
+            if pain.keep_pain(item):
+                records.append([pain.PAIN_COLLECTION, item.id, item.content, pain.pain_metadata(item), item, None])
+        for item in opps:
+            records.append([opp.OPPORTUNITY_COLLECTION, item.id, opp.opportunity_document(item),
+                            opp.opportunity_metadata(item), item, None])
+        
+        if records and self.embed is not None:
+            try:
+                vectors = self.embed([r[2] for r in records])
+                for record, vector in zip(records, vectors):
+                    record[5] = [float(x) for x in vector]
+            except Exception as e:
+                logger.warning(f"计算向量失败，改由入库时计算: {str(e)}")
+        return [tuple(r) for r in records]
+
+
+class _StoreHandler:
+    """入库进程: 持有唯一的 Chroma 客户端"""
+    
+    def __init__(self):
+        import store
+        self.store = store.get_store()
+    
+    def handle_batch(self, jobs: List[Job]) -> List[Tuple[Job, Optional[List], Optional[str]]]:
+        # 先把所有任务的写操作都排进写线程，让它们合并成尽量少的批次
+        submitted = []
+        for job in jobs:
+            futures = []
+            for collection, doc_id, document, metadata, entry, vector in job.payload[0]:
+                handle = self.store.collection(collection)
+                futures.append((collection, entry, vector,
+                                handle.submit_add_if_absent(doc_id, document, metadata, vector)))
+            submitted.append((job, futures))
+        
+        results = []
+        for job, futures in submitted:
+            try:
+                rows = [(collection, entry, vector)
+                        for collection, entry, vector, future in futures if future.result()]
+                if job.attempts:
+                    rows.extend(self._reclaim(job, futures))
+                results.append((job, rows, None))
+            except Exception as e:
+                results.append((job, None, repr(e)))
+        return results
+    
+    def _reclaim(self, job: Job, futures: List) -> List[Tuple]:
+        """
+        重发的任务: 上一个入库进程可能已写入但没来得及确认。
+        库里记录的 time 与本任务构造时的 time 相同，说明是本轮写入的，仍计入会话
+        """
+        rows = []
+        for record, (collection, entry, vector, future) in zip(job.payload[0], futures):
+            if future.result():
+                continue
+            existing = self.store.collection(collection).get(ids=[record[1]], include=['metadatas'])
+            metadatas = existing.get('metadatas') or []
+            if metadatas and metadatas[0].get('time') == record[3].get('time'):
+                rows.append((collection, entry, vector))
+        return rows
+    
+    def close(self) -> None:
+        self.store.close()
+
+
+# ==================== 工作进程入口 ====================
+
+def _worker_main(role: str, conn, inbox) -> None:
+    # Ctrl-C 由主进程统一处理
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(level=logging.WARNING)
+    if role == 'fetch':
+        asyncio.run(_fetch_loop(conn, inbox))
+    elif role == 'parse':
+        handler = _ParseHandler()
+        while True:
+            job = inbox.get()
+            if job is None:
+                break
+            start = time.perf_counter()
+            try:
+                conn.send(('done', job.id, handler.handle(job.payload), time.perf_counter() - start))
+            except Exception as e:
+                conn.send(('error', job.id, repr(e), time.perf_counter() - start))
+    elif role == 'store':
+        handler = _StoreHandler()
+        stopping = False
+        while not stopping:
+            job = inbox.get()
+            if job is None:
+                break
+            jobs = [job]
+            while len(jobs) < STORE_DRAIN:
+                try:
+                    nxt = inbox.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stopping = True
+                    break
+                jobs.append(nxt)
+            start = time.perf_counter()
+            results = handler.handle_batch(jobs)
+            elapsed = (time.perf_counter() - start) / len(jobs)
+            for job, rows, error in results:
+                conn.send(('done', job.id, rows, elapsed) if error is None else ('error', job.id, error, elapsed))
+        handler.close()
+    conn.close()
+
+
+async def _fetch_loop(conn, inbox) -> None:
+    """抓取进程: 任务到达即并发执行，共用一个 CycleContext"""
+    import cycle
+    import runtime
+    
+    runtime.configure_proxy()
+    loop = asyncio.get_running_loop()
+    jobs: 'asyncio.Queue[Optional[Job]]' = asyncio.Queue()
+    
+    def reader():
+        while True:
+            job = inbox.get()
+            loop.call_soon_threadsafe(jobs.put_nowait, job)
+            if job is None:
+                return
+    
+    threading.Thread(target=reader, name='fetch-inbox', daemon=True).start()
+    
+    async def run(job: Job):
+        start = time.perf_counter()
+        try:
+            outputs = await _fetch(ctx, job.payload)
+            # 数据源自己捕获了异常 (RSS 下载失败、GitHub 限流等) 也按失败上报，该单元不标记完成
+            if unit_name(job.payload) in ctx.failed_units:
+                conn.send(('error', job.id, '抓取失败', time.perf_counter() - start))
+            else:
+                conn.send(('done', job.id, outputs, time.perf_counter() - start))
+        except Exception as e:
+            conn.send(('error', job.id, repr(e), time.perf_counter() - start))
+    
+    async with cycle.CycleContext() as ctx:
+        tasks = set()
+        while True:
+            job = await jobs.get()
+            if job is None:
+                break
+            task = asyncio.ensure_future(run(job))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+
+# ==================== 调度 ====================
+
+class WorkerPool:
+    """
+    进程池调度器
+    
+    用法:
+        pool = WorkerPool(parse_workers=4)
+        pool.start()
+        rows = pool.run(fetch_units(), timeout=600)
+        pool.close()
+    """
+    
+    def __init__(self, parse_workers: int = 2):
+        self._mp = multiprocessing.get_context('spawn')
+        self.slots: Dict[str, _Slot] = {'fetch-0': _Slot('fetch-0', 'fetch'), 'store-0': _Slot('store-0', 'store')}
+        for i in range(max(1, parse_workers)):
+            self.slots[f'parse-{i}'] = _Slot(f'parse-{i}', 'parse')
+        self.rows: List[Tuple] = []
+        self.fetched: List[Tuple] = []      # 抓取成功的单元载荷
+        self._next_id = 0
+        self._stats = {
+            'jobs': {role: 0 for role in NEXT_STAGE},
+            'busy': {role: 0.0 for role in NEXT_STAGE},
+            'errors': 0,
+            'restarts': 0,
+            'dropped': 0,
+        }
+    
+    def start(self) -> None:
+        for slot in self.slots.values():
+            self._spawn(slot)
+    
+    def _spawn(self, slot: _Slot) -> None:
+        parent_conn, child_conn = self._mp.Pipe()
+        slot.conn = parent_conn
+        slot.inbox = self._mp.Queue()
+        slot.process = self._mp.Process(target=_worker_main, args=(slot.role, child_conn, slot.inbox),
+                                        name=slot.name, daemon=True)
+        slot.process.start()
+        child_conn.close()
+    
+    # ---------- 任务分派 ----------
+    
+    def submit(self, stage: str, payload: Tuple) -> None:
+        self._next_id += 1
+        self._dispatch(Job(self._next_id, stage, payload))
+    
+    def _dispatch(self, job: Job) -> None:
+        candidates = [s for s in self.slots.values() if s.role == job.stage and not s.dead]
+        if not candidates:
+            self._stats['dropped'] += 1
+            print(f"⚠️ 没有可用的 {job.stage} 进程，任务 {job.id} 被丢弃")
+            return
+        slot = min(candidates, key=lambda s: len(s.pending))
+        slot.pending[job.id] = job
+        slot.inbox.put(job)
+    
+    def outstanding(self) -> int:
+        return sum(len(s.pending) for s in self.slots.values())
+    
+    # ---------- 主循环 ----------
+    
+    def run(self, units: List[Tuple], timeout: float) -> List[Tuple]:
+        """
+        抓取所有单元并等待全部入库
+        
+        Args:
+            units: 抓取任务载荷
+            timeout: 截止时间 (秒)，到点后未完成的任务放弃
+        
+        Returns:
+            新入库的 [(集合名, 会话条目, 向量)]
+        """
+        self.rows = []
+        self.fetched = []
+        for unit in units:
+            self.submit('fetch', unit)
+        
+        deadline = time.monotonic() + timeout
+        while self.outstanding() and time.monotonic() < deadline:
+            live = [s for s in self.slots.values() if not s.dead]
+            sources = [s.conn for s in live] + [s.process.sentinel for s in live]
+            ready = wait_ready(sources, timeout=min(1.0, max(0.0, deadline - time.monotonic())))
+            for slot in live:
+                if slot.conn in ready:
+                    self._drain(slot)
+                if slot.process.sentinel in ready:
+                    self._drain(slot)
+                    self._restart(slot)
+        
+        if self.outstanding():
+            left = {s.name: len(s.pending) for s in self.slots.values() if s.pending}
+            print(f"⏰ 多进程抓取超过截止时间，放弃未完成任务: {left}")
+            for slot in self.slots.values():
+                slot.pending.clear()
+        return self.rows
+    
+    def _drain(self, slot: _Slot) -> None:
+        """读出该进程已发回的全部消息"""
+        try:
+            while slot.conn.poll():
+                self._handle(slot, slot.conn.recv())
+        except (EOFError, OSError):
+            pass
+    
+    def _handle(self, slot: _Slot, message: Tuple) -> None:
+        kind, job_id, result, elapsed = message
+        job = slot.pending.pop(job_id, None)
+        if job is None:
+            return   # 进程重启前已确认过的重复结果
+        self._stats['jobs'][slot.role] += 1
+        self._stats['busy'][slot.role] += elapsed
+        
+        if kind == 'error':
+            self._stats['errors'] += 1
+            print(f"⚠️ {slot.name} 任务失败 {job.payload[0]}: {result}")
+            return
+        
+        next_stage = NEXT_STAGE[slot.role]
+        if slot.role == 'fetch':
+            self.fetched.append(job.payload)
+            for payload in result:
+                self.submit(next_stage, payload)
+        elif slot.role == 'parse':
+            for (collection, source), n in Counter((r[0], r[3]['source']) for r in result).items():
+                metrics.count_items(collection, source, 'fetched', n)
+            if result:
+                self.submit(next_stage, (result,))
+        else:
+            self.rows.extend(result)
+            # 提交的记录里没有回来的就是库中已存在的
+            stored = Counter((collection, item.source) for collection, item, _ in result)
+            for (collection, source), n in Counter((r[0], r[3]['source']) for r in job.payload[0]).items():
+                metrics.count_items(collection, source, 'stored', stored[(collection, source)])
+                metrics.count_items(collection, source, 'deduped', n - stored[(collection, source)])
+    
+    def _restart(self, slot: _Slot) -> None:
+        """重启崩溃的进程，重发它名下尚未确认的任务"""
+        slot.process.join(1)
+        exitcode = slot.process.exitcode
+        orphans = list(slot.pending.values())
+        slot.pending.clear()
+        slot.restarts += 1
+        self._stats['restarts'] += 1
+        
+        if slot.restarts > WORKER_MAX_RESTARTS:
+            slot.dead = True
+            print(f"❌ {slot.name} 连续崩溃 {slot.restarts} 次，不再重启")
+        else:
+            print(f"♻️ {slot.name} 异常退出 (exitcode={exitcode})，重启并重发 {len(orphans)} 个任务")
+            self._spawn(slot)
+        
+        for job in orphans:
+            job.attempts += 1
+            if job.attempts >= WORKER_JOB_ATTEMPTS:
+                self._stats['dropped'] += 1
+                print(f"⚠️ 任务 {job.stage}/{job.payload[0]} 已导致 {job.attempts} 次崩溃，丢弃")
+                continue
+            self._dispatch(job)
+    
+    def close(self, timeout: float = 30) -> None:
+        """通知所有进程退出并等待 (入库进程会先写完手头的批次)"""
+        for slot in self.slots.values():
+            if slot.process is not None and slot.process.is_alive():
+                slot.inbox.put(None)
+        deadline = time.monotonic() + timeout
+        for slot in self.slots.values():
+            if slot.process is None or slot.process.pid is None:
+                continue   # 未能启动的进程
+            slot.process.join(max(0.1, deadline - time.monotonic()))
+            if slot.process.is_alive():
+                slot.process.terminate()
+                slot.process.join(5)
+    
+    def stats(self) -> Dict:
+        return {
+            'jobs': dict(self._stats['jobs']),
+            'busy': {role: round(seconds, 2) for role, seconds in self._stats['busy'].items()},
+            'errors': self._stats['errors'],
+            'restarts': self._stats['restarts'],
+            'dropped': self._stats['dropped'],
+        }
+
+
+class SessionVectors:
+    """聚类用的向量来源: 直接用解析进程算好的向量，主进程不用再打开 Chroma"""
+    
+    def __init__(self, vectors: Dict[str, List[float]]):
+        self.vectors = vectors
+    
+    def get(self, ids: List[str], include=None) -> Dict:
+        found = [doc_id for doc_id in ids if doc_id in self.vectors]
+        return {'ids': found, 'embeddings': [self.vectors[doc_id] for doc_id in found]}
+
+
+# ==================== 循环入口 ====================
+
+async def _fetch_rows(parse_workers: int, pain: bool, opportunity: bool) -> List[Tuple]:
+    """进程池完成抓取到入库，返回 [(集合名, 会话条目, 向量)]"""
+    import cycle
+    import coordination
+    
+    # 集群模式下只抓取归本实例负责、且本周期尚未被认领的单元
+    units = fetch_units(pain, opportunity)
+    coordinator = coordination.get_coordinator()
+    if coordinator is not None:
+        members = await asyncio.to_thread(coordinator.members)
+        owned = [u for u in units if await asyncio.to_thread(coordinator.acquire, unit_name(u), members)]
+        print(f"🤝 抓取单元: 本实例执行 {len(owned)}, 跳过 {len(units) - len(owned)} (其他实例负责或本周期已执行)")
+        units = owned
+    
+    pool = WorkerPool(parse_workers)
+    print(f"⚙️ 多进程模式: 1 个抓取进程, {parse_workers} 个解析进程, 1 个入库进程")
+    try:
+        pool.start()
+        rows = await asyncio.to_thread(pool.run, units, cycle.FETCH_DEADLINE)
+    finally:
+        await asyncio.to_thread(pool.close)
+        # 只标记抓取成功的单元，失败、超时或被丢弃的本周期内仍可重试
+        if coordinator is not None and pool.fetched:
+            await asyncio.to_thread(coordinator.complete, [unit_name(u) for u in pool.fetched])
+    
+    stats = pool.stats()
+    print(f"⚙️ 任务: 抓取 {stats['jobs']['fetch']} / 解析 {stats['jobs']['parse']} / 入库 {stats['jobs']['store']}, "
+          f"失败 {stats['errors']}, 重启 {stats['restarts']}, 丢弃 {stats['dropped']}")
+    return rows
+
+
+async def run_cycle(parse_workers: int, pain: bool = True, opportunity: bool = True) -> Dict[str, str]:
+    """
+    多进程模式下跑一轮: 进程池完成抓取到入库，主进程做分诊、聚类、分析和交付
+    
+    Args:
+        parse_workers: 解析进程数
+        pain: 是否运行痛点雷达
+        opportunity: 是否运行机会猎手
+    
+    Returns:
+        {模块: success / failed / timeout}
+    """
+    import cycle
+    import runtime
+    import checkpoint
+    import coordination
+    
+    runtime.configure_proxy()
+    started = time.monotonic()
+    
+    scopes = [scope for scope, on in (('pain', pain), ('opportunity', opportunity)) if on]
+    if all(checkpoint.stage(scope, 'fetched') is not None for scope in scopes):
+        print("⏭️ 抓取已在中断前完成")
+        rows = []
+    else:
+        rows = await _fetch_rows(parse_workers, pain, opportunity)
+    
+    # 续跑中断的一轮时，中断前已入库的条目没有本轮算好的向量
+    restored = {scope: checkpoint.items(scope) for scope in scopes}
+    vectors = {item.id: vector for _, item, vector in rows}
+    # 有条目缺向量时 (向量模型不可用) 回退到从 Chroma 读取
+    collection = None
+    if not any(restored.values()) and all(v is not None for v in vectors.values()):
+        collection = SessionVectors(vectors)
+    
+    # 集群模式下本实例没有新条目时也可能要分析其他实例交接来的条目
+    coordinated = coordination.get_coordinator() is not None
+    modules = {}
+    if pain:
+        import pain_radar_v2
+        pain_radar_v2.current_session_pains[:] = restored['pain']
+        for name, item, _ in rows:
+            if name == pain_radar_v2.PAIN_COLLECTION:
+                pain_radar_v2.record_pain(item)
+        checkpoint.mark_stage('pain', 'fetched')
+        print(f"\n📊 本次捕获痛点数: {len(pain_radar_v2.current_session_pains)}")
+        if pain_radar_v2.current_session_pains or coordinated:
+            modules['pain_radar'] = pain_radar_v2.analyze_and_deliver(
+                list(pain_radar_v2.current_session_pains), collection)
+    if opportunity:
+        import opportunity_hunter
+        opportunity_hunter.current_session_opportunities[:] = restored['opportunity']
+        for name, item, _ in rows:
+            if name == opportunity_hunter.OPPORTUNITY_COLLECTION:
+                opportunity_hunter.record_opportunity(item)
+        checkpoint.mark_stage('opportunity', 'fetched')
+        print(f"\n📊 本次发现机会数: {len(opportunity_hunter.current_session_opportunities)}")
+        if opportunity_hunter.current_session_opportunities or coordinated:
+            modules['opportunity_hunter'] = opportunity_hunter.analyze_and_deliver(
+                list(opportunity_hunter.current_session_opportunities), collection)
+    
+    results = {name: 'success' for name, on in (('pain_radar', pain), ('opportunity_hunter', opportunity)) if on}
+    tasks = {name: asyncio.ensure_future(coro) for name, coro in modules.items()}
+    if tasks:
+        remaining = max(0.0, cycle.CYCLE_DEADLINE - (time.monotonic() - started))
+        done, pending = await asyncio.wait(tasks.values(), timeout=remaining)
+        for name, task in tasks.items():
+            if task in pending:
+                task.cancel()
+                results[name] = 'timeout'
+                print(f"⏰ {name} 超过循环截止时间，已取消")
+            elif task.cancelled():
+                results[name] = 'failed'
+                print(f"❌ {name} 被取消")
+            elif task.exception() is not None:
+                results[name] = 'failed'
+                print(f"❌ {name} 失败: {task.exception()}")
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+    return results